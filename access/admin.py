@@ -1,14 +1,23 @@
 from django.contrib import admin
-from .models import AccessLog
+
+from myprojabd.admin_utils import LargeTableAdminMixin, RollupDateFilter
+from .models import AccessLog, AccessDailyStat
+
+
+class AccessDayFilter(RollupDateFilter):
+    rollup_model = AccessDailyStat
+
 
 @admin.register(AccessLog)
-class AccessLogAdmin(admin.ModelAdmin):
+class AccessLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     # أعمدة القائمة
     list_display = ("user_identifier", "display_action", "timestamp", "ip_address")
-    list_filter = ("action",)
-    search_fields = ("user_identifier", "ip_address", "user_agent")
-    ordering = ("-timestamp",)
-    date_hierarchy = "timestamp"
+    # الأيام من جدول التجميع بدل date_hierarchy (SELECT DISTINCT على كامل الجدول)
+    list_filter = ("action", AccessDayFilter)
+    # بحث بالفهرس فقط: تطابق/بادئة على المعرّف (بدون مسح user_agent)
+    search_fields = ("^user_identifier",)
+    # id متزايد مع الوقت → ترتيب على المفتاح الأساسي بدون فرز إضافي
+    ordering = ("-pk",)
 
     # قراءة فقط (لأن السجلات تُنشأ آليًا)
     readonly_fields = ("user_identifier", "action", "timestamp", "ip_address", "user_agent")
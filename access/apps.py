@@ -1,7 +1,17 @@
 from django.apps import AppConfig
+from django.core import checks
 from django.utils.translation import gettext_lazy as _
 
 class AccessConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'access'
     verbose_name = _('الوصول وإدارة الدخول')
+
+    def ready(self):
+        # تسجيل مستقبلات الإشارات (تحديث التجميعات اليومية)
+        from . import signals  # noqa: F401
+        from .checks import otp_store_check, session_engine_check
+        # تحذير عند تخزين الرموز في ذاكرة غير مشتركة بين العمليات
+        checks.register(otp_store_check, checks.Tags.caches)
+        # رفض الجلسات المخزنة عند العميل (التسجيل يحفظ تجزئة كلمة المرور في الجلسة)
+        checks.register(session_engine_check, checks.Tags.security)
@@ -0,0 +1,41 @@
+# access/checks.py
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+
+def otp_store_check(app_configs, **kwargs):
+    """CacheOTPStore على ذاكرة داخل العملية: الرمز المُرسل من عملية لا تراه عملية أخرى."""
+    from .otp import CacheOTPStore
+
+    store = import_string(getattr(settings, "OTP_STORE", "access.otp.DatabaseOTPStore"))
+    if not issubclass(store, CacheOTPStore):
+        return []
+    alias = getattr(settings, "OTP_CACHE_ALIAS", "default")
+    if not isinstance(caches[alias], LocMemCache):
+        return []
+    return [
+        checks.Warning(
+            "OTP_STORE يستخدم CacheOTPStore مع ذاكرة مؤقتة محلية للعملية (locmem).",
+            hint="استخدم ذاكرة مشتركة (CACHE_BACKEND=redis) أو OTP_STORE=access.otp.DatabaseOTPStore.",
+            id="access.W001",
+        )
+    ]
+
+
+def session_engine_check(app_configs, **kwargs):
+    """
+    التسجيل يحفظ تجزئة كلمة المرور مؤقتًا في الجلسة (pending_signup) حتى التحقق من OTP؛
+    مع signed_cookies تصل التجزئة للمتصفح (موقّعة لا مشفّرة) وتصبح عرضة للكسر دون اتصال.
+    """
+    if getattr(settings, "SESSION_ENGINE", "") != "django.contrib.sessions.backends.signed_cookies":
+        return []
+    return [
+        checks.Error(
+            "مسار التسجيل يخزّن تجزئة كلمة المرور في الجلسة، ولا يصح ذلك مع signed_cookies.",
+            hint="استخدم SESSION_BACKEND=cached_db أو db أو cache.",
+            id="access.E001",
+        )
+    ]
@@ -1,9 +1,16 @@
 # access/forms.py
+import logging
+
 from django import forms
-from django.contrib.auth import get_user_model
+from django.contrib.auth import forms as auth_forms, get_user_model
+from django.core.mail import EmailMultiAlternatives
 from django.core.validators import RegexValidator
 from django.contrib.auth.password_validation import validate_password
 
+from notifications import mail
+
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 ksa_id_validator = RegexValidator(r'^\d{10}$', "رقم الهوية يجب أن يكون 10 أرقام.")
@@ -46,3 +53,26 @@ class SignupForm(forms.ModelForm):
         if commit:
             user.save()
         return user
+
+
+class PasswordResetForm(auth_forms.PasswordResetForm):
+    """
+    نفس نموذج Django، لكن الرسائل تُجمع وتُرسل دفعةً على اتصال SMTP واحد (notifications.mail)
+    والقوالب تُحلَّل مرة واحدة لكل لغة بدل كل رسالة.
+    """
+
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = "".join(mail.render(subject_template_name, context).splitlines())
+        message = EmailMultiAlternatives(subject, mail.render(email_template_name, context), from_email, [to_email])
+        if html_email_template_name is not None:
+            message.attach_alternative(mail.render(html_email_template_name, context), "text/html")
+        self._outgoing.append(message)
+
+    def save(self, *args, **kwargs):
+        self._outgoing = []
+        super().save(*args, **kwargs)
+        for message, error in zip(self._outgoing, mail.send_batch(self._outgoing)):
+            # مثل Django: الفشل يُسجَّل ولا يظهر للمستخدم (لا نكشف وجود البريد من عدمه)
+            if error is not None:
+                logger.error("Failed to send password reset email to %s: %s", message.to[0], error)
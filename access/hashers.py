@@ -0,0 +1,25 @@
+# access/hashers.py
+"""
+مُجزّئات كلمات مرور قابلة للضبط من الإعدادات.
+
+عند تغيير التكلفة (عدد التكرارات/معامل العمل) يُعاد تجزئة كلمة المرور تلقائيًا
+عند أول دخول ناجح (must_update → User.check_password يحفظ التجزئة الجديدة).
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 بعدد تكرارات من PASSWORD_PBKDF2_ITERATIONS (نفس اسم الخوارزمية)."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", None) or PBKDF2PasswordHasher.iterations
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt بمعامل عمل من PASSWORD_SCRYPT_WORK_FACTOR (قوة 2)."""
+
+    @property
+    def work_factor(self):
+        return getattr(settings, "PASSWORD_SCRYPT_WORK_FACTOR", None) or ScryptPasswordHasher.work_factor
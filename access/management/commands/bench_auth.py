@@ -0,0 +1,100 @@
+# access/management/commands/bench_auth.py
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from access.otp import get_otp_store
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _summary(samples_ms):
+    samples = sorted(samples_ms)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    mean = statistics.fmean(samples)
+    return f"متوسط {mean:7.1f}ms | p95 {p95:7.1f}ms | {1000 / mean:6.1f} طلب/ث/نواة"
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس تكلفة تجزئة كلمة المرور وزمن/إنتاجية مسار الدخول والتسجيل لكل نواة. "
+        "كل البيانات المُنشأة تُلغى في النهاية."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--requests", type=int, default=20, help="عدد الطلبات لكل مسار.")
+        parser.add_argument(
+            "--iterations", type=int, nargs="*", default=[],
+            help="قيم PBKDF2 إضافية للمقارنة (مثل 200000 600000 1000000).",
+        )
+        parser.add_argument("--skip-signup", action="store_true")
+
+    def handle(self, *args, **opts):
+        n = max(opts["requests"], 1)
+        hasher = get_hasher()
+        self.stdout.write(f"المُجزّئ المفضّل: {hasher.algorithm} ({type(hasher).__name__})")
+
+        # 1) تكلفة التجزئة وحدها
+        for iterations in [None, *opts["iterations"]]:
+            with override_settings(PASSWORD_PBKDF2_ITERATIONS=iterations or settings.PASSWORD_PBKDF2_ITERATIONS):
+                samples = []
+                for _ in range(n):
+                    t = time.perf_counter()
+                    make_password("Bench-Passw0rd!")
+                    samples.append((time.perf_counter() - t) * 1000)
+                label = f"pbkdf2={iterations}" if iterations else "الإعداد الحالي"
+                self.stdout.write(f"تجزئة ({label:>16}): {_summary(samples)}")
+
+        # 2) المسارات الكاملة عبر عميل الاختبار (داخل معاملة تُلغى)
+        setup_test_environment()
+        try:
+            with transaction.atomic(), override_settings(RATELIMITS={}, DEBUG=True):
+                self._bench_login(n)
+                if not opts["skip_signup"]:
+                    self._bench_signup(n)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+    def _bench_login(self, n):
+        User = get_user_model()
+        User.objects.create_user(username="0599999990", password="Bench-Passw0rd!")
+        url = reverse("access:login")
+        samples = []
+        for _ in range(n):
+            client = Client()
+            t = time.perf_counter()
+            res = client.post(url, {"phone": "0599999990", "password": "Bench-Passw0rd!"})
+            samples.append((time.perf_counter() - t) * 1000)
+            if res.status_code != 302:
+                self.stderr.write("فشل الدخول أثناء القياس.")
+                return
+        self.stdout.write(f"الدخول                    : {_summary(samples)}")
+
+    def _bench_signup(self, n):
+        signup, verify = reverse("access:signup"), reverse("access:verify_otp")
+        samples = []
+        for i in range(n):
+            phone = f"0598{i:06d}"
+            get_otp_store().clear(phone)
+            client = Client()
+            t = time.perf_counter()
+            client.post(signup, {"phone": phone, "national_id": "1234567890", "password": "Bench-Passw0rd!"})
+            res = client.post(verify, {"code": "111111"})  # وضع التجربة: الكود الثابت
+            samples.append((time.perf_counter() - t) * 1000)
+            if res.status_code != 302 or not res.url.startswith("/lookup"):
+                self.stderr.write("فشل التسجيل أثناء القياس.")
+                return
+        self.stdout.write(f"التسجيل + OTP             : {_summary(samples)}")
@@ -0,0 +1,72 @@
+# access/management/commands/fake_sms_server.py
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "خادم SMS تجريبي محلي يحاكي Unifonic لاختبارات الحمل. "
+        "شغّله ثم اضبط SMS_PROVIDER_URL=http://127.0.0.1:<port>/rest/SMS/messages"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument("--latency-ms", type=int, default=0, help="تأخير مصطنع لكل طلب.")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="نسبة الردود 503 (0..1).")
+        parser.add_argument("--quiet", action="store_true", help="عدم طباعة كل رسالة.")
+
+    def handle(self, *args, **opts):
+        latency = opts["latency_ms"] / 1000
+        fail_rate = opts["fail_rate"]
+        quiet = opts["quiet"]
+        stdout = self.stdout
+        counter = {"ok": 0, "failed": 0}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8", "replace"))
+                if latency:
+                    time.sleep(latency)
+                failed = fail_rate and random.random() < fail_rate
+                with lock:
+                    counter["failed" if failed else "ok"] += 1
+                    n = counter["ok"]
+                if failed:
+                    body = json.dumps({"success": False, "message": "Service Unavailable"}).encode()
+                    self.send_response(503)
+                else:
+                    body = json.dumps({"success": True, "data": {"MessageID": n, "Status": "Sent"}}).encode()
+                    self.send_response(200)
+                    if not quiet:
+                        stdout.write(f"SMS → {form.get('Recipient', ['?'])[0]}: {form.get('Body', [''])[0]}")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((opts["host"], opts["port"]), Handler)
+        server.daemon_threads = True
+        self.stdout.write(self.style.SUCCESS(
+            f"خادم SMS التجريبي يعمل على http://{opts['host']}:{opts['port']}/rest/SMS/messages"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"تم الإرسال: {counter['ok']} | فشل مصطنع: {counter['failed']}")
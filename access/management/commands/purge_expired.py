@@ -0,0 +1,102 @@
+# access/management/commands/purge_expired.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from access.models import OTPRequest
+from access.otp import otp_ttl
+
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "حذف رموز OTP المنتهية والجلسات المنتهية على دفعات صغيرة (كل دفعة في معاملة مستقلة) "
+        "لتجنّب الأقفال الطويلة أثناء ساعات العمل."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="عدد الصفوف في كل دفعة.")
+        parser.add_argument("--sleep", type=float, default=0.05, help="انتظار (ثوانٍ) بين الدفعات.")
+        parser.add_argument(
+            "--otp-retention-hours", type=float, default=None,
+            help="الاحتفاظ برموز OTP لهذه المدة (الافتراضي: مدة صلاحية الرمز فقط).",
+        )
+        parser.add_argument("--skip-otp", action="store_true")
+        parser.add_argument("--skip-sessions", action="store_true")
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيُحذف دون حذف.")
+
+    def handle(self, *args, **opts):
+        self.batch = max(opts["batch_size"], 1)
+        self.pause = opts["sleep"]
+        self.dry_run = opts["dry_run"]
+
+        if not opts["skip_otp"]:
+            hours = opts["otp_retention_hours"]
+            keep = timedelta(hours=hours) if hours is not None else timedelta(seconds=otp_ttl())
+            self.purge_otp(timezone.now() - keep)
+
+        if not opts["skip_sessions"]:
+            if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+                self.purge_sessions(timezone.now())
+            else:
+                self.stdout.write("الجلسات لا تُخزَّن في قاعدة البيانات؛ تنتهي تلقائيًا (تخطي).")
+
+    # ---------- OTP: نطاقات المفتاح الأساسي ----------
+    def purge_otp(self, cutoff):
+        """
+        id يتزايد مع created_at، لذا نمشي على نطاقات [lo, lo + batch) من أصغر id
+        ونتوقف عند أول صف غير منتهٍ؛ كل DELETE يستخدم فهرس المفتاح الأساسي فقط.
+        """
+        deleted = 0
+        first = OTPRequest.objects.order_by("id").values_list("id", "created_at").first()
+        while first and first[1] < cutoff:
+            lo = first[0]
+            hi = lo + self.batch
+            qs = OTPRequest.objects.filter(id__gte=lo, id__lt=hi, created_at__lt=cutoff)
+            if self.dry_run:
+                n = qs.count()
+            else:
+                with transaction.atomic():
+                    n, _ = qs.delete()
+            deleted += n
+            self.stdout.write(f"OTP: [{lo}, {hi}) → {n} | الإجمالي {deleted}")
+            first = (
+                OTPRequest.objects.filter(id__gte=hi).order_by("id").values_list("id", "created_at").first()
+            )
+            if self.pause and not self.dry_run:
+                time.sleep(self.pause)
+        self.stdout.write(self.style.SUCCESS(
+            f"رموز OTP {'المرشحة للحذف' if self.dry_run else 'المحذوفة'}: {deleted} (أقدم من {timezone.localtime(cutoff):%Y-%m-%d %H:%M})"
+        ))
+
+    # ---------- الجلسات: دفعات عبر فهرس expire_date ----------
+    def purge_sessions(self, now):
+        deleted = 0
+        expired = Session.objects.filter(expire_date__lt=now).order_by("expire_date")
+        if self.dry_run:
+            deleted = expired.count()
+        else:
+            while True:
+                with transaction.atomic():
+                    keys = list(expired.values_list("session_key", flat=True)[: self.batch])
+                    if not keys:
+                        break
+                    n, _ = Session.objects.filter(session_key__in=keys).delete()
+                deleted += n
+                self.stdout.write(f"الجلسات: دفعة {n} | الإجمالي {deleted}")
+                if len(keys) < self.batch:
+                    break
+                if self.pause:
+                    time.sleep(self.pause)
+        self.stdout.write(self.style.SUCCESS(
+            f"الجلسات {'المرشحة للحذف' if self.dry_run else 'المحذوفة'}: {deleted}"
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0004_otprequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('action', models.CharField(choices=[('LOGIN', 'تسجيل دخول'), ('LOGOUT', 'تسجيل خروج'), ('OTP', 'تحقق OTP'), ('VIEW', 'عرض صفحة'), ('FAIL', 'محاولة فاشلة')], max_length=20, verbose_name='الإجراء')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'إحصاء يومي للدخول',
+                'verbose_name_plural': 'إحصاءات يومية للدخول',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'action'), name='access_daily_stat_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.db.models.functions import Substr
+
+# حجم دفعة التحديث بنطاق المفتاح الأساسي (معاملة قصيرة لكل دفعة على الجداول الضخمة)
+BATCH = 10_000
+
+
+def _pk_batches(qs):
+    bounds = qs.aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return
+    for lo in range(bounds["lo"], bounds["hi"] + 1, BATCH):
+        yield qs.filter(pk__gte=lo, pk__lt=lo + BATCH)
+
+
+def intern_user_agents(apps, schema_editor):
+    """نقل سلاسل user_agent إلى جدول UserAgent وربط السجلات بها."""
+    UserAgent = apps.get_model("access", "UserAgent")
+    AccessLog = apps.get_model("access", "AccessLog")
+    db = schema_editor.connection.alias
+    logs = AccessLog.objects.using(db)
+    agents = UserAgent.objects.using(db)
+    # القيم المميزة أولًا (دفعات bulk_create؛ التكرار بعد القص يتجاهله القيد الفريد)
+    values = (
+        logs.exclude(user_agent__isnull=True).exclude(user_agent="")
+        .annotate(v=Substr("user_agent", 1, 255))
+        .values_list("v", flat=True).distinct().iterator()
+    )
+    chunk = []
+    for value in values:
+        chunk.append(UserAgent(value=value))
+        if len(chunk) >= 1000:
+            agents.bulk_create(chunk, ignore_conflicts=True)
+            chunk = []
+    agents.bulk_create(chunk, ignore_conflicts=True)
+    # ثم ربط السجلات بتحديث واحد على مستوى المجموعة لكل نطاق:
+    # UPDATE ... SET user_agent_ref_id = (SELECT id FROM access_useragent WHERE value = SUBSTR(user_agent, 1, 255))
+    ref = UserAgent.objects.filter(value=Substr(OuterRef("user_agent"), 1, 255)).values("pk")[:1]
+    for batch in _pk_batches(logs):
+        batch.exclude(user_agent__isnull=True).exclude(user_agent="").update(user_agent_ref=Subquery(ref))
+
+
+def restore_user_agents(apps, schema_editor):
+    UserAgent = apps.get_model("access", "UserAgent")
+    AccessLog = apps.get_model("access", "AccessLog")
+    logs = AccessLog.objects.using(schema_editor.connection.alias)
+    value = UserAgent.objects.filter(pk=OuterRef("user_agent_ref")).values("value")[:1]
+    for batch in _pk_batches(logs):
+        batch.filter(user_agent_ref__isnull=False).update(user_agent=Subquery(value))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0005_accessdailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=255, unique=True, verbose_name='واصف المتصفح')),
+            ],
+            options={
+                'verbose_name': 'متصفح/عميل',
+                'verbose_name_plural': 'المتصفحات/العملاء',
+            },
+        ),
+        migrations.AddField(
+            model_name='accesslog',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='access.useragent'),
+        ),
+        migrations.RunPython(intern_user_agents, restore_user_agents),
+        migrations.RemoveField(
+            model_name='accesslog',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='accesslog',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='user_agent',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='سلاسل واصف المتصفح عند الحاجة', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='access.useragent', verbose_name='متصفح/عميل'),
+        ),
+    ]
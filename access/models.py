@@ -1,7 +1,41 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 
+from myprojabd.lru import LRUCache
+
+
+class UserAgent(models.Model):
+    """
+    جدول أبعاد لسلاسل واصف المتصفح: تُخزَّن كل سلسلة مرة واحدة،
+    وتشير إليها سجلات AccessLog/LookupHistory بمعرّف رقمي صغير.
+    """
+    value = models.CharField(_("واصف المتصفح"), max_length=255, unique=True)
+
+    # ذاكرة محدودة: السلسلة → id (لتجنب استعلام عند كل كتابة)
+    _ids = LRUCache(maxsize=2048)
+
+    class Meta:
+        verbose_name = _("متصفح/عميل")
+        verbose_name_plural = _("المتصفحات/العملاء")
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def intern(cls, value: str | None) -> int | None:
+        """إرجاع id السلسلة (وإنشاؤها عند الحاجة)؛ None للقيمة الفارغة."""
+        value = (value or "")[:255]
+        if not value:
+            return None
+        pk = cls._ids.get(value)
+        if pk is not None:
+            return pk
+        obj, _created = cls.objects.get_or_create(value=value)
+        # لا نحفظ في الذاكرة إلا بعد تثبيت المعاملة (حتى لا نحتفظ بـ id تراجعت عنه)
+        transaction.on_commit(lambda: cls._ids.set(value, obj.pk))
+        return obj.pk
+
 class AccessLog(models.Model):
     class Actions(models.TextChoices):
         LOGIN  = "LOGIN",  _("تسجيل دخول")
@@ -34,11 +68,14 @@ class AccessLog(models.Model):
         blank=True,
         help_text=_("يُسجل عند توفره"),
     )
-    user_agent = models.CharField(
-        _("متصفح/عميل"),
-        max_length=255,
+    user_agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
         null=True,
         blank=True,
+        db_index=False,  # لا نبحث بالمتصفح؛ نوفر حجم الفهرس
+        related_name="+",
+        verbose_name=_("متصفح/عميل"),
         help_text=_("سلاسل واصف المتصفح عند الحاجة"),
     )
 
@@ -56,6 +93,24 @@ class AccessLog(models.Model):
         return f"{self.user_identifier} • {self.get_action_display()} • {ts}"
 
 
+class AccessDailyStat(models.Model):
+    """عدّاد يومي لكل إجراء في AccessLog (نجاح/فشل الدخول وغيرها)."""
+    day = models.DateField(_("اليوم"))
+    action = models.CharField(_("الإجراء"), max_length=20, choices=AccessLog.Actions.choices)
+    count = models.PositiveBigIntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("إحصاء يومي للدخول")
+        verbose_name_plural = _("إحصاءات يومية للدخول")
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "action"], name="access_daily_stat_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} • {self.get_action_display()} • {self.count}"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(
         User,
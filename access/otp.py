@@ -0,0 +1,148 @@
+# access/otp.py
+"""
+مخزن رموز التحقق (OTP) القابل للتبديل عبر الإعداد OTP_STORE.
+
+- CacheOTPStore (الافتراضي مع redis): الرمز وعدّاد المحاولات ووقت الإرسال في الذاكرة
+  المؤقتة بمفتاح لكل رقم جوال ومدة صلاحية (TTL)؛ الرموز المنتهية تختفي تلقائيًا.
+  يتطلب ذاكرة مشتركة بين العمليات (انظر access.checks).
+- DatabaseOTPStore (الافتراضي بدونها): عبر جدول OTPRequest.
+- OTP_AUDIT=True يضيف سجلًا في OTPRequest عند كل إرسال (كتابة فقط، بلا قراءة).
+"""
+from __future__ import annotations
+
+import math
+import secrets
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OTPRequest
+
+# نتائج التحقق
+OTP_OK = "ok"
+OTP_MISSING = "missing"      # لا يوجد رمز أو انتهت صلاحيته
+OTP_MISMATCH = "mismatch"    # رمز خاطئ
+OTP_LOCKED = "locked"        # تجاوز عدد المحاولات
+
+
+def otp_ttl() -> int:
+    return int(getattr(settings, "OTP_TTL_SECONDS", 300))
+
+
+def otp_max_attempts() -> int:
+    return int(getattr(settings, "OTP_MAX_ATTEMPTS", 5))
+
+
+class BaseOTPStore:
+    def issue(self, phone: str, code: str) -> None:
+        """حفظ رمز جديد للرقم (يلغي السابق ويصفّر المحاولات)."""
+        raise NotImplementedError
+
+    def cooldown_remaining(self, phone: str, cooldown: int) -> int:
+        """عدد الثواني المتبقية قبل السماح بإرسال رمز جديد (0 = مسموح)."""
+        raise NotImplementedError
+
+    def verify(self, phone: str, code: str) -> str:
+        """التحقق من الرمز وإرجاع إحدى النتائج OTP_*."""
+        raise NotImplementedError
+
+    def clear(self, phone: str) -> None:
+        """حذف الرمز بعد الاستخدام."""
+        raise NotImplementedError
+
+    def audit(self, phone: str, code: str) -> None:
+        if getattr(settings, "OTP_AUDIT", False):
+            OTPRequest.objects.create(phone=phone, code=code)
+
+
+class CacheOTPStore(BaseOTPStore):
+    """كل عمليات التحقق قراءة/كتابة مفتاح واحد أو اثنين في الذاكرة المؤقتة (O(1))."""
+
+    def __init__(self, alias: str | None = None):
+        self.cache = caches[alias or getattr(settings, "OTP_CACHE_ALIAS", "default")]
+
+    @staticmethod
+    def _key(phone: str) -> str:
+        return f"otp:code:{phone}"
+
+    @staticmethod
+    def _attempts_key(phone: str) -> str:
+        return f"otp:attempts:{phone}"
+
+    def issue(self, phone, code):
+        ttl = otp_ttl()
+        self.cache.set_many(
+            {self._key(phone): {"code": code, "sent_at": time.time()}, self._attempts_key(phone): 0},
+            timeout=ttl,
+        )
+        self.audit(phone, code)
+
+    def cooldown_remaining(self, phone, cooldown):
+        entry = self.cache.get(self._key(phone))
+        if not entry:
+            return 0
+        elapsed = time.time() - entry["sent_at"]
+        return max(0, math.ceil(cooldown - elapsed))
+
+    def verify(self, phone, code):
+        entry = self.cache.get(self._key(phone))
+        if not entry:
+            return OTP_MISSING
+        try:
+            attempts = self.cache.incr(self._attempts_key(phone))
+        except ValueError:
+            # انتهى مفتاح العدّاد قبل مفتاح الرمز
+            self.cache.set(self._attempts_key(phone), 1, timeout=otp_ttl())
+            attempts = 1
+        if attempts > otp_max_attempts():
+            return OTP_LOCKED
+        if not secrets.compare_digest(str(entry["code"]), str(code)):
+            return OTP_MISMATCH
+        return OTP_OK
+
+    def clear(self, phone):
+        self.cache.delete_many([self._key(phone), self._attempts_key(phone)])
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """المخزن القديم: آخر سجل OTPRequest للرقم."""
+
+    @staticmethod
+    def _last(phone):
+        return OTPRequest.objects.filter(phone=phone).order_by("-created_at").first()
+
+    def issue(self, phone, code):
+        OTPRequest.objects.create(phone=phone, code=code)
+
+    def cooldown_remaining(self, phone, cooldown):
+        last = self._last(phone)
+        if not last:
+            return 0
+        elapsed = (timezone.now() - last.created_at).total_seconds()
+        return max(0, math.ceil(cooldown - elapsed))
+
+    def verify(self, phone, code):
+        record = self._last(phone)
+        if not record or not record.is_valid(window_minutes=otp_ttl() / 60):
+            return OTP_MISSING
+        OTPRequest.objects.filter(pk=record.pk).update(attempts=F("attempts") + 1)
+        if record.attempts + 1 > otp_max_attempts():
+            return OTP_LOCKED
+        if not secrets.compare_digest(record.code, str(code)):
+            return OTP_MISMATCH
+        return OTP_OK
+
+    def clear(self, phone):
+        # نُبقي السجلات للتدقيق؛ نكتفي بإبطال الرمز الحالي
+        OTPRequest.objects.filter(phone=phone).update(attempts=otp_max_attempts() + 1)
+
+
+@lru_cache(maxsize=None)
+def get_otp_store() -> BaseOTPStore:
+    """المخزن المحدد في الإعداد OTP_STORE (نسخة واحدة لكل عملية)."""
+    return import_string(getattr(settings, "OTP_STORE", "access.otp.DatabaseOTPStore"))()
@@ -0,0 +1,19 @@
+# access/signals.py
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from myprojabd.counters import increment_counter
+from .models import AccessLog, AccessDailyStat
+
+
+@receiver(post_save, sender=AccessLog, dispatch_uid="access_daily_stat_rollup")
+def rollup_access_log(sender, instance, created, raw=False, **kwargs):
+    """تحديث التجميع اليومي عند كل سجل دخول جديد."""
+    if not created or raw:
+        return
+    increment_counter(
+        AccessDailyStat,
+        day=timezone.localdate(instance.timestamp),
+        action=instance.action,
+    )
@@ -0,0 +1,151 @@
+# access/sms.py
+"""
+إرسال الرسائل النصية في الخلفية.
+
+- مجمّع خيوط (ThreadPoolExecutor) يرسل خارج مسار الطلب؛ الطلب ينتهي بمجرد الإدراج في الطابور.
+- جلسة requests دائمة لكل خيط عامل (keep-alive: بدون TCP/TLS جديد لكل رسالة).
+- إعادة محاولة محدودة مع تراجع أُسّي عند أخطاء الشبكة أو 5xx/429.
+- الطابور محدود (SMS_QUEUE_SIZE)؛ عند امتلائه يُرفض الإدراج فورًا بدل تكدّس الذاكرة.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+UNIFONIC_URL = "https://el.cloud.unifonic.com/rest/SMS/messages"
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class SMSDispatcher:
+    def __init__(
+        self,
+        *,
+        url: str,
+        app_sid: str,
+        sender: str = "OTP",
+        workers: int = 4,
+        queue_size: int = 1000,
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.url = url
+        self.app_sid = app_sid
+        self.sender = sender
+        self.workers = workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms")
+        self.sent = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    # ---------- جلسة HTTP دائمة لكل خيط ----------
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            # إعادة المحاولة نديرها بأنفسنا (مع التراجع)؛ المحوّل للاحتفاظ بالاتصالات فقط
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _reset_session(self) -> None:
+        session = getattr(self._local, "session", None)
+        if session is not None:
+            session.close()
+        self._local.session = None
+
+    # ---------- الإرسال ----------
+    def send(self, phone: str, body: str) -> bool:
+        """إرسال متزامن مع إعادة محاولة محدودة (يُستدعى داخل الخيط العامل)."""
+        payload = {"AppSid": self.app_sid, "Recipient": phone, "Body": body, "SenderID": self.sender}
+        for attempt in range(self.max_retries + 1):
+            try:
+                res = self._session().post(self.url, data=payload, timeout=self.timeout)
+                if res.status_code < 400:
+                    self._count(ok=True)
+                    return True
+                # أخطاء العميل (غير 429) لن تنجح بالإعادة
+                if res.status_code != 429 and res.status_code < 500:
+                    logger.error("SMS rejected (%s) for %s: %s", res.status_code, phone, res.text[:200])
+                    break
+                logger.warning("SMS provider %s (attempt %s)", res.status_code, attempt + 1)
+            except requests.RequestException as e:
+                logger.warning("SMS send error (attempt %s): %s", attempt + 1, e)
+                # اتصال معطوب: إغلاق مقابس الجلسة ثم جلسة جديدة في المحاولة التالية
+                self._reset_session()
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() / 2))
+        self._count(ok=False)
+        return False
+
+    def enqueue(self, phone: str, body: str) -> Future | None:
+        """إدراج الرسالة في الطابور والعودة فورًا؛ None إذا كان الطابور ممتلئًا."""
+        if not self._slots.acquire(blocking=False):
+            logger.error("SMS queue full; dropping message to %s", phone)
+            return None
+        try:
+            future = self._executor.submit(self.send, phone, body)
+        except RuntimeError:  # المجمّع مُغلق
+            self._slots.release()
+            return None
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _count(self, *, ok: bool) -> None:
+        with self._stats_lock:
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+
+_dispatcher: SMSDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def dispatcher_from_settings(**overrides) -> SMSDispatcher:
+    options = {
+        "url": _setting("SMS_PROVIDER_URL", UNIFONIC_URL),
+        "app_sid": _setting("UNIFONIC_API_KEY", ""),
+        "sender": _setting("UNIFONIC_SENDER", "OTP"),
+        "workers": _setting("SMS_WORKERS", 4),
+        "queue_size": _setting("SMS_QUEUE_SIZE", 1000),
+        "timeout": _setting("SMS_TIMEOUT_SECONDS", 10),
+        "max_retries": _setting("SMS_MAX_RETRIES", 3),
+    }
+    return SMSDispatcher(**{**options, **overrides})
+
+
+def get_dispatcher() -> SMSDispatcher:
+    """الموزّع المشترك للعملية (يُنشأ عند أول استخدام)."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = dispatcher_from_settings()
+                # تفريغ الطابور قبل خروج العملية
+                atexit.register(_dispatcher.shutdown)
+    return _dispatcher
@@ -1,3 +1,461 @@
-from django.test import TestCase
+import contextlib
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from myprojabd.lru import LRUCache
+from . import otp
+from .checks import otp_store_check, session_engine_check
+from .models import AccessDailyStat, AccessLog, OTPRequest, UserAgent, UserProfile
+from .sms import SMSDispatcher
+
+
+class ConcurrentAuditWritesTests(TransactionTestCase):
+    """كتّاب متوازون لسجل الدخول (مع تحديث التجميع اليومي) بدون أخطاء "database is locked"."""
+
+    WRITERS = 8
+    WRITES_PER_WRITER = 40
+
+    def tearDown(self):
+        # الجداول تُفرَّغ بعد كل اختبار؛ لا نُبقي معرّفات محفوظة في الذاكرة
+        UserAgent._ids.clear()
+
+    def _writer(self, n, errors):
+        try:
+            for i in range(self.WRITES_PER_WRITER):
+                # قراءة ثم كتابة في نفس المعاملة (get_or_create للمتصفح + السجل):
+                # النمط الذي يفشل فورًا بـ "database is locked" مع المعاملات المؤجلة
+                with transaction.atomic():
+                    AccessLog.objects.create(
+                        user_identifier=f"05{n:02d}{i:06d}",
+                        action=AccessLog.Actions.LOGIN,
+                        user_agent_id=UserAgent.intern(f"agent-{i % 5}"),
+                    )
+        except OperationalError as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    def test_sqlite_uses_wal(self):
+        if connection.vendor != "sqlite" or connection.is_in_memory_db():
+            self.skipTest("خاص بـ SQLite على ملف")
+        with connection.cursor() as cur:
+            cur.execute("PRAGMA journal_mode")
+            self.assertEqual(cur.fetchone()[0].lower(), "wal")
+
+    def test_parallel_writers_do_not_lock(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("قاعدة الذاكرة المشتركة لا تمثل سلوك الأقفال على الملف")
+        errors = []
+        threads = [threading.Thread(target=self._writer, args=(n, errors)) for n in range(self.WRITERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        total = self.WRITERS * self.WRITES_PER_WRITER
+        self.assertEqual(AccessLog.objects.count(), total)
+        stat = AccessDailyStat.objects.get(day=timezone.localdate(), action=AccessLog.Actions.LOGIN)
+        self.assertEqual(stat.count, total)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        # القراءة تجعل "a" الأحدث استخدامًا → "b" يُطرد
+        self.assertEqual(lru.get("a"), 1)
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual((lru.get("a"), lru.get("c"), len(lru)), (1, 3, 2))
+
+    def test_overwrite_and_clear(self):
+        lru = LRUCache(maxsize=2)
+        lru.set("a", 1)
+        lru.set("a", 2)
+        self.assertEqual((lru.get("a"), len(lru)), (2, 1))
+        self.assertEqual(lru.get("missing", "x"), "x")
+        lru.clear()
+        self.assertEqual(len(lru), 0)
+
+
+class UserAgentInternTests(TestCase):
+    def setUp(self):
+        UserAgent._ids.clear()
+        self.addCleanup(UserAgent._ids.clear)
+
+    def test_empty_is_none(self):
+        self.assertIsNone(UserAgent.intern(None))
+        self.assertIsNone(UserAgent.intern(""))
+        self.assertFalse(UserAgent.objects.exists())
+
+    def test_one_row_per_value_and_cached_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = UserAgent.intern("Mozilla/5.0")
+        self.assertEqual(UserAgent.objects.get(pk=pk).value, "Mozilla/5.0")
+        with self.assertNumQueries(0):
+            self.assertEqual(UserAgent.intern("Mozilla/5.0"), pk)
+        self.assertEqual(UserAgent.objects.count(), 1)
+
+    def test_long_values_truncated_to_column(self):
+        pk = UserAgent.intern("x" * 400)
+        self.assertEqual(UserAgent.intern("x" * 255), pk)
+        self.assertEqual(len(UserAgent.objects.get(pk=pk).value), 255)
+
+    def test_rolled_back_id_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            UserAgent.intern("curl/8")
+        # المعاملة لم تُثبَّت بعد: لا شيء في الذاكرة
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(UserAgent._ids.get("curl/8"))
+
+
+class UserAgentMigrationTests(TransactionTestCase):
+    """ترحيل نقل السلاسل إلى جدول UserAgent (ذهابًا وإيابًا) بتحديث على مستوى المجموعة."""
+
+    before = [("access", "0005_accessdailystat"), ("lookup", "0006_lookuphistory_lookup_look_query_v_60fbd0_idx")]
+    after = [("access", "0006_useragent_intern"), ("lookup", "0007_lookuphistory_user_agent_intern")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        UserAgent._ids.clear()
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_forward_and_back(self):
+        apps = self.migrate(self.before)
+        OldLog = apps.get_model("access", "AccessLog")
+        OldHistory = apps.get_model("lookup", "LookupHistory")
+        long_ua = "L" * 300
+        for i, ua in enumerate(["a", "b", "a", None, "", long_ua]):
+            OldLog.objects.create(user_identifier=f"u{i}", user_agent=ua)
+        for ua in ["b", "c", ""]:
+            OldHistory.objects.create(query_type="phone", query_value="0500000000", user_agent=ua)
+
+        apps = self.migrate(self.after)
+        Log = apps.get_model("access", "AccessLog")
+        History = apps.get_model("lookup", "LookupHistory")
+        Agent = apps.get_model("access", "UserAgent")
+        self.assertEqual(sorted(Agent.objects.values_list("value", flat=True)), ["L" * 255, "a", "b", "c"])
+        self.assertEqual(
+            list(Log.objects.order_by("pk").values_list("user_agent__value", flat=True)),
+            ["a", "b", "a", None, None, "L" * 255],
+        )
+        self.assertEqual(
+            list(History.objects.order_by("pk").values_list("user_agent__value", flat=True)),
+            ["b", "c", None],
+        )
+
+        apps = self.migrate(self.before)
+        OldLog = apps.get_model("access", "AccessLog")
+        OldHistory = apps.get_model("lookup", "LookupHistory")
+        self.assertEqual(
+            list(OldLog.objects.order_by("pk").values_list("user_agent", flat=True)),
+            ["a", "b", "a", None, None, "L" * 255],
+        )
+        self.assertEqual(list(OldHistory.objects.order_by("pk").values_list("user_agent", flat=True)), ["b", "c", ""])
+
+
+class OTPStoreContract:
+    """السلوك المشترك لمخزني OTP؛ الصنف الفرعي يحدد store وexpire()."""
+
+    phone = "0551234567"
+
+    def test_issue_and_verify(self):
+        self.store.issue(self.phone, "123456")
+        self.assertEqual(self.store.verify(self.phone, "000000"), otp.OTP_MISMATCH)
+        self.assertEqual(self.store.verify(self.phone, "123456"), otp.OTP_OK)
+        self.assertEqual(self.store.verify("0550000000", "123456"), otp.OTP_MISSING)
+
+    def test_reissue_replaces_code_and_resets_attempts(self):
+        self.store.issue(self.phone, "111111")
+        self.store.verify(self.phone, "000000")
+        self.store.verify(self.phone, "000000")
+        self.store.issue(self.phone, "222222")
+        self.assertEqual(self.store.verify(self.phone, "111111"), otp.OTP_MISMATCH)
+        self.assertEqual(self.store.verify(self.phone, "222222"), otp.OTP_OK)
+
+    def test_attempt_limit_locks_even_the_right_code(self):
+        self.store.issue(self.phone, "123456")
+        for _ in range(3):
+            self.assertEqual(self.store.verify(self.phone, "000000"), otp.OTP_MISMATCH)
+        self.assertEqual(self.store.verify(self.phone, "123456"), otp.OTP_LOCKED)
+
+    def test_expiry(self):
+        self.store.issue(self.phone, "123456")
+        self.assertGreater(self.store.cooldown_remaining(self.phone, 60), 0)
+        with self.expire():
+            self.assertEqual(self.store.verify(self.phone, "123456"), otp.OTP_MISSING)
+
+    def test_clear(self):
+        self.store.issue(self.phone, "123456")
+        self.store.clear(self.phone)
+        self.assertNotEqual(self.store.verify(self.phone, "123456"), otp.OTP_OK)
+
+
+@override_settings(OTP_TTL_SECONDS=300, OTP_MAX_ATTEMPTS=3)
+class CacheOTPStoreTests(OTPStoreContract, SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = otp.CacheOTPStore()
+
+    def expire(self):
+        # الذاكرة المؤقتة تقارن الانتهاء بـ time.time()
+        return mock.patch("time.time", return_value=time.time() + 301)
+
+
+@override_settings(OTP_TTL_SECONDS=300, OTP_MAX_ATTEMPTS=3)
+class DatabaseOTPStoreTests(OTPStoreContract, TestCase):
+    def setUp(self):
+        self.store = otp.DatabaseOTPStore()
+
+    def expire(self):
+        OTPRequest.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+        return contextlib.nullcontext()
+
+    def test_records_kept_for_audit_after_clear(self):
+        self.store.issue(self.phone, "123456")
+        self.store.clear(self.phone)
+        self.assertEqual(OTPRequest.objects.filter(phone=self.phone).count(), 1)
+
+
+class OTPStoreCheckTests(SimpleTestCase):
+    def test_warns_for_cache_store_on_locmem(self):
+        with override_settings(OTP_STORE="access.otp.CacheOTPStore"):
+            self.assertEqual([e.id for e in otp_store_check(None)], ["access.W001"])
+        with override_settings(OTP_STORE="access.otp.DatabaseOTPStore"):
+            self.assertEqual(otp_store_check(None), [])
+
+
+class _ScriptedSMSServer:
+    """خادم HTTP محلي يرد بالحالات المحددة بالترتيب (ثم 200)، على غرار fake_sms_server."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                outer.requests.append(self.path)
+                status = outer.statuses.pop(0) if outer.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/rest/SMS/messages"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SMSDispatcherTests(SimpleTestCase):
+    def dispatcher(self, statuses, **kwargs):
+        server = _ScriptedSMSServer(statuses)
+        self.addCleanup(server.close)
+        options = {"url": server.url, "app_sid": "test", "workers": 1, "max_retries": 3, "backoff": 0.5, "timeout": 5}
+        d = SMSDispatcher(**{**options, **kwargs})
+        self.addCleanup(d.shutdown)
+        return d, server
+
+    @mock.patch("access.sms.random.random", return_value=0)
+    @mock.patch("access.sms.time.sleep")
+    def test_retries_5xx_and_429_with_exponential_backoff(self, sleep, _random):
+        d, server = self.dispatcher([503, 429, 500])
+        with self.assertLogs("access.sms", "WARNING"):
+            self.assertTrue(d.send("0551234567", "رمزك 123456"))
+        self.assertEqual(len(server.requests), 4)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0, 2.0])
+        self.assertEqual((d.sent, d.failed), (1, 0))
+
+    @mock.patch("access.sms.time.sleep")
+    def test_gives_up_after_max_retries(self, sleep):
+        d, server = self.dispatcher([503] * 10, max_retries=2)
+        with self.assertLogs("access.sms", "WARNING"):
+            self.assertFalse(d.send("0551234567", "x"))
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual((d.sent, d.failed), (0, 1))
+
+    @mock.patch("access.sms.time.sleep")
+    def test_no_retry_on_4xx(self, sleep):
+        d, server = self.dispatcher([400])
+        with self.assertLogs("access.sms", "ERROR"):
+            self.assertFalse(d.send("0551234567", "x"))
+        self.assertEqual(len(server.requests), 1)
+        sleep.assert_not_called()
+
+    @mock.patch("access.sms.time.sleep")
+    def test_network_error_closes_and_replaces_session(self, sleep):
+        d, server = self.dispatcher([])
+        broken = mock.Mock(post=mock.Mock(side_effect=requests.ConnectionError("reset")))
+        d._local.session = broken
+        with self.assertLogs("access.sms", "WARNING"):
+            self.assertTrue(d.send("0551234567", "x"))
+        broken.close.assert_called_once()
+        self.assertIsNot(d._local.session, broken)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_queue_full_rejects_immediately(self):
+        d, _server = self.dispatcher([], queue_size=1)
+        release = threading.Event()
+        with mock.patch.object(d, "send", side_effect=lambda *a: release.wait(5)):
+            first = d.enqueue("0551234567", "x")
+            self.assertIsNotNone(first)
+            with self.assertLogs("access.sms", "ERROR"):
+                self.assertIsNone(d.enqueue("0551234568", "y"))
+            release.set()
+            first.result(timeout=5)
+            # المقعد يتحرر بعد انتهاء الإرسال
+            second = d.enqueue("0551234569", "z")
+            self.assertIsNotNone(second)
+            second.result(timeout=5)
+
+
+@override_settings(OTP_STORE="access.otp.DatabaseOTPStore")
+class SignupFlowTests(TestCase):
+    phone = "0551234567"
+    password = "Str0ng-pass-2026"
+
+    def setUp(self):
+        otp.get_otp_store.cache_clear()
+        self.addCleanup(otp.get_otp_store.cache_clear)
+        patcher = mock.patch("access.views.send_otp_sms", return_value=True)
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def signup(self):
+        with mock.patch.object(OTPRequest, "generate_code", return_value="654321"):
+            return self.client.post(reverse("access:signup"), {
+                "phone": self.phone, "national_id": "1012345678", "password": self.password,
+            })
+
+    def test_signup_then_verify_creates_user_with_working_password(self):
+        self.assertRedirects(self.signup(), reverse("access:verify_otp"), fetch_redirect_response=False)
+        self.send.assert_called_once_with(self.phone, "654321")
+        pending = self.client.session["pending_signup"]
+        # الجلسة تحمل التجزئة فقط، لا النص الخام
+        self.assertNotIn(self.password, str(pending))
+
+        response = self.client.post(reverse("access:verify_otp"), {"code": "654321"})
+        self.assertRedirects(response, "/lookup/", fetch_redirect_response=False)
+        user = get_user_model().objects.get(username=self.phone)
+        self.assertEqual(authenticate(username=self.phone, password=self.password), user)
+        self.assertEqual(UserProfile.objects.get(user=user).national_id, "1012345678")
+        self.assertNotIn("pending_signup", self.client.session)
+        self.assertEqual(int(self.client.session["_auth_user_id"]), user.pk)
+
+    def test_wrong_code_creates_nothing(self):
+        self.signup()
+        self.client.post(reverse("access:verify_otp"), {"code": "000000"})
+        self.assertFalse(get_user_model().objects.filter(username=self.phone).exists())
+        self.assertIn("pending_signup", self.client.session)
+
+    def test_signed_cookie_sessions_refused(self):
+        self.assertEqual(session_engine_check(None), [])
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"):
+            self.assertEqual([e.id for e in session_engine_check(None)], ["access.E001"])
+
+
+class PurgeExpiredTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        old = now - timedelta(hours=2)
+        OTPRequest.objects.bulk_create(OTPRequest(phone=f"05500000{i:02d}", code="1", created_at=old) for i in range(7))
+        self.live_otp = [OTPRequest.objects.create(phone="0559999999", code="2").pk for _ in range(2)]
+        Session.objects.bulk_create(
+            Session(session_key=f"old{i:02d}", session_data="", expire_date=now - timedelta(minutes=1)) for i in range(5)
+        )
+        Session.objects.bulk_create(
+            Session(session_key=f"live{i}", session_data="", expire_date=now + timedelta(days=1)) for i in range(2)
+        )
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command("purge_expired", "--batch-size", "3", "--sleep", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_expired_in_batches_and_keeps_live_rows(self):
+        out = self.purge()
+        self.assertEqual(sorted(OTPRequest.objects.values_list("pk", flat=True)), self.live_otp)
+        self.assertEqual(sorted(Session.objects.values_list("session_key", flat=True)), ["live0", "live1"])
+        # 7 رموز على دفعات من 3 → 3 نطاقات؛ 5 جلسات → دفعتان
+        self.assertEqual(out.count("OTP: ["), 3)
+        self.assertEqual(out.count("الجلسات: دفعة"), 2)
+
+    def test_dry_run_deletes_nothing(self):
+        out = self.purge("--dry-run")
+        self.assertIn(": 7", out)
+        self.assertEqual(OTPRequest.objects.count(), 9)
+        self.assertEqual(Session.objects.count(), 7)
+
+
+class PasswordRehashTests(TestCase):
+    phone = "0551234567"
+    password = "Str0ng-pass-2026"
+
+    def login(self):
+        return self.client.post(reverse("access:login"), {"phone": self.phone, "password": self.password})
+
+    def stored(self):
+        return get_user_model().objects.get(username=self.phone).password
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_raising_pbkdf2_iterations_rehashes_on_next_login(self):
+        get_user_model().objects.create_user(self.phone, password=self.password)
+        self.assertTrue(self.stored().startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertRedirects(self.login(), "/lookup/", fetch_redirect_response=False)
+            self.assertTrue(self.stored().startswith("pbkdf2_sha256$2000$"))
+            self.assertIsNotNone(authenticate(username=self.phone, password=self.password))
+
+    @override_settings(
+        PASSWORD_HASHERS=["access.hashers.TunableScryptPasswordHasher"],
+        PASSWORD_SCRYPT_WORK_FACTOR=2**10,
+    )
+    def test_raising_scrypt_work_factor_rehashes_on_next_login(self):
+        get_user_model().objects.create_user(self.phone, password=self.password)
+        self.assertTrue(self.stored().startswith("scrypt$1024$"))
+        with override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2**11):
+            self.assertRedirects(self.login(), "/lookup/", fetch_redirect_response=False)
+            self.assertTrue(self.stored().startswith("scrypt$2048$"))
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_failed_login_does_not_rehash(self):
+        get_user_model().objects.create_user(self.phone, password=self.password)
+        before = self.stored()
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.client.post(reverse("access:login"), {"phone": self.phone, "password": "wrong"})
+        self.assertEqual(self.stored(), before)
@@ -3,6 +3,7 @@ from django.urls import path
 from django.views.generic import RedirectView
 from django.contrib.auth import views as auth_views
 
+from .forms import PasswordResetForm
 from .views import signup_view, verify_otp_view, login_view, logout_view
 
 app_name = "access"
@@ -21,6 +22,7 @@ urlpatterns = [
     path(
         "password-reset/",
         auth_views.PasswordResetView.as_view(
+            form_class=PasswordResetForm,   # إرسال دفعي عبر notifications.mail
             template_name="access/password_reset_form.html",
             email_template_name="access/password_reset_email.txt",
             subject_template_name="access/password_reset_subject.txt",
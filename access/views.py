@@ -1,15 +1,17 @@
 # access/views.py
 import os
-import requests
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction, IntegrityError
 from django.shortcuts import render, redirect
 from django.utils import timezone
 
-from .models import UserProfile, AccessLog, OTPRequest
+from .models import UserProfile, AccessLog, OTPRequest, UserAgent
+from .otp import OTP_LOCKED, OTP_MISSING, OTP_OK, get_otp_store
+from .sms import get_dispatcher
 
 # -------------------- إعدادات عامة --------------------
 OTP_RESEND_COOLDOWN_SECONDS = 60
@@ -35,37 +37,34 @@ def otp_bypass_enabled() -> bool:
 
 def send_otp_sms(phone: str, code: str) -> bool:
     """
-    إرسال OTP عبر Unifonic.
+    إرسال OTP عبر Unifonic في الخلفية (access.sms).
     - إذا وضع التجربة مفعّل، نرجّع True بدون إرسال فعلي.
+    - يرجع True بمجرد إدراج الرسالة في الطابور (لا ننتظر مزوّد الخدمة).
     يلزم (للإرسال الحقيقي):
       UNIFONIC_API_KEY
       UNIFONIC_SENDER (اختياري، الافتراضي 'OTP')
+      SMS_PROVIDER_URL (اختياري؛ لتوجيه الإرسال لخادم تجريبي محلي)
     """
     if otp_bypass_enabled():
         # وضع التطوير: لا ترسل شيء، اعتبره نجح
         print(f"[DEV] OTP for {phone}: {code}")
         return True
 
-    api_key = os.environ.get("UNIFONIC_API_KEY")
-    sender = os.environ.get("UNIFONIC_SENDER", "OTP")
-    if not api_key:
+    if not settings.UNIFONIC_API_KEY:
         print("[ERROR] UNIFONIC_API_KEY غير مضبوط")
         return False
 
-    try:
-        url = "https://el.cloud.unifonic.com/rest/SMS/messages"
-        payload = {
-            "AppSid": api_key,
-            "Recipient": phone,
-            "Body": f"رمز التحقق الخاص بك: {code}",
-            "SenderID": sender,
-        }
-        res = requests.post(url, data=payload, timeout=10)
-        res.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"[ERROR] فشل إرسال OTP عبر Unifonic: {e}")
-        return False
+    return get_dispatcher().enqueue(phone, f"رمز التحقق الخاص بك: {code}") is not None
+
+
+def _log_access(request, identifier: str, action: str) -> None:
+    """تسجيل حدث في AccessLog (يُحدَّث التجميع اليومي تلقائيًا عبر الإشارات)."""
+    AccessLog.objects.create(
+        user_identifier=identifier,
+        action=action,
+        ip_address=request.META.get("REMOTE_ADDR"),
+        user_agent_id=UserAgent.intern(request.META.get("HTTP_USER_AGENT")),
+    )
 
 
 def phone_valid(phone: str) -> bool:
@@ -108,17 +107,17 @@ def signup_view(request):
             return redirect("access:login")
 
         # تبريد إعادة الإرسال
-        last = OTPRequest.objects.filter(phone=phone).order_by("-created_at").first()
-        if last and (timezone.now() - last.created_at).total_seconds() < OTP_RESEND_COOLDOWN_SECONDS:
-            remaining = OTP_RESEND_COOLDOWN_SECONDS - int((timezone.now() - last.created_at).total_seconds())
+        otp_store = get_otp_store()
+        remaining = otp_store.cooldown_remaining(phone, OTP_RESEND_COOLDOWN_SECONDS)
+        if remaining:
             messages.error(request, f"انتظر {remaining} ثانية قبل طلب رمز جديد.")
             return render(request, "access/signup.html")
 
-        # حفظ البيانات مؤقتاً في الجلسة
+        # حفظ البيانات مؤقتاً في الجلسة (كلمة المرور مُجزّأة، لا نخزن النص الخام أبدًا)
         request.session["pending_signup"] = {
             "phone": phone,
             "national_id": national_id,
-            "password": password,
+            "password_hash": make_password(password),
             "ts": timezone.now().isoformat(),
         }
 
@@ -126,7 +125,7 @@ def signup_view(request):
         code = OTPRequest.generate_code()
         if otp_bypass_enabled():
             code = OTP_DEV_CODE  # كود ثابت للتجارب
-        OTPRequest.objects.create(phone=phone, code=code)
+        otp_store.issue(phone, code)
 
         if not send_otp_sms(phone, code):
             messages.error(request, "تعذر إرسال رمز التحقق. حاول لاحقًا.")
@@ -141,24 +140,24 @@ def signup_view(request):
 # -------------------- التحقق من OTP --------------------
 def verify_otp_view(request):
     pending = request.session.get("pending_signup")
-    if not pending:
+    if not pending or "password_hash" not in pending:
         messages.error(request, "انتهت الجلسة. ابدأ التسجيل من جديد.")
         return redirect("access:signup")
 
     phone = pending["phone"]
+    otp_store = get_otp_store()
 
     # إعادة إرسال
     if request.method == "POST" and request.POST.get("resend") == "1":
-        last = OTPRequest.objects.filter(phone=phone).order_by("-created_at").first()
-        if last and (timezone.now() - last.created_at).total_seconds() < OTP_RESEND_COOLDOWN_SECONDS:
-            remaining = OTP_RESEND_COOLDOWN_SECONDS - int((timezone.now() - last.created_at).total_seconds())
+        remaining = otp_store.cooldown_remaining(phone, OTP_RESEND_COOLDOWN_SECONDS)
+        if remaining:
             messages.error(request, f"انتظر {remaining} ثانية قبل طلب رمز جديد.")
             return redirect("access:verify_otp")
 
         code = OTPRequest.generate_code()
         if otp_bypass_enabled():
             code = OTP_DEV_CODE
-        OTPRequest.objects.create(phone=phone, code=code)
+        otp_store.issue(phone, code)
 
         if not send_otp_sms(phone, code):
             messages.error(request, "تعذر إرسال رمز التحقق.")
@@ -170,24 +169,26 @@ def verify_otp_view(request):
     # تحقق من الرمز المدخل
     if request.method == "POST" and request.POST.get("resend") != "1":
         code = (request.POST.get("code") or "").strip()
-        record = OTPRequest.objects.filter(phone=phone).order_by("-created_at").first()
+        # في وضع التطوير يكون الرمز المحفوظ هو الكود الثابت
+        result = otp_store.verify(phone, code)
 
-        if not record or not record.is_valid():
+        if result == OTP_MISSING:
             messages.error(request, "الرمز غير صالح أو منتهي.")
             return redirect("access:verify_otp")
-
-        # في وضع التطوير نقبل الكود الثابت
-        expected = OTP_DEV_CODE if otp_bypass_enabled() else record.code
-        if expected != code:
+        if result == OTP_LOCKED:
+            messages.error(request, "تجاوزت عدد المحاولات المسموح. اطلب رمزًا جديدًا.")
+            return redirect("access:verify_otp")
+        if result != OTP_OK:
             messages.error(request, "رمز التحقق غير صحيح.")
             return redirect("access:verify_otp")
 
         # إنشاء المستخدم
         try:
             with transaction.atomic():
-                user = User.objects.create_user(
+                # كلمة المرور مُجزّأة مسبقًا في signup_view
+                user = User.objects.create(
                     username=phone,
-                    password=pending["password"],
+                    password=pending["password_hash"],
                 )
                 UserProfile.objects.create(
                     user=user,
@@ -201,14 +202,10 @@ def verify_otp_view(request):
         # تسجيل الدخول مباشرة
         login(request, user)
         request.session.pop("pending_signup", None)
+        otp_store.clear(phone)
 
         # تسجيل الحدث
-        AccessLog.objects.create(
-            user_identifier=phone,
-            action=AccessLog.Actions.LOGIN,
-            ip_address=request.META.get("REMOTE_ADDR"),
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
-        )
+        _log_access(request, phone, AccessLog.Actions.LOGIN)
 
         messages.success(request, "تم إنشاء الحساب وتسجيل الدخول.")
         return redirect("/lookup/")
@@ -228,17 +225,13 @@ def login_view(request):
 
         user = authenticate(request, username=phone, password=password)
         if not user:
+            _log_access(request, phone, AccessLog.Actions.FAIL)
             messages.error(request, "بيانات الدخول غير صحيحة.")
             return render(request, "access/login.html")
 
         login(request, user)
 
-        AccessLog.objects.create(
-            user_identifier=phone,
-            action=AccessLog.Actions.LOGIN,
-            ip_address=request.META.get("REMOTE_ADDR"),
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
-        )
+        _log_access(request, phone, AccessLog.Actions.LOGIN)
 
         messages.success(request, "تم تسجيل الدخول بنجاح ✅")
         return redirect("/lookup/")
@@ -1,10 +1,55 @@
 from django.contrib import admin
-from .models import LookupHistory
+
+from myprojabd.admin_utils import LargeTableAdminMixin, RollupDateFilter
+from .models import Customer, LookupHistory, LookupDailyStat, Service, normalize_name
+
+
+class LookupDayFilter(RollupDateFilter):
+    rollup_model = LookupDailyStat
+
 
 @admin.register(LookupHistory)
-class LookupHistoryAdmin(admin.ModelAdmin):
+class LookupHistoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("query_type", "query_value", "result_found", "timestamp")
-    list_filter = ("query_type", "result_found", "timestamp")
-    search_fields = ("query_value",)
-    ordering = ("-timestamp",)
+    # الأيام من جدول التجميع بدل فلتر timestamp الافتراضي
+    list_filter = ("query_type", "result_found", LookupDayFilter)
+    # بحث بالفهرس: تطابق تام/بادئة على قيمة البحث
+    search_fields = ("^query_value",)
+    ordering = ("-pk",)
     readonly_fields = ("timestamp",)
+
+
+@admin.register(Customer)
+class CustomerAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("full_name", "account_no", "meter_no", "national_id", "mobile", "unit_code")
+    # بحث بالبادئة على المعرّفات المفهرسة + الاسم المُطبَّع (يخدم أيضًا autocomplete)
+    search_fields = ("^account_no", "^meter_no", "^national_id", "^mobile", "^unit_code", "^search_name")
+    # الترتيب الافتراضي للموديل بالاسم يتطلب فرز الجدول كاملًا؛ المفتاح الأساسي أسرع
+    ordering = ("pk",)
+    readonly_fields = ("search_name",)
+
+    def get_changelist(self, request, **kwargs):
+        # قائمة العملاء تجلب أعمدة العرض فقط؛ صفحة التعديل تبقى كاملة
+        base = super().get_changelist(request, **kwargs)
+        columns = ("id", *self.list_display)
+
+        class TrimmedChangeList(base):
+            def get_queryset(self, request, exclude_parameters=None):
+                return super().get_queryset(request, exclude_parameters).only(*columns)
+
+        return TrimmedChangeList
+
+    def normalize_search_term(self, field, term):
+        if field == "search_name":
+            return normalize_name(term)
+        # المعرّفات بدون مسافات
+        return term.replace(" ", "")
+
+
+@admin.register(Service)
+class ServiceAdmin(admin.ModelAdmin):
+    list_display = ("key", "title", "enabled", "position", "updated_at")
+    list_editable = ("enabled", "position")
+    list_filter = ("enabled",)
+    search_fields = ("key", "title")
+    readonly_fields = ("updated_at",)
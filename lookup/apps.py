@@ -5,3 +5,7 @@ class LookupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lookup'
     verbose_name = _('استدعاء البيانات')
+
+    def ready(self):
+        # تسجيل مستقبلات الإشارات (تحديث التجميعات اليومية)
+        from . import signals  # noqa: F401
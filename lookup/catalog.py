@@ -0,0 +1,138 @@
+# lookup/catalog.py
+"""
+سجل الخدمات: جدول Service يُحمَّل مرة واحدة لكل عملية ويُحفظ في الذاكرة جاهزًا للعرض —
+الروابط محلولة مسبقًا (reverse مرة لكل خدمة) والعناوين مترجمة لكل لغة في LANGUAGES،
+والتحقق من المفتاح بحث في قاموس.
+
+الإبطال برقم إصدار في الذاكرة المؤقتة الافتراضية: أي حفظ/حذف لخدمة (lookup/signals.py) يغيّر
+الإصدار بعد تثبيت المعاملة، وكل عملية تقارن إصدارها به في كل استخدام (قراءة واحدة من الذاكرة
+المؤقتة) فتعيد التحميل عند الاختلاف. مع ذاكرة مؤقتة لكل عملية (locmem) لا ترى العمليات الأخرى
+الإصدار الجديد؛ لذلك يُعاد التحميل أيضًا بعد SERVICE_CATALOG_MAX_AGE ثانية مهما كان.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.urls import reverse
+from django.utils import translation
+from django.utils.translation import gettext_noop
+
+from .models import Service
+
+VERSION_KEY = "lookup:catalog:version"
+
+# عناوين وأوصاف الخدمات المبذورة (lookup/migrations/0010_service_catalog.py): النص في القاعدة
+# هو msgid لـ gettext، وهذه القائمة تُبقيها ظاهرة لـ makemessages. خدمة جديدة من لوحة الإدارة
+# تُضاف هنا أيضًا إن أُريدت ترجمتها.
+SEEDED_MESSAGES = (
+    gettext_noop("طلب نقل عداد"),
+    gettext_noop("نقل عداد الكهرباء/المياه."),
+    gettext_noop("طلب تسديد مديونية"),
+    gettext_noop("سداد المديونيات بشكل آمن."),
+    gettext_noop("طلب يدوي (نقل ملكية – تصحيح بيانات – طلب دعم…)"),
+    gettext_noop("طلبات متنوعة تُستلم يدويًا."),
+    gettext_noop("طلب توثيق الحساب"),
+    gettext_noop("توثيق وربط الحساب بالمستخدم."),
+    gettext_noop("طلب تفعيل الخدمة"),
+    gettext_noop("تفعيل خدمة الكهرباء/المياه."),
+    gettext_noop("تحديث بيانات المستفيد"),
+    gettext_noop("تعديل بيانات التواصل."),
+    gettext_noop("بلاغ أو استفسار يدوي"),
+    gettext_noop("إنشاء بلاغ/استفسار ومتابعته."),
+)
+
+
+@dataclass(frozen=True)
+class ServiceItem:
+    """خدمة جاهزة للعرض بلغة واحدة."""
+    key: str
+    title: str
+    desc: str
+    href: str
+
+
+class Catalog:
+    def __init__(self, version: str, services: list[Service]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # يتغير مع كل تحميل (إصدار جديد أو انقضاء SERVICE_CATALOG_MAX_AGE): مفتاح لما يُخزَّن من عرضه
+        self.load_id = uuid.uuid4().hex
+        self.languages = [code for code, _name in settings.LANGUAGES]
+        items: dict[str, dict[str, ServiceItem]] = {code: {} for code in self.languages}
+        for s in services:
+            href = reverse("lookup:service_request", args=[s.key])
+            for code in self.languages:
+                with translation.override(code):
+                    desc = translation.gettext(s.description) if s.description else ""
+                    items[code][s.key] = ServiceItem(s.key, translation.gettext(s.title), desc, href)
+        # كل الخدمات (للعناوين في الطلبات القديمة) والمفعّلة فقط بالترتيب (للعرض والتحقق)
+        self._all = items
+        self._enabled = {
+            code: {s.key: by_key[s.key] for s in services if s.enabled} for code, by_key in items.items()
+        }
+        self._lists = {code: tuple(by_key.values()) for code, by_key in self._enabled.items()}
+
+    def _language(self, language: str | None) -> str:
+        language = language or translation.get_language() or settings.LANGUAGE_CODE
+        if language in self._all:
+            return language
+        base = language.split("-")[0]
+        return base if base in self._all else self.languages[0]
+
+    def services(self, language: str | None = None) -> tuple[ServiceItem, ...]:
+        """الخدمات المفعّلة بالترتيب."""
+        return self._lists[self._language(language)]
+
+    def get(self, key: str, language: str | None = None) -> ServiceItem | None:
+        """الخدمة المفعّلة بهذا المفتاح، أو None."""
+        return self._enabled[self._language(language)].get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._enabled[self.languages[0]]
+
+    def title(self, key: str, language: str | None = None) -> str:
+        """عنوان الخدمة حتى لو أُوقفت (أو المفتاح نفسه إن حُذفت)."""
+        item = self._all[self._language(language)].get(key)
+        return item.title if item else key
+
+
+_catalog: Catalog | None = None
+_lock = threading.Lock()
+
+
+def version() -> str:
+    """الإصدار الحالي للكتالوج المشترك بين العمليات (عبر الذاكرة المؤقتة الافتراضية)."""
+    return cache.get_or_set(VERSION_KEY, lambda: uuid.uuid4().hex, timeout=None)
+
+
+def invalidate() -> None:
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def _fresh(catalog: Catalog | None, current: str) -> bool:
+    max_age = getattr(settings, "SERVICE_CATALOG_MAX_AGE", 300)
+    return catalog is not None and catalog.version == current and time.monotonic() - catalog.loaded_at < max_age
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    current = version()
+    catalog = _catalog
+    if not _fresh(catalog, current):
+        with _lock:
+            catalog = _catalog
+            if not _fresh(catalog, current):
+                # من القاعدة الأساسية: لا نخزّن نسخة قديمة من نسخة قراءة متأخرة تحت الإصدار الجديد
+                db = router.db_for_write(Service)
+                catalog = _catalog = Catalog(current, list(Service.objects.using(db).order_by("position", "key")))
+    return catalog
+
+
+def service_title(key: str, language: str | None = None) -> str:
+    return get_catalog().title(key, language)
@@ -0,0 +1,227 @@
+# lookup/exports.py
+"""
+تصدير سجلات التدقيق (LookupHistory / AccessLog) بذاكرة ثابتة.
+
+- القراءة على دفعات بترقيم المفتاح (keyset) على id تنازليًا: لا OFFSET ولا مؤشر مفتوح طويل.
+- كل دفعة عبر values_list (بدون إنشاء كائنات موديل).
+- CSV يُبث مباشرة (مع ضغط gzip اختياري)، وXLSX يُكتب بوضع write_only (أوراق متعددة بعد حد الورقة).
+- النصوص التي تبدأ بـ = + - @ أو tab/CR تُسبق بـ ' حتى لا يفسّرها Excel معادلة.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from datetime import date, datetime, time
+from typing import Iterable, Iterator, Sequence
+
+from django.utils import timezone
+
+from access.models import AccessLog
+from .filters import filter_history
+from .models import LookupHistory
+
+# حجم الدفعة الواحدة من قاعدة البيانات
+CHUNK = 5000
+
+# حجم المخزن المؤقت قبل إرسال البايتات للعميل
+FLUSH_BYTES = 64 * 1024
+
+# حد XLSX لكل ورقة (مع صف الرؤوس)؛ ما زاد يُكمل في ورقة تالية
+XLSX_MAX_ROWS = 1_048_576
+
+# XLSX يُبنى كاملًا قبل أول بايت: عبر HTTP لا يُسمح إلا بما دون هذا الحد (الأكبر: CSV أو export_audit)
+XLSX_HTTP_MAX_ROWS = 100_000
+
+# بداية نص يفسّرها Excel/LibreOffice معادلةً (CSV/formula injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+# ===================== تعريف الجداول القابلة للتصدير =====================
+
+HISTORY_COLUMNS = (
+    ("id", "#"),
+    ("timestamp", "الوقت"),
+    ("user__username", "المستخدم"),
+    ("query_type", "نوع المعرّف"),
+    ("query_value", "القيمة"),
+    ("full_name", "الاسم"),
+    ("meter_number", "رقم العداد"),
+    ("account_number", "رقم الحساب"),
+    ("national_id", "رقم الهوية"),
+    ("phone", "رقم الجوال"),
+    ("unit_code", "كود الوحدة"),
+    ("email", "البريد الإلكتروني"),
+    ("action", "نوع العملية"),
+    ("result_found", "النتيجة"),
+    ("message", "رسالة النظام"),
+    ("ip_address", "عنوان IP"),
+    ("user_agent__value", "المتصفح/العميل"),
+)
+
+ACCESS_COLUMNS = (
+    ("id", "#"),
+    ("timestamp", "الوقت"),
+    ("user_identifier", "معرّف المستخدم"),
+    ("action", "الإجراء"),
+    ("ip_address", "عنوان IP"),
+    ("user_agent__value", "متصفح/عميل"),
+)
+
+
+def _parse_day(value) -> date | None:
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _apply_period(qs, params):
+    """فلترة الفترة (since/until بصيغة YYYY-MM-DD) على العمود المفهرس timestamp."""
+    since, until = _parse_day(params.get("since")), _parse_day(params.get("until"))
+    if since:
+        qs = qs.filter(timestamp__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until:
+        qs = qs.filter(timestamp__lte=timezone.make_aware(datetime.combine(until, time.max)))
+    return qs
+
+
+def history_queryset(params):
+    """نفس فلاتر lookup_history_view (q / type / found) + الفترة."""
+    qs, *_ = filter_history(LookupHistory.objects.all(), params)
+    return _apply_period(qs, params)
+
+
+def access_queryset(params):
+    """فلاتر سجل الدخول: q (بادئة المعرّف) / action + الفترة."""
+    qs = AccessLog.objects.all()
+    qtext = (params.get("q") or "").strip()
+    action = (params.get("action") or "").strip()
+    if qtext:
+        qs = qs.filter(user_identifier__startswith=qtext)
+    if action:
+        qs = qs.filter(action=action)
+    return _apply_period(qs, params)
+
+
+# الاسم المستخدم في الرابط/الأمر → (دالة QuerySet، الأعمدة، اسم الملف)
+EXPORTS = {
+    "history": (history_queryset, HISTORY_COLUMNS, "lookup_history"),
+    "access": (access_queryset, ACCESS_COLUMNS, "access_log"),
+}
+
+
+# ===================== قراءة الصفوف على دفعات =====================
+
+def iter_rows(qs, fields: Sequence[str], *, chunk_size: int = CHUNK) -> Iterator[tuple]:
+    """
+    قراءة الصفوف بترتيب id تنازلي على دفعات (keyset pagination).
+    كل دفعة استعلام مستقل قصير؛ الذاكرة ثابتة مهما كان عدد الصفوف.
+    """
+    fields = list(fields)
+    if fields[0] != "id":
+        fields.insert(0, "id")
+        strip_id = True
+    else:
+        strip_id = False
+
+    base = qs.order_by("-id").values_list(*fields)
+    last_id = None
+    while True:
+        page = base if last_id is None else base.filter(id__lt=last_id)
+        batch = list(page[:chunk_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        for row in batch:
+            yield row[1:] if strip_id else row
+        if len(batch) < chunk_size:
+            return
+
+
+def _cell(value):
+    """تحويل القيمة لنص مناسب للتصدير."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S") if timezone.is_aware(value) else value.isoformat(" ")
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        # قيم يُدخلها المستخدم (الاسم، القيمة، المتصفح): تُعرض نصًا ولا تُنفَّذ معادلةً
+        return "'" + value
+    return value
+
+
+def exceeds(name: str, params, limit: int) -> bool:
+    """هل يزيد عدد صفوف التصدير عن limit؟ (عدّ محدود بـ LIMIT لا يمسح الجدول كله)"""
+    qs_func, _columns, _filename = EXPORTS[name]
+    return qs_func(params).order_by()[:limit + 1].count() > limit
+
+
+# ===================== CSV (بث مباشر) =====================
+
+def iter_csv(header: Sequence[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """توليد CSV كبايتات UTF-8 (مع BOM ليقرأه Excel بالعربية) على شكل كتل."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_cell(v) for v in row])
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """ضغط تدفق البايتات بصيغة gzip دون تحميله كاملًا في الذاكرة."""
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = رأس/ذيل gzip
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+# ===================== XLSX =====================
+
+def write_xlsx(fileobj, header: Sequence[str], rows: Iterable[tuple], *, title: str = "export",
+               sheet_rows: int = XLSX_MAX_ROWS) -> None:
+    """
+    كتابة XLSX بوضع write_only (الصفوف لا تُحفظ في الذاكرة).
+    ما يتجاوز حد الورقة (sheet_rows مع الرؤوس) يُكمل في أوراق تالية: title، title-2، ...
+    ملاحظة: XLSX ملف zip لا يمكن بثه أثناء الكتابة، لذا يُكتب لملف ثم يُرسل.
+    """
+    from openpyxl import Workbook  # اعتمادية import_customers نفسها
+
+    wb = Workbook(write_only=True)
+    ws, used, sheets = None, sheet_rows, 0
+    for row in rows:
+        if used >= sheet_rows:
+            sheets += 1
+            ws = wb.create_sheet(title=title[:31] if sheets == 1 else f"{title[:27]}-{sheets}")
+            ws.append(list(header))
+            used = 1
+        ws.append([_cell(v) for v in row])
+        used += 1
+    if ws is None:
+        wb.create_sheet(title=title[:31]).append(list(header))
+    wb.save(fileobj)
+
+
+def build_export(name: str, params):
+    """إرجاع (الرؤوس، مولّد الصفوف، اسم الملف الأساسي) لجدول التصدير المطلوب."""
+    if name not in EXPORTS:
+        raise KeyError(name)
+    qs_func, columns, filename = EXPORTS[name]
+    fields = [c[0] for c in columns]
+    header = [c[1] for c in columns]
+    return header, iter_rows(qs_func(params), fields), filename
@@ -0,0 +1,62 @@
+# lookup/filters.py
+"""
+شروط البحث المشتركة بين المناظر (lookup/views.py) والتصدير (lookup/exports.py).
+"""
+from __future__ import annotations
+
+from typing import Dict
+
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.db.models.lookups import Exact
+
+
+def _code_q(field: str, value: str) -> Q:
+    """
+    مطابقة رمز بدون حساسية لحالة الأحرف عبر فهرس (iexact تتحول في SQLite إلى LIKE فتمسح الجدول):
+    بلا أحرف لها حالة (أرقام فقط غالبًا) → مطابقة تامة على فهرس الحقل، وإلا → فهرس Upper(field).
+    """
+    if value.upper() == value.lower():
+        return Q(**{field: value})
+    # UPPER(field) = UPPER(value) يطابق فهرس Upper(field) في Customer.Meta.indexes
+    return Q(Exact(Upper(field), value.upper()))
+
+
+def customer_filter(data: Dict[str, str]) -> Q:
+    """شرط البحث عن العميل من مدخلات صفحة الاستعلام (صفحة الاستعلام واختبارات خطة الاستعلام)."""
+    q = Q()
+    if data.get("full_name"):      q &= Q(full_name__icontains=data["full_name"])
+    if data.get("meter_number"):   q &= _code_q("meter_no", data["meter_number"])
+    if data.get("account_number"): q &= _code_q("account_no", data["account_number"])
+    if data.get("national_id"):    q &= _code_q("national_id", data["national_id"])
+    if data.get("phone"):          q &= _code_q("mobile", data["phone"])
+    if data.get("unit_code"):      q &= _code_q("unit_code", data["unit_code"])
+    if data.get("email"):          q &= Q(email__iexact=data["email"])
+    return q
+
+
+def filter_history(qs, params):
+    """
+    تطبيق فلاتر صفحة السجل (q / type / found) على QuerySet.
+    تُستخدم في صفحة السجل وفي التصدير (lookup/exports.py) لضمان نفس النتائج.
+    """
+    qtext = (params.get("q") or "").strip()
+    t = (params.get("type") or "").strip()
+    r = params.get("found")
+
+    if qtext:
+        qs = qs.filter(
+            Q(query_value__icontains=qtext)
+            | Q(full_name__icontains=qtext)
+            | Q(phone__icontains=qtext)
+            | Q(national_id__icontains=qtext)
+            | Q(account_number__icontains=qtext)
+            | Q(meter_number__icontains=qtext)
+            | Q(unit_code__icontains=qtext)
+            | Q(email__icontains=qtext)
+        )
+    if t:
+        qs = qs.filter(query_type=t)
+    if r in ("0", "1"):
+        qs = qs.filter(result_found=(r == "1"))
+    return qs, qtext, t, r
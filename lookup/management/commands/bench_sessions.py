@@ -0,0 +1,75 @@
+# lookup/management/commands/bench_sessions.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+ENGINES = ("db", "cached_db", "cache", "signed_cookies")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس استعلامات قاعدة البيانات لكل طلب في مسار الاستعلام (lookup → الدور → الخدمات) "
+        "لكل محرك جلسات. كل التغييرات تُلغى في النهاية (معاملة مُتراجَع عنها)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+
+    def _steps(self):
+        manual = {"full_name": "عميل تجريبي", "phone": "0590000000", "meter_number": "BENCH-1"}
+        return [
+            ("GET  lookup:home", "get", reverse("lookup:home"), None),
+            ("POST lookup:home", "post", reverse("lookup:home"), manual),
+            ("GET  lookup:choose_role", "get", reverse("lookup:choose_role"), None),
+            ("POST lookup:choose_role", "post", reverse("lookup:choose_role"), {"role": "owner"}),
+            ("POST lookup:choose_role (نفس الدور)", "post", reverse("lookup:choose_role"), {"role": "owner"}),
+            ("GET  lookup:services", "get", reverse("lookup:services"), None),
+            ("GET  lookup:services", "get", reverse("lookup:services"), None),
+        ]
+
+    def _run(self, engine):
+        rows = []
+        with override_settings(SESSION_ENGINE=f"django.contrib.sessions.backends.{engine}", RATELIMITS={}):
+            client = Client()
+            user = get_user_model().objects.create_user(username=f"bench-{engine}", password="x")
+            client.force_login(user)
+            for label, method, url, data in self._steps():
+                with CaptureQueriesContext(connection) as ctx:
+                    getattr(client, method)(url, data or {})
+                total = len(ctx.captured_queries)
+                session = sum(1 for q in ctx.captured_queries if "django_session" in q["sql"])
+                rows.append((label, total, session))
+        return rows
+
+    def handle(self, *args, **opts):
+        setup_test_environment()
+        results = {}
+        try:
+            with transaction.atomic():
+                for engine in opts["engines"]:
+                    results[engine] = self._run(engine)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        engines = opts["engines"]
+        width = max(len(s[0]) for s in self._steps()) + 2
+        head = "".join(f"{e:>18}" for e in engines)
+        self.stdout.write(f"{'الخطوة':<{width}}{head}")
+        self.stdout.write(f"{'':<{width}}" + "".join(f"{'كلي/جلسات':>18}" for _ in engines))
+        for i, (label, *_rest) in enumerate(self._steps()):
+            cells = "".join(f"{results[e][i][1]:>12}/{results[e][i][2]:<5}" for e in engines)
+            self.stdout.write(f"{label:<{width}}{cells}")
+        totals = "".join(
+            f"{sum(r[1] for r in results[e]):>12}/{sum(r[2] for r in results[e]):<5}" for e in engines
+        )
+        self.stdout.write(self.style.SUCCESS(f"{'الإجمالي':<{width}}{totals}"))
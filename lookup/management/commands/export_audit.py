@@ -0,0 +1,65 @@
+# lookup/management/commands/export_audit.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup import exports
+
+
+class Command(BaseCommand):
+    help = "تصدير سجلات التدقيق (history / access) إلى CSV أو XLSX بذاكرة ثابتة"
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=sorted(exports.EXPORTS), help="الجدول المراد تصديره.")
+        parser.add_argument("-o", "--output", help="مسار ملف الإخراج (الافتراضي: الإخراج القياسي لـ CSV).")
+        parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+        parser.add_argument("--gzip", action="store_true", help="ضغط CSV بصيغة gzip.")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK, help="حجم الدفعة من قاعدة البيانات.")
+        # نفس فلاتر صفحة السجل
+        parser.add_argument("--q", help="نص البحث.")
+        parser.add_argument("--type", help="نوع المعرّف (history فقط).")
+        parser.add_argument("--found", choices=("0", "1"), help="النتيجة (history فقط).")
+        parser.add_argument("--action", help="الإجراء (access فقط).")
+        parser.add_argument("--since", help="من تاريخ YYYY-MM-DD.")
+        parser.add_argument("--until", help="حتى تاريخ YYYY-MM-DD.")
+
+    def handle(self, *args, **opts):
+        params = {k: opts[k] for k in ("q", "type", "found", "action", "since", "until") if opts.get(k)}
+        qs_func, columns, _ = exports.EXPORTS[opts["table"]]
+        header = [c[1] for c in columns]
+        rows = exports.iter_rows(qs_func(params), [c[0] for c in columns], chunk_size=opts["chunk_size"])
+
+        count = 0
+
+        def counted(it):
+            nonlocal count
+            for row in it:
+                count += 1
+                yield row
+
+        if not opts["output"] and (opts["format"] == "xlsx" or opts["gzip"]):
+            raise CommandError("تصدير XLSX أو CSV مضغوط يتطلب تحديد --output.")
+
+        if opts["format"] == "xlsx":
+            with open(opts["output"], "wb") as fh:
+                exports.write_xlsx(fh, header, counted(rows), title=opts["table"])
+        else:
+            stream = exports.iter_csv(header, counted(rows))
+            if opts["gzip"]:
+                stream = exports.gzip_stream(stream)
+            if opts["output"]:
+                with open(opts["output"], "wb") as out:
+                    for chunk in stream:
+                        out.write(chunk)
+            else:
+                # عبر self.stdout (يحترم --stdout/call_command(stdout=...)) كنص؛ الكتل تنتهي عند حدود أسطر
+                for chunk in stream:
+                    self.stdout.write(chunk.decode("utf-8"), ending="")
+                self.stdout.flush()
+
+        if opts["output"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"تم التصدير: {count} صف → {Path(opts['output']).resolve()}"
+            ))
+        else:
+            self.stderr.write(f"تم التصدير: {count} صف")
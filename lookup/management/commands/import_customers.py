@@ -4,7 +4,7 @@ from django.conf import settings
 from pathlib import Path
 import pandas as pd
 
-from lookup.models import Customer
+from lookup.models import Customer, normalize_name
 
 # حجم الدفعة في عمليات الإنشاء/التحديث الجماعي
 CHUNK = 1000
@@ -95,6 +95,8 @@ class Command(BaseCommand):
                 rec[field] = _norm(row[col])
             # تجاهل الصفوف الفارغة تمامًا
             if any(rec.values()):
+                # bulk_create/bulk_update لا يستدعيان save() → نحسب الاسم المُطبَّع هنا
+                rec["search_name"] = normalize_name(rec.get("full_name"))
                 rows.append(rec)
 
         if not rows:
@@ -149,7 +151,7 @@ class Command(BaseCommand):
 
             # تحديث جماعي (فقط الحقول القابلة للتغيير)
             if to_update:
-                fields = ["full_name", "meter_no", "account_no", "national_id", "mobile", "unit_code", "email"]
+                fields = ["full_name", "meter_no", "account_no", "national_id", "mobile", "unit_code", "email", "search_name"]
                 for i in range(0, len(to_update), CHUNK):
                     Customer.objects.bulk_update(to_update[i:i + CHUNK], fields=fields)
                     updated += len(to_update[i:i + CHUNK])
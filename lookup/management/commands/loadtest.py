@@ -0,0 +1,324 @@
+# lookup/management/commands/loadtest.py
+"""
+اختبار حمل عبر HTTP لمسار التسجيل ← OTP ← الاستعلام ← الخدمات.
+
+خط الأساس خاص بالجهاز: الأرقام تعتمد على عدد الأنوية وسرعة القرص، فلا يُحفظ في المستودع.
+على كل جهاز (أو عامل CI ثابت) يُسجَّل مرة ثم يُقارن به:
+
+    python manage.py loadtest --save-baseline      # على فرع مستقر
+    python manage.py loadtest                      # بعد التعديل: يفشل عند تراجع > --tolerance
+
+السماحية الافتراضية 25%؛ على أجهزة مشتركة/متذبذبة (CI سحابي) استخدم 0.4–0.5، وأعد التسجيل
+عند تغيير العتاد أو PASSWORD_HASHERS أو عدد المستخدمين (-u).
+
+خطوة signup أبطأ من غيرها بكثير عمدًا: make_password (PBKDF2 بمليون دورة ≈ 0.4 ث لنواة واحدة).
+مع -u 20 على نواة واحدة تصطف 20 عملية تجزئة، فيقارب p50 عشر ثوانٍ؛ الرقم يقيس عدد الأنوية
+لا تراجعًا في الشيفرة. لقياس بقية المسار دون أثرها قلّل -u أو شغّل على أنوية أكثر.
+"""
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# خطوات المسار بالترتيب: (الاسم، الطريقة، المسار، الحالة المتوقعة، بداية موقع التحويل المتوقع)
+FLOW = [
+    ("signup_form",     "GET",  "/access/signup/",        200, None),
+    ("signup",          "POST", "/access/signup/",        302, "/access/verify-otp/"),
+    ("verify_otp",      "POST", "/access/verify-otp/",    302, "/lookup/"),
+    ("lookup_home",     "GET",  "/lookup/",               200, None),
+    ("lookup_submit",   "POST", "/lookup/",               302, "/lookup/choose-role/"),
+    ("choose_role",     "POST", "/lookup/choose-role/",   302, "/lookup/services/"),
+    ("services",        "GET",  "/lookup/services/",      200, None),
+    ("service_request", "GET",  "/lookup/services/{key}/", 302, "/lookup/services/"),
+]
+
+OTP_BYPASS_CODE = "111111"
+PASSWORD = "Load-Test-Passw0rd!"
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1, allow_redirects=False)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise CommandError(f"الخادم لم يستجب خلال {timeout:.0f} ثانية: {url}")
+
+
+class VirtualUser:
+    """مستخدم افتراضي: جلسة HTTP خاصة (كوكيز + keep-alive) تمشي المسار كاملًا."""
+
+    def __init__(self, base_url: str, phone: str, service_key: str, record):
+        self.base_url = base_url.rstrip("/")
+        self.phone = phone
+        self.service_key = service_key
+        self.record = record
+        self.http = requests.Session()
+
+    def _payload(self, name: str) -> dict:
+        if name == "signup":
+            return {"phone": self.phone, "national_id": "1" + self.phone[-9:], "password": PASSWORD}
+        if name == "verify_otp":
+            return {"code": OTP_BYPASS_CODE}
+        if name == "lookup_submit":
+            # بلا تطابق + بيانات كافية → إكمال يدوي ثم اختيار الدور
+            return {"full_name": "مستخدم اختبار حمل", "phone": self.phone, "action": "lookup"}
+        if name == "choose_role":
+            return {"role": random.choice(("beneficiary", "owner"))}
+        return {}
+
+    def run(self) -> bool:
+        for name, method, path, expected, location in FLOW:
+            url = self.base_url + path.format(key=self.service_key)
+            data = None
+            headers = {}
+            if method == "POST":
+                # الرمز يتغير بعد تسجيل الدخول؛ نقرؤه من الكوكي قبل كل POST
+                data = {"csrfmiddlewaretoken": self.http.cookies.get("csrftoken", ""), **self._payload(name)}
+                headers["Referer"] = url
+            start = time.perf_counter()
+            try:
+                response = self.http.request(method, url, data=data, headers=headers, allow_redirects=False, timeout=30)
+                elapsed = (time.perf_counter() - start) * 1000
+                ok = response.status_code == expected and (
+                    location is None or response.headers.get("Location", "").startswith(location)
+                )
+                error = None if ok else f"{response.status_code} {response.headers.get('Location', '')}".strip()
+            except requests.RequestException as exc:
+                elapsed = (time.perf_counter() - start) * 1000
+                ok, error = False, type(exc).__name__
+            self.record(name, elapsed, error)
+            if not ok:
+                return False
+        return True
+
+
+class Command(BaseCommand):
+    help = (
+        "اختبار حمل شامل لمسار التسجيل ← OTP ← الاستعلام ← الخدمات عبر HTTP حقيقي "
+        "بعدة مستخدمين متزامنين. يطبع p50/p95/p99 والإنتاجية لكل خطوة، ويقارن بخط أساس محفوظ "
+        "ويفشل عند التراجع. بدون --base-url يشغّل خادمًا محليًا على نسخة من قاعدة البيانات "
+        "مع خادم SMS تجريبي (fake_sms_server) ورمز OTP التجريبي."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="خادم قائم (يجب أن يعمل بـ OTP_BYPASS=1 و RATELIMIT_ENABLED=0).")
+        parser.add_argument("-u", "--users", type=int, default=20, help="عدد المستخدمين المتزامنين.")
+        parser.add_argument("-n", "--flows", type=int, default=5, help="عدد مرات المسار لكل مستخدم.")
+        parser.add_argument("--service", default="transfer_meter", help="مفتاح الخدمة المطلوبة في آخر خطوة.")
+        parser.add_argument(
+            "--baseline", default=str(Path(settings.BASE_DIR) / "loadtest_baseline.json"),
+            help="ملف خط الأساس (JSON، خاص بهذا الجهاز ولا يُتتبَّع في git).",
+        )
+        parser.add_argument("--save-baseline", action="store_true", help="حفظ النتائج كخط أساس جديد.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="نسبة التراجع المسموحة (0.25 = 25%%).")
+        parser.add_argument("--max-error-rate", type=float, default=0.01)
+        parser.add_argument("--keep-db", action="store_true", help="الكتابة في قاعدة البيانات الأصلية بدل نسخة مؤقتة.")
+
+    # ------------------------------------------------------------ تشغيل الخوادم
+    def _spawn(self, opts):
+        tmp = tempfile.mkdtemp(prefix="loadtest-")
+        sms_port, web_port = _free_port(), _free_port()
+        env = {
+            **os.environ,
+            "OTP_BYPASS": "1",
+            "RATELIMIT_ENABLED": "0",
+            "UNIFONIC_API_KEY": "loadtest",
+            "SMS_PROVIDER_URL": f"http://127.0.0.1:{sms_port}/rest/SMS/messages",
+            "PYTHONUNBUFFERED": "1",
+        }
+        db = settings.DATABASES["default"]
+        copied = False
+        if not opts["keep_db"] and db["ENGINE"].endswith("sqlite3"):
+            # نسخة متّسقة (backup API) حتى لا تتراكم حسابات الاختبار في قاعدة التطوير
+            copy = Path(tmp) / "db.sqlite3"
+            src, dst = sqlite3.connect(db["NAME"]), sqlite3.connect(copy)
+            with dst:
+                src.backup(dst)
+            src.close()
+            dst.close()
+            env["DB_NAME"] = str(copy)
+            copied = True
+        elif not opts["keep_db"]:
+            raise CommandError("النسخة المؤقتة متاحة لـ SQLite فقط؛ استخدم --keep-db أو --base-url.")
+
+        manage = [sys.executable, str(Path(settings.BASE_DIR) / "manage.py")]
+        log = open(Path(tmp) / "server.log", "w")
+        procs = []
+        try:
+            if copied:
+                subprocess.run(manage + ["migrate", "--noinput"], env=env, stdout=log, stderr=subprocess.STDOUT,
+                               check=True)
+            procs.append(subprocess.Popen(manage + ["fake_sms_server", "--port", str(sms_port), "--quiet"],
+                                          env=env, stdout=log, stderr=subprocess.STDOUT))
+            procs.append(subprocess.Popen(manage + ["runserver", f"127.0.0.1:{web_port}", "--noreload"],
+                                          env=env, stdout=log, stderr=subprocess.STDOUT))
+            base_url = f"http://127.0.0.1:{web_port}"
+            _wait_for(base_url + "/access/signup/")
+        except BaseException:
+            self._stop(procs, log)
+            raise
+        self.stdout.write(f"خادم محلي: {base_url} (سجل: {log.name})")
+        return base_url, procs, log
+
+    @staticmethod
+    def _stop(procs, log=None):
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        # الملف يبقى مفتوحًا طوال عمر العمليات الفرعية (مخرجاتها موجّهة إليه)
+        if log is not None:
+            log.close()
+
+    # ------------------------------------------------------------ التنفيذ
+    def handle(self, *args, **opts):
+        procs, log = [], None
+        base_url = opts["base_url"]
+        if not base_url:
+            base_url, procs, log = self._spawn(opts)
+        try:
+            results = self._run(base_url, opts)
+        finally:
+            self._stop(procs, log)
+
+        self._report(results)
+        self._check(results, opts)
+        baseline_path = Path(opts["baseline"])
+        if opts["save_baseline"]:
+            baseline_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"حُفظ خط الأساس: {baseline_path}"))
+            return
+        if baseline_path.exists():
+            self._compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), opts["tolerance"])
+        else:
+            self.stdout.write(f"لا يوجد خط أساس في {baseline_path} (استخدم --save-baseline).")
+
+    def _run(self, base_url, opts):
+        users, flows = max(opts["users"], 1), max(opts["flows"], 1)
+        samples = defaultdict(list)
+        errors = defaultdict(list)
+        lock = threading.Lock()
+
+        def record(step, elapsed_ms, error):
+            with lock:
+                if error:
+                    errors[step].append(error)
+                else:
+                    samples[step].append(elapsed_ms)
+
+        # أرقام جوال فريدة لهذا التشغيل (05 + 8 أرقام)
+        seed = random.randrange(10 ** 8)
+        completed = [0]
+
+        def worker(index):
+            for j in range(flows):
+                phone = f"05{(seed + index * flows + j) % 10 ** 8:08d}"
+                if VirtualUser(base_url, phone, opts["service"], record).run():
+                    with lock:
+                        completed[0] += 1
+
+        self.stdout.write(f"{users} مستخدم × {flows} مسار على {base_url} ...")
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+        steps = {}
+        for name, *_ in FLOW:
+            s = samples[name]
+            steps[name] = {
+                "count": len(s),
+                "errors": len(errors[name]),
+                "p50": round(_percentile(s, 0.50), 2),
+                "p95": round(_percentile(s, 0.95), 2),
+                "p99": round(_percentile(s, 0.99), 2),
+                "mean": round(statistics.fmean(s), 2) if s else 0.0,
+                # إنتاجية الخطوة نفسها: طلباتها ÷ زمن انشغال المستخدمين بها (مجموع أزمنتها ÷ التزامن)
+                "rps": round(len(s) * users / (sum(s) / 1000), 2) if s else 0.0,
+                "sample_errors": sorted(set(errors[name]))[:5],
+            }
+        return {
+            "users": users,
+            "flows_per_user": flows,
+            "wall_seconds": round(wall, 2),
+            "flows_completed": completed[0],
+            "flows_per_second": round(completed[0] / wall, 2),
+            "steps": steps,
+        }
+
+    # ------------------------------------------------------------ التقرير والمقارنة
+    def _report(self, results):
+        self.stdout.write(f"{'الخطوة':<16} {'عدد':>6} {'أخطاء':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'طلب/ث':>8}")
+        for name, s in results["steps"].items():
+            self.stdout.write(
+                f"{name:<16} {s['count']:>6} {s['errors']:>6} {s['p50']:>8.1f} {s['p95']:>8.1f} "
+                f"{s['p99']:>8.1f} {s['rps']:>8.1f}"
+            )
+            for e in s["sample_errors"]:
+                self.stdout.write(self.style.WARNING(f"    {e}"))
+        self.stdout.write(
+            f"المسارات المكتملة: {results['flows_completed']}/{results['users'] * results['flows_per_user']} "
+            f"في {results['wall_seconds']} ث ({results['flows_per_second']} مسار/ث)"
+        )
+
+    def _check(self, results, opts):
+        total = sum(s["count"] + s["errors"] for s in results["steps"].values())
+        failed = sum(s["errors"] for s in results["steps"].values())
+        if total and failed / total > opts["max_error_rate"]:
+            raise CommandError(f"نسبة الأخطاء {failed / total:.1%} تتجاوز {opts['max_error_rate']:.1%}")
+
+    def _compare(self, results, baseline, tolerance):
+        problems = []
+        if results["users"] != baseline.get("users"):
+            self.stdout.write(self.style.WARNING(
+                f"تنبيه: عدد المستخدمين ({results['users']}) يختلف عن خط الأساس ({baseline.get('users')})."
+            ))
+        for name, s in results["steps"].items():
+            base = baseline.get("steps", {}).get(name)
+            if not base or not base.get("count"):
+                continue
+            if base["p95"] and s["p95"] > base["p95"] * (1 + tolerance):
+                problems.append(f"{name}: p95 {s['p95']:.1f}ms > {base['p95']:.1f}ms")
+            if s["rps"] < base["rps"] * (1 - tolerance):
+                problems.append(f"{name}: {s['rps']:.1f} طلب/ث < {base['rps']:.1f}")
+        base_fps = baseline.get("flows_per_second") or 0
+        if results["flows_per_second"] < base_fps * (1 - tolerance):
+            problems.append(f"الإنتاجية: {results['flows_per_second']} مسار/ث < {base_fps}")
+        if problems:
+            raise CommandError("تراجع عن خط الأساس:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS(f"ضمن خط الأساس (السماحية {tolerance:.0%})."))
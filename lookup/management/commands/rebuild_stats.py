@@ -0,0 +1,85 @@
+# lookup/management/commands/rebuild_stats.py
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from access.models import AccessLog, AccessDailyStat
+from lookup.models import LookupHistory, LookupDailyStat
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء جداول التجميع اليومية (الاستعلامات والدخول) من السجلات الخام لفترة محددة"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=1,
+            help="عدد الأيام المراد إعادة بنائها حتى اليوم (الافتراضي: اليوم فقط).",
+        )
+        parser.add_argument(
+            "--since",
+            help="تاريخ البداية بصيغة YYYY-MM-DD (يتجاوز --days).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["since"]:
+            try:
+                since = date.fromisoformat(opts["since"])
+            except ValueError:
+                raise CommandError("صيغة التاريخ غير صحيحة، استخدم YYYY-MM-DD.")
+        else:
+            since = timezone.localdate() - timedelta(days=max(opts["days"], 1) - 1)
+
+        # نطاق زمني على العمود المفهرس timestamp بدل __date (لاستخدام الفهرس)
+        start = timezone.make_aware(datetime.combine(since, time.min))
+
+        with transaction.atomic():
+            # الإشارات الحية تزيد العدّادات أثناء إعادة البناء؛ نقرأ السجلات ونكتب التجميع في معاملة
+            # واحدة تمنع تلك الزيادات حتى النهاية. السجلات غير المثبّتة بعد لا يراها التجميع،
+            # وزيادتها تُطبَّق بعدنا فلا تضيع ولا تُحتسب مرتين.
+            # SQLite: المعاملة IMMEDIATE (myprojabd/db.py) تأخذ قفل الكتابة من البداية.
+            # قواعد أخرى غير PostgreSQL: شغّل الأمر والكتابة متوقفة.
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cur:
+                    cur.execute(
+                        f"LOCK TABLE {LookupDailyStat._meta.db_table}, {AccessDailyStat._meta.db_table} "
+                        "IN EXCLUSIVE MODE"
+                    )
+
+            lookup_rows = (
+                LookupHistory.objects.filter(timestamp__gte=start)
+                .annotate(day=TruncDate("timestamp"))
+                .values("day", "query_type", "action", "result_found")
+                .annotate(n=Count("id"))
+            )
+            access_rows = (
+                AccessLog.objects.filter(timestamp__gte=start)
+                .annotate(day=TruncDate("timestamp"))
+                .values("day", "action")
+                .annotate(n=Count("id"))
+            )
+
+            LookupDailyStat.objects.filter(day__gte=since).delete()
+            LookupDailyStat.objects.bulk_create(
+                LookupDailyStat(
+                    day=r["day"], query_type=r["query_type"], action=r["action"] or "",
+                    result_found=r["result_found"], count=r["n"],
+                )
+                for r in lookup_rows
+            )
+            AccessDailyStat.objects.filter(day__gte=since).delete()
+            AccessDailyStat.objects.bulk_create(
+                AccessDailyStat(day=r["day"], action=r["action"], count=r["n"])
+                for r in access_rows
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"تمت إعادة بناء الإحصاءات منذ {since:%Y-%m-%d} — "
+            f"استعلامات: {LookupDailyStat.objects.filter(day__gte=since).count()} صف | "
+            f"دخول: {AccessDailyStat.objects.filter(day__gte=since).count()} صف"
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0004_alter_lookuphistory_query_type_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('query_type', models.CharField(max_length=50, verbose_name='نوع المعرّف')),
+                ('action', models.CharField(blank=True, max_length=20, verbose_name='نوع العملية')),
+                ('result_found', models.BooleanField(verbose_name='تم العثور على النتيجة')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'إحصاء يومي للاستعلامات',
+                'verbose_name_plural': 'إحصاءات يومية للاستعلامات',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'query_type', 'action', 'result_found'), name='lookup_daily_stat_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0005_lookupdailystat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lookuphistory',
+            index=models.Index(fields=['query_value'], name='lookup_look_query_v_60fbd0_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:28
+
+from django.db import migrations, models
+
+BATCH = 2000
+
+# نسخة مجمّدة من lookup.models.normalize_name كما كانت عند كتابة هذا الترحيل
+# (تعديل الدالة الحية لاحقًا يجب ألا يغيّر ما يفعله ترحيل قديم)
+_AR_DIACRITICS = dict.fromkeys(
+    [*range(0x0610, 0x061B), *range(0x064B, 0x0660), 0x0670, *range(0x06D6, 0x06EE), 0x0640]
+)
+_AR_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+
+
+def normalize_name(value):
+    s = (value or "").translate(_AR_DIACRITICS).translate(_AR_LETTERS).casefold()
+    return " ".join(s.split())
+
+
+def fill_search_name(apps, schema_editor):
+    """تعبئة الاسم المُطبَّع للعملاء الحاليين على دفعات."""
+    Customer = apps.get_model("lookup", "Customer")
+    last_id = 0
+    while True:
+        batch = list(Customer.objects.filter(id__gt=last_id).order_by("id").only("id", "full_name")[:BATCH])
+        if not batch:
+            break
+        for obj in batch:
+            obj.search_name = normalize_name(obj.full_name)
+        Customer.objects.bulk_update(batch, ["search_name"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0007_lookuphistory_user_agent_intern'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='الاسم (للبحث)'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_name'], name='lookup_cust_search__fa78b2_idx'),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0006_useragent_intern'),
+        ('lookup', '0008_customer_search_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('meter_no'), name='lookup_cust_meter_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('account_no'), name='lookup_cust_account_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('unit_code'), name='lookup_cust_unit_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lookuphistory',
+            index=models.Index(fields=['query_type', '-id'], name='lookup_hist_type_id_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+# الكتالوج الذي كان ثابتًا في lookup/views.py (_services_catalog)
+SERVICES = [
+    ("transfer_meter", "طلب نقل عداد", "نقل عداد الكهرباء/المياه."),
+    ("pay_debt", "طلب تسديد مديونية", "سداد المديونيات بشكل آمن."),
+    ("manual_request", "طلب يدوي (نقل ملكية – تصحيح بيانات – طلب دعم…)", "طلبات متنوعة تُستلم يدويًا."),
+    ("account_verify", "طلب توثيق الحساب", "توثيق وربط الحساب بالمستخدم."),
+    ("activate_service", "طلب تفعيل الخدمة", "تفعيل خدمة الكهرباء/المياه."),
+    ("beneficiary_update", "تحديث بيانات المستفيد", "تعديل بيانات التواصل."),
+    ("manual_ticket", "بلاغ أو استفسار يدوي", "إنشاء بلاغ/استفسار ومتابعته."),
+]
+
+
+def seed_services(apps, schema_editor):
+    Service = apps.get_model("lookup", "Service")
+    db = schema_editor.connection.alias
+    Service.objects.using(db).bulk_create(
+        Service(key=key, title=title, description=desc, position=(i + 1) * 10)
+        for i, (key, title, desc) in enumerate(SERVICES)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0009_customer_code_upper_history_type_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Service',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.SlugField(unique=True, verbose_name='المفتاح')),
+                ('title', models.CharField(max_length=255, verbose_name='العنوان')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='الوصف')),
+                ('enabled', models.BooleanField(default=True, verbose_name='مفعّلة')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='الترتيب')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'خدمة',
+                'verbose_name_plural': 'الخدمات',
+                'ordering': ['position', 'key'],
+            },
+        ),
+        migrations.RunPython(seed_services, migrations.RunPython.noop),
+    ]
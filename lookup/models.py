@@ -1,9 +1,12 @@
 # lookup/models.py
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 from django.conf import settings
 
+from access.models import UserAgent
+
 # ------------------------------
 # Validators
 # ------------------------------
@@ -19,6 +22,22 @@ phone_validator = RegexValidator(
 )
 
 
+# حركات التشكيل العربية + التطويل
+_AR_DIACRITICS = dict.fromkeys(
+    [*range(0x0610, 0x061B), *range(0x064B, 0x0660), 0x0670, *range(0x06D6, 0x06EE), 0x0640]
+)
+_AR_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+
+
+def normalize_name(value: str | None) -> str:
+    """
+    تطبيع الاسم للبحث: إزالة التشكيل، توحيد الهمزات/الياء/التاء المربوطة،
+    أحرف صغيرة ومسافات مفردة. مثال: "أحمد  عبدالله" → "احمد عبدالله".
+    """
+    s = (value or "").translate(_AR_DIACRITICS).translate(_AR_LETTERS).casefold()
+    return " ".join(s.split())
+
+
 # ------------------------------
 # مصدر البيانات (بعد استيراد الإكسل)
 # ------------------------------
@@ -38,6 +57,8 @@ class Customer(models.Model):
     )
     unit_code   = models.CharField(_("كود الوحدة"), max_length=50, blank=True, db_index=True)
     email       = models.EmailField(_("البريد الإلكتروني"), blank=True)
+    # الاسم بعد التطبيع (للبحث بالبادئة عبر الفهرس)
+    search_name = models.CharField(_("الاسم (للبحث)"), max_length=255, blank=True, editable=False)
 
     class Meta:
         verbose_name = _("عميل")
@@ -49,12 +70,21 @@ class Customer(models.Model):
             models.Index(fields=["national_id"]),
             models.Index(fields=["mobile"]),
             models.Index(fields=["unit_code"]),
+            models.Index(fields=["search_name"]),
+            # بحث الرموز بدون حساسية لحالة الأحرف (lookup.filters.customer_filter)
+            models.Index(Upper("meter_no"), name="lookup_cust_meter_upper_idx"),
+            models.Index(Upper("account_no"), name="lookup_cust_account_upper_idx"),
+            models.Index(Upper("unit_code"), name="lookup_cust_unit_upper_idx"),
         ]
         # لا نفرض فريدًا لتجنّب مشاكل التكرار الوارد من الإكسل
 
     def __str__(self):
         return self.full_name or self.account_no or self.national_id or _("عميل")
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.full_name)
+        super().save(*args, **kwargs)
+
 
 # ------------------------------
 # سجل الاستعلامات/التحديثات
@@ -122,7 +152,14 @@ class LookupHistory(models.Model):
 
     # تتبع
     ip_address = models.GenericIPAddressField(_("عنوان IP"), blank=True, null=True)
-    user_agent = models.CharField(_("المتصفح/العميل"), max_length=255, blank=True)
+    user_agent = models.ForeignKey(
+        "access.UserAgent",
+        on_delete=models.PROTECT,
+        null=True, blank=True,
+        db_index=False,
+        related_name="+",
+        verbose_name=_("المتصفح/العميل"),
+    )
     timestamp = models.DateTimeField(_("وقت العملية"), auto_now_add=True)
 
     class Meta:
@@ -132,6 +169,10 @@ class LookupHistory(models.Model):
         indexes = [
             models.Index(fields=["-timestamp"]),
             models.Index(fields=["query_type", "query_value"]),
+            # بحث لوحة الإدارة بالقيمة دون تحديد النوع
+            models.Index(fields=["query_value"]),
+            # صفحة السجل مفلترة بالنوع بترتيب الأحدث: بحث بالفهرس بدون فرز
+            models.Index(fields=["query_type", "-id"], name="lookup_hist_type_id_idx"),
         ]
         constraints = [
             models.CheckConstraint(
@@ -184,7 +225,7 @@ class LookupHistory(models.Model):
             "action": action or "",
             "message": message or "",
             "ip_address": ip_address,
-            "user_agent": user_agent or "",
+            "user_agent_id": UserAgent.intern(user_agent),
         }
         # لقطة من الحقول إن توفرت
         form_snapshot = form_snapshot or {}
@@ -198,3 +239,58 @@ class LookupHistory(models.Model):
             "email": form_snapshot.get("email", ""),
         })
         return cls.objects.create(**data)
+
+
+# ------------------------------
+# تجميعات يومية (Rollups) لسجل الاستعلامات
+# ------------------------------
+class LookupDailyStat(models.Model):
+    """
+    عدّاد يومي لكل (نوع المعرّف، نوع العملية، النتيجة).
+    يُحدَّث تزايديًا عند كل كتابة في LookupHistory، فتقرأ لوحات الإحصاء
+    آلاف الصفوف بدل مسح السجل الخام.
+    """
+    day = models.DateField(_("اليوم"))
+    query_type = models.CharField(_("نوع المعرّف"), max_length=50)
+    action = models.CharField(_("نوع العملية"), max_length=20, blank=True)
+    result_found = models.BooleanField(_("تم العثور على النتيجة"))
+    count = models.PositiveBigIntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("إحصاء يومي للاستعلامات")
+        verbose_name_plural = _("إحصاءات يومية للاستعلامات")
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "query_type", "action", "result_found"],
+                name="lookup_daily_stat_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} • {self.query_type} • {self.action} • {self.count}"
+
+
+# ------------------------------
+# كتالوج الخدمات
+# ------------------------------
+class Service(models.Model):
+    """
+    الخدمات المعروضة في صفحة الخدمات؛ التفعيل/الإيقاف والترتيب من لوحة الإدارة.
+    لا تُقرأ مباشرة في المناظر: lookup.catalog يحمّلها مرة لكل عملية ويعيد التحميل عند تغيّر الإصدار.
+    """
+    key = models.SlugField(_("المفتاح"), max_length=50, unique=True)
+    # النص العربي هو مفتاح الترجمة (gettext) للغات الأخرى في LANGUAGES
+    title = models.CharField(_("العنوان"), max_length=255)
+    description = models.CharField(_("الوصف"), max_length=255, blank=True)
+    enabled = models.BooleanField(_("مفعّلة"), default=True)
+    position = models.PositiveSmallIntegerField(_("الترتيب"), default=0)
+    updated_at = models.DateTimeField(_("آخر تحديث"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("خدمة")
+        verbose_name_plural = _("الخدمات")
+        ordering = ["position", "key"]
+
+    def __str__(self) -> str:
+        return f"{self.key} • {self.title}"
@@ -0,0 +1,31 @@
+# lookup/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from myprojabd.counters import increment_counter
+from . import catalog
+from .models import LookupHistory, LookupDailyStat, Service
+
+
+@receiver(post_save, sender=LookupHistory, dispatch_uid="lookup_daily_stat_rollup")
+def rollup_lookup_history(sender, instance, created, raw=False, **kwargs):
+    """تحديث التجميع اليومي عند كل سجل استعلام جديد."""
+    if not created or raw:
+        return
+    increment_counter(
+        LookupDailyStat,
+        day=timezone.localdate(instance.timestamp),
+        query_type=instance.query_type,
+        action=instance.action or "",
+        result_found=instance.result_found,
+    )
+
+
+@receiver(post_save, sender=Service, dispatch_uid="lookup_service_catalog_save")
+@receiver(post_delete, sender=Service, dispatch_uid="lookup_service_catalog_delete")
+def invalidate_service_catalog(sender, raw=False, **kwargs):
+    """إصدار جديد للكتالوج بعد تثبيت المعاملة (فتعيد كل عملية تحميله)."""
+    if not raw:
+        transaction.on_commit(catalog.invalidate)
@@ -1,3 +1,586 @@
-from django.test import TestCase
+import contextlib
+import csv
+import gzip
+import importlib
+import importlib.util
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from access.models import AccessDailyStat, AccessLog
+from myprojabd import admin_utils, static
+from myprojabd.counters import increment_counter
+from . import catalog, exports
+from .admin import LookupHistoryAdmin
+from .filters import customer_filter, filter_history
+from .models import Customer, LookupDailyStat, LookupHistory, Service, normalize_name
+from .views import _current_customer, _lookup_state, _update_lookup_state
+
+User = get_user_model()
+
+
+class HotPathQueryBudgetTests(TestCase):
+    """
+    ميزانية الاستعلامات لكل منظر ساخن (الحالة المستقرة: الجلسة محفوظة وصف التجميع موجود).
+    أي استعلام إضافي (N+1، جلسة تُكتب بلا داعٍ...) يُفشل الاختبار.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="0500000001", password="x")
+        cls.customer = Customer.objects.create(
+            full_name="أحمد علي", national_id="1000000001", mobile="0500000009", meter_no="M-100"
+        )
+        Customer.objects.create(full_name="سارة محمد", national_id="1000000002", mobile="0500000008")
+        LookupHistory.objects.bulk_create(
+            LookupHistory(
+                user=cls.user,
+                query_type=LookupHistory.QueryType.NATIONAL,
+                query_value=f"10000{i:05d}",
+                national_id=f"10000{i:05d}",
+                action="lookup",
+                result_found=bool(i % 2),
+            )
+            for i in range(30)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_data_lookup_get(self):
+        # المستخدم فقط (الجلسة من الذاكرة المؤقتة)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse("lookup:home")).status_code, 200)
+
+    def test_data_lookup_single_match(self):
+        url = reverse("lookup:home")
+        self.client.post(url, {"national_id": "1000000001"})  # تهيئة: حفظ الجلسة وصف التجميع
+        # المستخدم + العدد + جلب العميل + سجل الاستعلام + تحديث التجميع اليومي
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {"national_id": "1000000001"})
+        self.assertRedirects(response, reverse("lookup:choose_role"), fetch_redirect_response=False)
+
+    def _select_customer_and_role(self):
+        self.client.post(reverse("lookup:home"), {"national_id": "1000000001"})
+        self.client.post(reverse("lookup:choose_role"), {"role": "owner"})
+
+    def test_services(self):
+        self._select_customer_and_role()
+        self.client.get(reverse("lookup:services"))  # تهيئة: تحميل كتالوج الخدمات للعملية
+        # المستخدم + العميل الحالي (الكتالوج من الذاكرة)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(reverse("lookup:services")).status_code, 200)
+
+    def test_lookup_history(self):
+        # المستخدم + عدد الصفحات + الصفحة نفسها (بلا استعلام لكل صف)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(reverse("lookup:history")).status_code, 200)
+        with self.assertNumQueries(3):
+            self.client.get(reverse("lookup:history"), {"type": "national", "found": "1", "page": "2"})
+
+
+class DailyStatsTests(TestCase):
+    def _lookup(self, found=True, action="lookup"):
+        LookupHistory.objects.create(
+            query_type=LookupHistory.QueryType.NATIONAL, query_value="1000000001", action=action, result_found=found,
+        )
+
+    def _stats(self):
+        lookups = set(LookupDailyStat.objects.values_list("day", "query_type", "action", "result_found", "count"))
+        access = set(AccessDailyStat.objects.values_list("day", "action", "count"))
+        return lookups, access
+
+    def test_save_bumps_rollup(self):
+        for found in (True, True, False):
+            self._lookup(found)
+        AccessLog.objects.create(user_identifier="0500000001", action=AccessLog.Actions.LOGIN)
+
+        today = timezone.localdate()
+        counts = dict(LookupDailyStat.objects.filter(day=today).values_list("result_found", "count"))
+        self.assertEqual(counts, {True: 2, False: 1})
+        self.assertEqual(AccessDailyStat.objects.get(day=today, action=AccessLog.Actions.LOGIN).count, 1)
+
+    def test_concurrent_first_insert_falls_back_to_update(self):
+        dims = {"day": timezone.localdate(), "query_type": "national", "action": "lookup", "result_found": True}
+
+        def lost_race(**kwargs):
+            # عامل آخر أنشأ الصف بين UPDATE (لا صفوف) و INSERT
+            LookupDailyStat.objects.bulk_create([LookupDailyStat(**dims, count=5)])
+            raise IntegrityError("UNIQUE constraint failed")
+
+        # الصف المُنشأ "من عامل آخر" يجب أن يبقى بعد الخطأ (لا نقطة حفظ تتراجع عنه)
+        with mock.patch.object(LookupDailyStat.objects, "create", side_effect=lost_race), \
+                mock.patch("myprojabd.counters.transaction", SimpleNamespace(atomic=contextlib.nullcontext)):
+            increment_counter(LookupDailyStat, **dims)
+        self.assertEqual(LookupDailyStat.objects.get(**dims).count, 6)
+
+    def test_stats_view_is_staff_only(self):
+        url = reverse("lookup:stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user(username="0500000001", password="x"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_stats_view_json(self):
+        self._lookup(True)
+        self._lookup(False)
+        AccessLog.objects.create(user_identifier="0500000001", action=AccessLog.Actions.LOGIN)
+        AccessLog.objects.create(user_identifier="0500000001", action=AccessLog.Actions.FAIL)
+        self.client.force_login(User.objects.create_user(username="staff", password="x", is_staff=True))
+
+        data = self.client.get(reverse("lookup:stats"), {"format": "json", "days": "7"}).json()
+        today = timezone.localdate().isoformat()
+        self.assertEqual(data["days"], 7)
+        self.assertEqual(
+            sorted((r["day"], r["result_found"], r["count"]) for r in data["lookups"]),
+            [(today, False, 1), (today, True, 1)],
+        )
+        self.assertEqual(data["logins"], [{"day": today, "success": 1, "fail": 1}])
+
+    def test_rebuild_reproduces_live_counters(self):
+        for found in (True, False, True):
+            self._lookup(found)
+        self._lookup(True, action="select")
+        AccessLog.objects.create(user_identifier="0500000001", action=AccessLog.Actions.LOGIN)
+        live = self._stats()
+
+        LookupDailyStat.objects.update(count=999)
+        AccessDailyStat.objects.all().delete()
+        call_command("rebuild_stats", stdout=StringIO())
+        self.assertEqual(self._stats(), live)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LookupHistory.objects.bulk_create(
+            LookupHistory(
+                query_type=LookupHistory.QueryType.NATIONAL if i % 2 else LookupHistory.QueryType.PHONE,
+                query_value=f"1{i:09d}", action="lookup", result_found=bool(i % 3),
+            )
+            for i in range(25)
+        )
+
+    def test_iter_rows_keyset_covers_every_row_once_in_id_order(self):
+        qs = LookupHistory.objects.all()
+        ids = list(exports.iter_rows(qs, ["id"], chunk_size=7))
+        self.assertEqual([r[0] for r in ids], list(qs.order_by("-id").values_list("id", flat=True)))
+        # بدون id في الأعمدة: يُضاف للترقيم ويُحذف من الناتج
+        values = list(exports.iter_rows(qs.filter(query_type="national"), ["query_value"], chunk_size=4))
+        self.assertEqual(len(values), 12)
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertTrue(all(len(r) == 1 for r in values))
+
+    def _csv(self, data: bytes) -> list[list[str]]:
+        text = data.decode("utf-8")
+        self.assertTrue(text.startswith("\ufeff"))
+        return list(csv.reader(text[1:].splitlines()))
+
+    def test_csv_and_gzip(self):
+        header, rows, _name = exports.build_export("history", {"type": "national", "found": "1"})
+        rows = list(rows)
+        plain = b"".join(exports.iter_csv(header, rows))
+        parsed = self._csv(plain)
+        self.assertEqual(parsed[0], header)
+        self.assertEqual(len(parsed) - 1, LookupHistory.objects.filter(query_type="national", result_found=True).count())
+        self.assertEqual(gzip.decompress(b"".join(exports.gzip_stream(exports.iter_csv(header, rows)))), plain)
+
+    @skipUnless(importlib.util.find_spec("openpyxl"), "openpyxl غير مثبّتة")
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        header, rows, name = exports.build_export("history", {})
+        with tempfile.TemporaryFile() as fh:
+            exports.write_xlsx(fh, header, rows, title=name)
+            fh.seek(0)
+            sheet = load_workbook(fh, read_only=True).active
+            self.assertEqual(sum(1 for _ in sheet.iter_rows()), 26)
+
+    def test_formula_like_values_are_neutralized(self):
+        LookupHistory.objects.create(query_type="phone", query_value="+966500000000", full_name='=HYPERLINK("x")')
+        header, rows, _name = exports.build_export("history", {"q": "+966"})
+        row = self._csv(b"".join(exports.iter_csv(header, rows)))[1]
+        self.assertIn("'+966500000000", row)
+        self.assertIn("'=HYPERLINK(\"x\")", row)
+        self.assertEqual([exports._cell(v) for v in (-5, "@a", "\tx", "a=b")], [-5, "'@a", "'\tx", "a=b"])
+
+    @skipUnless(importlib.util.find_spec("openpyxl"), "openpyxl غير مثبّتة")
+    def test_xlsx_splits_rows_across_sheets(self):
+        from openpyxl import load_workbook
+
+        header, rows, name = exports.build_export("history", {})
+        with tempfile.TemporaryFile() as fh:
+            exports.write_xlsx(fh, header, rows, title=name, sheet_rows=10)
+            fh.seek(0)
+            sheets = load_workbook(fh, read_only=True).worksheets
+            # 25 صفًا + رأس في كل ورقة بحد 10 → 9 + 9 + 7
+            self.assertEqual([sum(1 for _ in ws.iter_rows()) for ws in sheets], [10, 10, 8])
+
+    def test_large_xlsx_refused_over_http(self):
+        self.client.force_login(User.objects.create_user(username="staff", is_staff=True))
+        url = reverse("lookup:export", args=["history"])
+        with mock.patch.object(exports, "XLSX_HTTP_MAX_ROWS", 10):
+            response = self.client.get(url, {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("export_audit", response.content.decode())
+
+    def test_export_audit_command_to_stdout(self):
+        out = StringIO()
+        call_command("export_audit", "history", "--type", "phone", stdout=out, stderr=StringIO())
+        self.assertEqual(len(self._csv(out.getvalue().encode("utf-8"))) - 1, 13)
+
+    def test_export_audit_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "history.csv.gz"
+            out = StringIO()
+            call_command("export_audit", "history", "-o", str(path), "--gzip", "--type", "phone", "--chunk-size", "5",
+                         stdout=out)
+            parsed = self._csv(gzip.decompress(path.read_bytes()))
+        self.assertEqual(len(parsed) - 1, 13)
+        self.assertIn("13", out.getvalue())
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LookupHistory.objects.bulk_create(
+            LookupHistory(query_type=LookupHistory.QueryType.PHONE, query_value=f"05{i:08d}", action="lookup")
+            for i in range(12)
+        )
+        cls.admin_user = User.objects.create_superuser("root", password="x")
+
+    def paginator(self, qs, per_page=5):
+        return admin_utils.EstimatedCountPaginator(qs.order_by("pk"), per_page)
+
+    def test_unfiltered_count_is_estimated_from_pk_range(self):
+        p = self.paginator(LookupHistory.objects.all())
+        with mock.patch.object(admin_utils, "COUNT_CAP", 4), self.assertNumQueries(1):
+            self.assertEqual(p.count, 12)
+        self.assertTrue(p.approximate)
+        self.assertFalse(p.capped)
+
+    def test_small_estimate_falls_back_to_a_bounded_count(self):
+        # تقدير قديم أصغر من الواقع (مثل reltuples قبل ANALYZE) لا يفتح "عرض الكل" على الجدول كله
+        p = self.paginator(LookupHistory.objects.all())
+        with mock.patch.object(admin_utils, "estimate_table_rows", return_value=3), \
+                mock.patch.object(admin_utils, "COUNT_CAP", 10):
+            self.assertEqual(p.count, 10)
+            self.assertTrue(p.capped)
+        small = self.paginator(LookupHistory.objects.all())
+        with mock.patch.object(admin_utils, "estimate_table_rows", return_value=3):
+            self.assertEqual(small.count, 12)
+            self.assertFalse(small.approximate)
+
+    def test_filtered_count_below_cap_is_exact(self):
+        p = self.paginator(LookupHistory.objects.filter(query_value__lt="0500000005"))
+        self.assertEqual(p.count, 5)
+        self.assertFalse(p.approximate)
+        self.assertEqual(p.display_count, "5")
+
+    def test_capped_count_keeps_paging_open(self):
+        qs = LookupHistory.objects.filter(action="lookup")
+        with mock.patch.object(admin_utils, "COUNT_CAP", 4):
+            p = self.paginator(qs, per_page=2)
+            self.assertEqual(p.count, 4)
+            self.assertTrue(p.capped)
+            self.assertEqual(p.display_count, "4+")
+            # الصفحة 3 بعد الحد ممتلئة → تظهر صفحة تالية
+            page = p.page(3)
+            self.assertEqual(len(page), 2)
+            self.assertTrue(page.has_next())
+            # آخر صفحة فعلية (12 صفًا) لا تفتح ما بعدها
+            last = p.page(6)
+            self.assertEqual([h.query_value for h in last], ["0500000010", "0500000011"])
+            self.assertFalse(last.has_next())
+            with self.assertRaises(admin_utils.EmptyPage):
+                p.page(7)
+
+    def test_changelist_shows_capped_count_and_pages_past_it(self):
+        self.client.force_login(self.admin_user)
+        url = reverse("admin:lookup_lookuphistory_changelist")
+        with mock.patch.object(admin_utils, "COUNT_CAP", 4), \
+                mock.patch.object(LookupHistoryAdmin, "list_per_page", 2):
+            first = self.client.get(url, {"query_type__exact": "phone"})
+            past = self.client.get(url, {"query_type__exact": "phone", "p": 5})
+        self.assertContains(first, "4+")
+        # ترتيب تنازلي بالمفتاح: الصفحة 5 (بعد الحد) فيها الصفّان الرابع والثالث
+        self.assertContains(past, ">0500000003<")
+        self.assertContains(past, "?p=6&amp;")
+
+    def test_prefix_search_is_a_range(self):
+        ma = site._registry[LookupHistory]
+        qs, dupes = ma.get_search_results(None, LookupHistory.objects.all(), " 050000001 ")
+        self.assertFalse(dupes)
+        self.assertEqual(sorted(h.query_value for h in qs), ["0500000010", "0500000011"])
+        sql = str(qs.query)
+        self.assertNotIn("LIKE", sql.upper())
+        self.assertEqual(ma.get_search_results(None, LookupHistory.objects.all(), "  ")[0].count(), 12)
+
+
+class NormalizeNameTests(SimpleTestCase):
+    def test_alef_forms_fold_to_bare_alef(self):
+        self.assertEqual(normalize_name("أحمد إبراهيم آمنة ٱلله"), "احمد ابراهيم امنه الله")
+
+    def test_ya_and_hamza_seats(self):
+        self.assertEqual(normalize_name("مصطفى هانئ مؤمن"), "مصطفي هاني مومن")
+
+    def test_ta_marbuta(self):
+        self.assertEqual(normalize_name("فاطمة"), "فاطمه")
+
+    def test_tashkeel_tatweel_case_and_spaces(self):
+        self.assertEqual(normalize_name("  مُحَمَّــد   Ali "), "محمد ali")
+        self.assertEqual(normalize_name(None), "")
+
+
+class CustomerAdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ahmad = Customer.objects.create(full_name="أَحمد العتيبي", account_no="AC1001", mobile="0551234567")
+        cls.fatima = Customer.objects.create(full_name="فاطمة الزهراني", account_no="AC2002", mobile="0559876543")
+        cls.admin_user = User.objects.create_superuser("root", password="x")
+
+    def search(self, term):
+        ma = site._registry[Customer]
+        qs, _ = ma.get_search_results(None, Customer.objects.all(), term)
+        return set(qs)
+
+    def test_name_prefix_is_normalized(self):
+        self.assertEqual(self.search("احمد"), {self.ahmad})
+        self.assertEqual(self.search("فاطمه الز"), {self.fatima})
+
+    def test_identifier_prefix_ignores_spaces(self):
+        self.assertEqual(self.search("AC2"), {self.fatima})
+        self.assertEqual(self.search("055 123"), {self.ahmad})
+        self.assertEqual(self.search("0000"), set())
+
+    def test_changelist_search(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse("admin:lookup_customer_changelist"), {"q": "أحمد"})
+        self.assertContains(response, "AC1001")
+        self.assertNotContains(response, "AC2002")
+
+
+class LookupSessionStateTests(TestCase):
+    def request(self):
+        request = RequestFactory().get("/")
+        request.session = importlib.import_module(settings.SESSION_ENGINE).SessionStore()
+        return request
+
+    def test_update_drops_empty_values(self):
+        request = self.request()
+        _update_lookup_state(request, src="manual", cid=None, data={"full_name": "سارة"}, role="")
+        self.assertEqual(_lookup_state(request), {"src": "manual", "data": {"full_name": "سارة"}})
+        _update_lookup_state(request, src="db", cid=5, data=None)
+        self.assertEqual(_lookup_state(request), {"src": "db", "cid": 5})
+
+    def test_unchanged_state_does_not_mark_session_modified(self):
+        request = self.request()
+        _update_lookup_state(request, src="db", cid=5)
+        request.session.modified = False
+        _update_lookup_state(request, cid=5, data=None)
+        self.assertFalse(request.session.modified)
+        _update_lookup_state(request, role="owner")
+        self.assertTrue(request.session.modified)
+
+    def test_current_customer_from_db(self):
+        customer = Customer.objects.create(full_name="سارة", account_no="AC9")
+        request = self.request()
+        self.assertEqual(_current_customer(request, {"src": "db", "cid": customer.pk}), customer)
+        with self.assertRaises(Http404):
+            _current_customer(request, {"src": "db", "cid": customer.pk + 1})
+
+    def test_current_customer_manual_and_missing(self):
+        request = self.request()
+        manual = _current_customer(request, {"src": "manual", "data": {"full_name": "سارة", "phone": "0551"}})
+        self.assertEqual((manual.id, manual.full_name, manual.mobile, manual.account_no), (None, "سارة", "0551", ""))
+        self.assertIsNone(_current_customer(request, {"src": "manual"}))
+        self.assertIsNone(_current_customer(request, {}))
+
+
+class ServiceCatalogTests(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.addCleanup(catalog.invalidate)
+
+    def test_loaded_once_per_version(self):
+        with self.assertNumQueries(1):
+            first = catalog.get_catalog()
+            self.assertIs(catalog.get_catalog(), first)
+        item = first.get("pay_debt")
+        self.assertEqual(item.href, reverse("lookup:service_request", args=["pay_debt"]))
+        self.assertEqual(item.title, "طلب تسديد مديونية")
+        self.assertEqual([s.key for s in first.services()][:2], ["transfer_meter", "pay_debt"])
+
+    def test_disabling_a_service_invalidates_the_catalog(self):
+        self.assertIn("pay_debt", catalog.get_catalog())
+        with self.captureOnCommitCallbacks(execute=True):
+            service = Service.objects.get(key="pay_debt")
+            service.enabled = False
+            service.save()
+
+        current = catalog.get_catalog()
+        self.assertNotIn("pay_debt", current)
+        self.assertIsNone(current.get("pay_debt"))
+        self.assertNotIn("pay_debt", [s.key for s in current.services()])
+        # الطلبات القديمة تبقى بعنوانها
+        self.assertEqual(catalog.service_title("pay_debt"), "طلب تسديد مديونية")
+        self.assertEqual(catalog.service_title("removed_key"), "removed_key")
+
+    def test_seeded_texts_are_marked_for_translation(self):
+        seed = importlib.import_module("lookup.migrations.0010_service_catalog")
+        texts = {text for _key, title, desc in seed.SERVICES for text in (title, desc)}
+        self.assertEqual(texts, set(catalog.SEEDED_MESSAGES))
+
+
+class TemplateCachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.invalidate()
+        self.addCleanup(catalog.invalidate)
+        user = User.objects.create_user(username="0500000001", password="x")
+        Customer.objects.create(full_name="أحمد علي", national_id="1000000001", mobile="0500000009")
+        self.client.force_login(user)
+        self.client.post(reverse("lookup:home"), {"national_id": "1000000001"})
+        self.client.post(reverse("lookup:choose_role"), {"role": "owner"})
+
+    def test_services_grid_cached_per_role_language_and_catalog_load(self):
+        response = self.client.get(reverse("lookup:services"))
+        self.assertNotContains(response, "<style>")
+        self.assertContains(response, 'rel="stylesheet"')
+        self.assertContains(response, reverse("lookup:service_request", args=["pay_debt"]))
+
+        key = make_template_fragment_key("services_grid", ["owner", "ar", catalog.get_catalog().load_id])
+        self.assertIn("طلب تسديد مديونية", cache.get(key))
+
+        # إيقاف خدمة → إصدار جديد → جزء جديد بدونها
+        with self.captureOnCommitCallbacks(execute=True):
+            service = Service.objects.get(key="pay_debt")
+            service.enabled = False
+            service.save()
+        response = self.client.get(reverse("lookup:services"))
+        self.assertNotContains(response, reverse("lookup:service_request", args=["pay_debt"]))
+
+    def test_services_grid_follows_a_max_age_reload(self):
+        self.client.get(reverse("lookup:services"))
+        # تعديل لا يصل إصداره لهذه العملية (كما مع locmem في عملية أخرى): يظهر بعد انقضاء المهلة
+        Service.objects.filter(key="pay_debt").update(title="عنوان جديد")
+        self.assertNotContains(self.client.get(reverse("lookup:services")), "عنوان جديد")
+        later = time.monotonic() + settings.SERVICE_CATALOG_MAX_AGE + 1
+        with mock.patch.object(catalog, "time", SimpleNamespace(monotonic=lambda: later)):
+            self.assertContains(self.client.get(reverse("lookup:services")), "عنوان جديد")
+
+    def test_hashed_static_files_are_immutable(self):
+        request = RequestFactory().get("/static/x")
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            for name, expected in (("site.c56d2b6b8d14.css", static.IMMUTABLE), ("site.css", static.SHORT)):
+                (Path(root) / name).write_text("body{}")
+                response = static.serve(request, name)
+                response.file_to_stream.close()   # response.close() يُطلق request_finished فيغلق اتصال الاختبار
+                self.assertEqual(response["Cache-Control"], expected)
+
+
+class QueryPlanTests(TestCase):
+    """
+    خطة التنفيذ للاستعلامات الأساسية على بيانات مزروعة: يجب أن تبحث عبر فهرس لا أن تمسح الجدول.
+    """
+
+    ROWS = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        Customer.objects.bulk_create(
+            Customer(
+                full_name=f"عميل {i}",
+                national_id=f"1{i:09d}",
+                mobile=f"05{i:08d}",
+                meter_no=f"{i:07d}",
+                account_no=f"{900000 + i}",
+                unit_code=f"U{i:05d}",
+            )
+            for i in range(cls.ROWS)
+        )
+        types = [t for t, _label in LookupHistory.QueryType.choices]
+        LookupHistory.objects.bulk_create(
+            LookupHistory(
+                query_type=types[i % len(types)],
+                query_value=f"1{i:09d}",
+                action="lookup",
+                result_found=bool(i % 3),
+            )
+            for i in range(cls.ROWS)
+        )
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cur:
+                cur.execute("ANALYZE")
+
+    def plan(self, qs) -> str:
+        if connection.vendor == "postgresql":
+            # الجداول الصغيرة في الاختبار تغري المخطِّط بالمسح التسلسلي؛ نسأله عن الفهرس فقط
+            with connection.cursor() as cur:
+                cur.execute("SET LOCAL enable_seqscan = off")
+        return qs.explain()
+
+    def assertUsesIndex(self, qs, table: str):
+        plan = self.plan(qs)
+        if connection.vendor == "sqlite":
+            self.assertRegex(plan, rf"SEARCH {table} USING (COVERING INDEX|INDEX|INTEGER PRIMARY KEY)", plan)
+            self.assertNotRegex(plan, rf"SCAN {table}\b", plan)
+        elif connection.vendor == "postgresql":
+            self.assertIn("Index", plan, plan)
+        else:
+            self.skipTest(f"لا توجد قواعد تحقق لخطة {connection.vendor}")
+        return plan
+
+    def test_customer_lookup_by_each_identifier(self):
+        cases = {
+            "national_id": "1000001234",
+            "phone": "0500001234",
+            "meter_number": "0001234",
+            "account_number": "901234",
+            "unit_code": "u01234",  # بدون حساسية لحالة الأحرف
+        }
+        for field, value in cases.items():
+            with self.subTest(field=field):
+                qs = Customer.objects.filter(customer_filter({field: value}))
+                self.assertEqual(qs.count(), 1)
+                self.assertUsesIndex(qs, "lookup_customer")
+                # جلب النتيجة الأولى (مع ترتيب النموذج) يبقى بحثًا بالفهرس
+                self.assertUsesIndex(qs.order_by("full_name", "account_no")[:1], "lookup_customer")
+
+    def test_customer_lookup_with_name_uses_identifier_index(self):
+        qs = Customer.objects.filter(customer_filter({"full_name": "عميل", "phone": "0500000042"}))
+        self.assertUsesIndex(qs, "lookup_customer")
+
+    def test_customer_by_pk(self):
+        self.assertUsesIndex(Customer.objects.filter(pk=42), "lookup_customer")
+
+    def test_history_filtered_by_type(self):
+        qs, *_ = filter_history(LookupHistory.objects.order_by("-id"), {"type": "national", "found": "1"})
+        self.assertUsesIndex(qs, "lookup_lookuphistory")
+
+    def test_history_by_value(self):
+        qs = LookupHistory.objects.filter(query_value="1000000042")
+        self.assertUsesIndex(qs, "lookup_lookuphistory")
+
+    def test_history_first_page_needs_no_sort(self):
+        # الصفحة الأولى بترتيب المفتاح الأساسي تنازليًا: قراءة عكسية بدون فرز مؤقت
+        qs, *_ = filter_history(LookupHistory.objects.order_by("-id"), {})
+        plan = self.plan(qs[:20])
+        if connection.vendor == "sqlite":
+            self.assertNotIn("TEMP B-TREE", plan, plan)
+        elif connection.vendor == "postgresql":
+            self.assertNotIn("Sort", plan, plan)
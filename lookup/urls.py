@@ -11,6 +11,12 @@ urlpatterns = [
     # سجل الاستدعاءات
     path("history/", views.lookup_history_view, name="history"),
 
+    # تصدير سجلات التدقيق (history / access) بصيغة CSV/XLSX
+    path("export/<slug:table>/", views.export_view, name="export"),
+
+    # إحصاءات يومية (من جداول التجميع)
+    path("stats/", views.stats_view, name="stats"),
+
     # اختيار الدور (مستفيد/مالك)
     path("choose-role/", views.choose_role_view, name="choose_role"),
 
@@ -1,22 +1,33 @@
 # lookup/views.py
 from __future__ import annotations
 
-from typing import Dict, Optional, List, TypedDict
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Optional
 from types import SimpleNamespace
-import secrets
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Sum
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse, reverse_lazy
+from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .models import Customer, LookupHistory
+from access.models import AccessDailyStat, AccessLog, UserAgent
+from myprojabd.decorators import staff_required
+from notifications import outbox
+from tickets.workflow import open_ticket
+from . import exports
+from .catalog import get_catalog
+from .filters import customer_filter, filter_history
+from .models import Customer, LookupHistory, LookupDailyStat
 
 
 # ===================== أدوات مساعدة =====================
@@ -60,7 +71,7 @@ def _log_lookup(request, data: Dict[str, str], *, result_found: bool, action: st
             result_found=result_found,
             message=(message or "")[:255],
             ip_address=(request.META.get("REMOTE_ADDR") or None),
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:255],
+            user_agent_id=UserAgent.intern(request.META.get("HTTP_USER_AGENT")),
         )
     except Exception:
         # لا نكسر الصفحة إذا فشل التسجيل في السجل
@@ -98,41 +109,49 @@ def _has_minimum_manual_info(d: Dict[str, str]) -> bool:
     return False
 
 
-class ServiceItem(TypedDict):
-    key: str
-    title: str
-    desc: str
-    href: str
+# ===================== حالة الجلسة لمسار الاستعلام =====================
+# مفتاح واحد مضغوط بدل عدة مفاتيح:
+#   {"src": "db", "cid": 12, "role": "owner"}  أو  {"src": "manual", "data": {...}, "role": ...}
+# الحقول الفارغة لا تُخزَّن، ولا تُكتب الجلسة إذا لم تتغير القيمة.
+LOOKUP_SESSION_KEY = "lookup"
 
 
-def _services_catalog() -> List[ServiceItem]:
-    """
-    الكتالوج الموحد للخدمات (نفسه للمستفيد والمالك).
-    """
-    return [
-        {"key": "transfer_meter",     "title": _("طلب نقل عداد"),                         "desc": _("نقل عداد الكهرباء/المياه."),                         "href": "#"},
-        {"key": "pay_debt",           "title": _("طلب تسديد مديونية"),                   "desc": _("سداد المديونيات بشكل آمن."),                         "href": "#"},
-        {"key": "manual_request",     "title": _("طلب يدوي (نقل ملكية – تصحيح بيانات – طلب دعم…)"), "desc": _("طلبات متنوعة تُستلم يدويًا."),      "href": "#"},
-        {"key": "account_verify",     "title": _("طلب توثيق الحساب"),                    "desc": _("توثيق وربط الحساب بالمستخدم."),                       "href": "#"},
-        {"key": "activate_service",   "title": _("طلب تفعيل الخدمة"),                    "desc": _("تفعيل خدمة الكهرباء/المياه."),                        "href": "#"},
-        {"key": "beneficiary_update", "title": _("تحديث بيانات المستفيد"),               "desc": _("تعديل بيانات التواصل."),                              "href": "#"},
-        {"key": "manual_ticket",      "title": _("بلاغ أو استفسار يدوي"),                 "desc": _("إنشاء بلاغ/استفسار ومتابعته."),                      "href": "#"},
-    ]
+def _lookup_state(request) -> Dict:
+    return request.session.get(LOOKUP_SESSION_KEY) or {}
+
 
+def _update_lookup_state(request, **changes) -> None:
+    """تحديث حالة المسار وتعليم الجلسة كمعدّلة فقط عند وجود تغيير فعلي."""
+    state = _lookup_state(request)
+    new_state = {**state, **changes}
+    new_state = {k: v for k, v in new_state.items() if v not in (None, "", {})}
+    if new_state != state:
+        request.session[LOOKUP_SESSION_KEY] = new_state
 
-def _generate_ref() -> str:
-    """توليد رقم مرجعي مختصر، مثال: UW-250820-9F3A7C"""
-    return f"UW-{timezone.now():%y%m%d}-{secrets.token_hex(3).upper()}"
+
+def _current_customer(request, state: Dict):
+    """العميل الحالي من حالة الجلسة (كائن Customer أو بديل يدوي)، أو None."""
+    source = state.get("src")
+    if source == "db":
+        cid = state.get("cid")
+        return get_object_or_404(Customer, id=cid) if cid else None
+    if source == "manual":
+        data = state.get("data")
+        return _simple_customer_from_dict(data) if data else None
+    return None
 
 
-def _send_notification(customer_obj, ref: str, service_title: str) -> None:
+def _queue_notifications(customer_obj, ref: str, service_title: str) -> None:
     """
-    إشعارات تجريبية إلى الكونسول (مثل OTP) — استبدليها لاحقًا بإرسال فعلي.
+    إشعار العميل بالطلب (SMS + بريد) عبر صندوق الصادر — يُستدعى داخل معاملة إنشاء الطلب
+    فلا يُرسل إشعار لطلب لم يُحفظ؛ الإرسال الفعلي في manage.py dispatch_outbox.
     """
-    phone = getattr(customer_obj, "mobile", "") or "-"
-    email = getattr(customer_obj, "email", "") or "-"
-    print(f"[DEV] SMS to {phone}: تم إنشاء طلب '{service_title}'. رقمك المرجعي: {ref}")
-    print(f"[DEV] EMAIL to {email}: تم إنشاء طلب '{service_title}'. رقمك المرجعي: {ref}")
+    text = f"تم إنشاء طلب '{service_title}'. رقمك المرجعي: {ref}"
+    outbox.enqueue("sms", getattr(customer_obj, "mobile", "") or "", text, dedupe_key=f"{ref}:sms")
+    outbox.enqueue(
+        "email", getattr(customer_obj, "email", "") or "", text,
+        subject=f"طلب {service_title} — {ref}", dedupe_key=f"{ref}:email",
+    )
 
 
 # ===================== استدعاء البيانات =====================
@@ -191,23 +210,15 @@ def data_lookup_view(request):
             return render(request, "lookup/data_lookup.html", {"data": {**initial, **data}, "errors": errors})
 
         # البحث
-        q = Q()
-        if data["full_name"]:      q &= Q(full_name__icontains=data["full_name"])
-        if data["meter_number"]:   q &= Q(meter_no__iexact=data["meter_number"])
-        if data["account_number"]: q &= Q(account_no__iexact=data["account_number"])
-        if data["national_id"]:    q &= Q(national_id__iexact=data["national_id"])
-        if data["phone"]:          q &= Q(mobile__iexact=data["phone"])
-        if data["unit_code"]:      q &= Q(unit_code__iexact=data["unit_code"])
-        if data["email"]:          q &= Q(email__iexact=data["email"])
-
-        queryset = Customer.objects.filter(q)
+        queryset = Customer.objects.filter(customer_filter(data))
         count = queryset.count()
 
         if count == 0:
             # نكمل يدويًا لو المدخلات كافية
             if _has_minimum_manual_info(data):
-                request.session["customer_source"] = "manual"
-                request.session["customer_data"] = data
+                _update_lookup_state(
+                    request, src="manual", cid=None, data={k: v for k, v in data.items() if v}
+                )
                 _log_lookup(request, data, result_found=True, action=action, message=_("إدخال يدوي بلا تطابق."))
                 messages.info(request, _("لم نجد تطابقًا في النظام، سنُكمل بالبيانات المدخلة."))
                 return redirect("lookup:choose_role")
@@ -218,8 +229,7 @@ def data_lookup_view(request):
 
         if count == 1:
             selected = queryset.first()
-            request.session["customer_source"] = "db"
-            request.session["customer_id"] = selected.id
+            _update_lookup_state(request, src="db", cid=selected.id, data=None)
             _log_lookup(request, data, result_found=True, action=action, message=_("تطابق واحد."))
             return redirect("lookup:choose_role")
 
@@ -241,26 +251,14 @@ def data_lookup_view(request):
 
 @login_required(login_url=reverse_lazy("access:login"))
 def choose_role_view(request):
-    source = request.session.get("customer_source")
-    customer_obj = None
-
-    if source == "db":
-        cid = request.session.get("customer_id")
-        if not cid:
-            return redirect("lookup:home")
-        customer_obj = get_object_or_404(Customer, id=cid)
-    elif source == "manual":
-        data = request.session.get("customer_data")
-        if not data:
-            return redirect("lookup:home")
-        customer_obj = _simple_customer_from_dict(data)
-    else:
+    customer_obj = _current_customer(request, _lookup_state(request))
+    if customer_obj is None:
         return redirect("lookup:home")
 
     if request.method == "POST":
         role = request.POST.get("role")
         if role in ("beneficiary", "owner"):
-            request.session["role"] = role
+            _update_lookup_state(request, role=role)
             return redirect("lookup:services")
         messages.error(request, _("فضلاً اختر نوع المستخدم."))
 
@@ -275,25 +273,19 @@ def services_view(request):
     صفحة خدمات موحدة للجميع، مع شارة توضح الدور المختار.
     يعتمد على مصدر العميل (قاعدة البيانات أو إدخال يدوي).
     """
-    source = request.session.get("customer_source")
-    role = request.session.get("role")  # "beneficiary" أو "owner"
+    state = _lookup_state(request)
+    role = state.get("role")  # "beneficiary" أو "owner"
 
-    if role not in ("beneficiary", "owner") or source not in ("db", "manual"):
+    if role not in ("beneficiary", "owner"):
         return redirect("lookup:home")
 
-    if source == "db":
-        cid = request.session.get("customer_id")
-        if not cid:
-            return redirect("lookup:home")
-        customer_obj = get_object_or_404(Customer, id=cid)
-    else:
-        data = request.session.get("customer_data") or {}
-        customer_obj = _simple_customer_from_dict(data)
-
-    # بناء الروابط إلى المنظر العام لكل خدمة
-    services = _services_catalog()
-    for s in services:
-        s["href"] = reverse("lookup:service_request", args=[s["key"]])
+    customer_obj = _current_customer(request, state)
+    if customer_obj is None:
+        return redirect("lookup:home")
+
+    # جاهزة من سجل الخدمات (الروابط والعناوين محسوبة مسبقًا لكل لغة)
+    catalog = get_catalog()
+    services = catalog.services()
 
     return render(
         request,
@@ -303,6 +295,9 @@ def services_view(request):
             "role": role,
             "is_beneficiary": role == "beneficiary",
             "services": services,
+            "catalog_id": catalog.load_id,
+            # لا يعيش الجزء المخزّن أطول من الكتالوج نفسه في هذه العملية
+            "grid_cache_seconds": getattr(settings, "SERVICE_CATALOG_MAX_AGE", 300),
         },
     )
 
@@ -314,35 +309,42 @@ def service_request_view(request, key: str):
     """
     منظر عام لكل الخدمات:
     - يتحقق من الجلسة والدور.
-    - يولد رقمًا مرجعيًا.
+    - ينشئ Ticket برقم مرجعي مرتب زمنيًا (tickets.refs).
     - يسجّل العملية في LookupHistory.
-    - يرسل إشعارًا تجريبيًا (SMS/Email via console).
+    - يُدرج إشعارات SMS/Email في صندوق الصادر (notifications) ضمن معاملة الطلب.
     - يعيد التوجيه لصفحة الخدمات مع رسالة نجاح.
     """
-    source = request.session.get("customer_source")
-    role = request.session.get("role")
-    if role not in ("beneficiary", "owner") or source not in ("db", "manual"):
+    state = _lookup_state(request)
+    role = state.get("role")
+    if role not in ("beneficiary", "owner"):
         return redirect("lookup:home")
 
     # جلب بيانات العميل
-    if source == "db":
-        cid = request.session.get("customer_id")
-        if not cid:
-            return redirect("lookup:home")
-        customer_obj = get_object_or_404(Customer, id=cid)
-    else:
-        data = request.session.get("customer_data") or {}
-        customer_obj = _simple_customer_from_dict(data)
-
-    # تحقق من مفتاح الخدمة
-    catalog = {s["key"]: s for s in _services_catalog()}
-    svc = catalog.get(key)
+    customer_obj = _current_customer(request, state)
+    if customer_obj is None:
+        return redirect("lookup:home")
+
+    # تحقق من مفتاح الخدمة (الخدمات المفعّلة فقط)
+    svc = get_catalog().get(key)
     if not svc:
         messages.error(request, _("الخدمة غير متاحة."))
         return redirect("lookup:services")
 
-    # إنشاء مرجع وتسجيل
-    ref = _generate_ref()
+    # إنشاء الطلب مع حدث الإنشاء والإشعارات في معاملة واحدة
+    # (الرقم المرجعي يُولَّد محليًا بلا تعارض ولا إعادة محاولة)
+    with transaction.atomic():
+        ticket = open_ticket(
+            actor=request.user,
+            ticket_type=key,
+            user=request.user,
+            customer=customer_obj if isinstance(customer_obj, Customer) else None,
+            role=role,
+            contact_name=getattr(customer_obj, "full_name", "") or "",
+            contact_phone=getattr(customer_obj, "mobile", "") or "",
+            contact_email=getattr(customer_obj, "email", "") or "",
+        )
+        ref = ticket.reference_number
+        _queue_notifications(customer_obj, ref, svc.title)
     _log_lookup(
         request,
         data={
@@ -354,15 +356,12 @@ def service_request_view(request, key: str):
         },
         result_found=True,
         action=f"request:{key}",
-        message=f"ref={ref}; role={role}; title={svc['title']}",
+        message=f"ref={ref}; role={role}; title={svc.title}",
     )
 
-    # إشعار داخلي تجريبي
-    _send_notification(customer_obj, ref, svc["title"])
-
     messages.success(
         request,
-        _(f"تم إنشاء الطلب: {svc['title']} — رقمك المرجعي: {ref}. تم إرسال إشعار عبر SMS/Email.")
+        _(f"تم إنشاء الطلب: {svc.title} — رقمك المرجعي: {ref}. سيصلك إشعار عبر SMS/Email.")
     )
     return redirect("lookup:services")
 
@@ -371,27 +370,7 @@ def service_request_view(request, key: str):
 
 @login_required(login_url=reverse_lazy("access:login"))
 def lookup_history_view(request):
-    qs = LookupHistory.objects.all().order_by("-id")
-
-    qtext = (request.GET.get("q") or "").strip()
-    t = (request.GET.get("type") or "").strip()
-    r = request.GET.get("found")
-
-    if qtext:
-        qs = qs.filter(
-            Q(query_value__icontains=qtext)
-            | Q(full_name__icontains=qtext)
-            | Q(phone__icontains=qtext)
-            | Q(national_id__icontains=qtext)
-            | Q(account_number__icontains=qtext)
-            | Q(meter_number__icontains=qtext)
-            | Q(unit_code__icontains=qtext)
-            | Q(email__icontains=qtext)
-        )
-    if t:
-        qs = qs.filter(query_type=t)
-    if r in ("0", "1"):
-        qs = qs.filter(result_found=(r == "1"))
+    qs, qtext, t, r = filter_history(LookupHistory.objects.all().order_by("-id"), request.GET)
 
     paginator = Paginator(qs, 20)
     page_obj = paginator.get_page(request.GET.get("page"))
@@ -401,3 +380,115 @@ def lookup_history_view(request):
         "lookup/history.html",
         {"page_obj": page_obj, "types": LookupHistory.QueryType.choices, "q": qtext, "t": t, "r": r},
     )
+
+
+# ===================== الإحصاءات اليومية =====================
+
+@staff_required
+def stats_view(request):
+    """
+    لوحة إحصاءات تقرأ جداول التجميع اليومية فقط (LookupDailyStat / AccessDailyStat).
+    - ?days=N لعدد الأيام (الافتراضي 30، الحد الأقصى 366).
+    - ?format=json لإرجاع JSON بدل الصفحة.
+    """
+    try:
+        days = max(1, min(int(request.GET.get("days") or 30), 366))
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    lookup_rows = list(
+        LookupDailyStat.objects.filter(day__gte=since)
+        .values("day", "query_type", "action", "result_found", "count")
+        .order_by("-day", "query_type", "action", "result_found")
+    )
+
+    # نجاح/فشل الدخول لكل يوم
+    logins: Dict = defaultdict(lambda: {"success": 0, "fail": 0})
+    login_qs = AccessDailyStat.objects.filter(
+        day__gte=since, action__in=[AccessLog.Actions.LOGIN, AccessLog.Actions.FAIL]
+    ).values_list("day", "action", "count")
+    for day, act, n in login_qs:
+        logins[day]["success" if act == AccessLog.Actions.LOGIN else "fail"] += n
+    login_rows = [{"day": d, **v} for d, v in sorted(logins.items(), reverse=True)]
+
+    # إجماليات حسب نوع المعرّف
+    by_type = list(
+        LookupDailyStat.objects.filter(day__gte=since)
+        .values("query_type", "result_found")
+        .annotate(total=Sum("count"))
+        .order_by("query_type", "result_found")
+    )
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "since": since.isoformat(),
+            "days": days,
+            "lookups": [{**r, "day": r["day"].isoformat()} for r in lookup_rows],
+            "lookups_by_type": by_type,
+            "logins": [{**r, "day": r["day"].isoformat()} for r in login_rows],
+        })
+
+    return render(
+        request,
+        "lookup/stats.html",
+        {
+            "days": days,
+            "since": since,
+            "lookup_rows": lookup_rows,
+            "login_rows": login_rows,
+            "by_type": by_type,
+            "type_labels": dict(LookupHistory.QueryType.choices),
+        },
+    )
+
+
+# ===================== تصدير سجلات التدقيق =====================
+
+@staff_required
+def export_view(request, table: str):
+    """
+    تصدير LookupHistory (table=history) أو AccessLog (table=access).
+    - نفس فلاتر صفحة السجل (q / type / found) + since/until (+ action لسجل الدخول).
+    - ?format=csv (افتراضي، بث مباشر) أو xlsx (حتى exports.XLSX_HTTP_MAX_ROWS صف فقط).
+    - ?gzip=1 لضغط CSV أثناء البث.
+    """
+    try:
+        header, rows, filename = exports.build_export(table, request.GET)
+    except KeyError:
+        raise Http404
+
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M")
+    fmt = (request.GET.get("format") or "csv").lower()
+
+    if fmt == "xlsx":
+        # XLSX يُبنى كاملًا داخل الطلب قبل أول بايت؛ الأكبر يُصدَّر CSV (بث) أو بأمر export_audit
+        if exports.exceeds(table, request.GET, exports.XLSX_HTTP_MAX_ROWS):
+            return HttpResponseBadRequest(
+                f"التصدير يتجاوز {exports.XLSX_HTTP_MAX_ROWS:,} صف: استخدم format=csv "
+                f"أو الأمر manage.py export_audit {table} --format xlsx -o <ملف>.",
+                content_type="text/plain; charset=utf-8",
+            )
+        import tempfile
+
+        tmp = tempfile.TemporaryFile()
+        exports.write_xlsx(tmp, header, rows, title=filename)
+        tmp.seek(0)
+        return FileResponse(
+            tmp,
+            as_attachment=True,
+            filename=f"{filename}-{stamp}.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    stream = exports.iter_csv(header, rows)
+    name = f"{filename}-{stamp}.csv"
+    content_type = "text/csv; charset=utf-8"
+    if request.GET.get("gzip") == "1":
+        stream = exports.gzip_stream(stream)
+        name += ".gz"
+        content_type = "application/gzip"
+
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    return response
@@ -0,0 +1,191 @@
+# myprojabd/admin_utils.py
+"""
+أدوات لوحة الإدارة للجداول الضخمة (سجلات التدقيق):
+- عدّ تقديري بدل COUNT(*) الكامل.
+- بحث يعتمد على الفهارس فقط (تطابق تام أو بادئة كنطاق).
+- فلتر تاريخ يقرأ الأيام من جداول التجميع اليومية بدل SELECT DISTINCT.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import cached_property
+
+from django.contrib import admin
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# أقصى عدد صفوف نعدّها فعليًا عند وجود فلاتر (ما فوقه يظهر كحد أعلى)
+COUNT_CAP = 10_000
+
+
+def estimate_table_rows(model, using: str = "default") -> int:
+    """
+    تقدير عدد صفوف الجدول دون مسحه:
+    - PostgreSQL: pg_class.reltuples (تحدّثه ANALYZE/autovacuum).
+    - MySQL: information_schema.TABLES.TABLE_ROWS.
+    - SQLite/غيرها: MAX(pk) - MIN(pk) + 1 (قراءة طرفي فهرس المفتاح الأساسي).
+    """
+    conn = connections[using]
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    with conn.cursor() as cur:
+        if conn.vendor == "postgresql":
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cur.fetchone()
+            if row and row[0] and row[0] > 0:
+                return int(row[0])
+        elif conn.vendor == "mysql":
+            cur.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+            row = cur.fetchone()
+            if row and row[0]:
+                return int(row[0])
+        qn = conn.ops.quote_name
+        cur.execute(f"SELECT MIN({qn(pk)}), MAX({qn(pk)}) FROM {qn(table)}")
+        lo, hi = cur.fetchone()
+    if lo is None:
+        return 0
+    return int(hi) - int(lo) + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    ترقيم صفحات بدون عدّ كامل:
+    - بدون فلاتر: تقدير من إحصاءات الجدول ما دام فوق COUNT_CAP.
+    - مع فلاتر، أو تقدير صغير: عدّ محدود بـ COUNT_CAP (COUNT على استعلام فرعي بـ LIMIT)
+      ويُعرض "10,000+" عند بلوغه. التقدير الصغير قد يكون قديمًا (reltuples بعد تحميل جماعي)،
+      وChangeList يقرر منه "عرض الكل" (count <= list_max_show_all) فلا نثق به.
+    في الحالتين العدد غير دقيق، فلا يُغلق الترقيم عنده: أي صفحة ممتلئة
+    تفتح الصفحة التالية (انظر page).
+    """
+    # True حين يكون count تقديرًا أو حدًا أعلى لا العدد الفعلي
+    approximate = False
+    capped = False
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        query = getattr(qs, "query", None)
+        if query is None:
+            return super().count
+        if not query.where:
+            estimate = estimate_table_rows(qs.model, qs.db)
+            if estimate > COUNT_CAP:
+                self.approximate = True
+                return estimate
+        # صف إضافي فوق الحد يكفي لمعرفة أن هناك المزيد
+        n = qs[: COUNT_CAP + 1].count()
+        if n > COUNT_CAP:
+            self.approximate = self.capped = True
+            return COUNT_CAP
+        return n
+
+    @property
+    def display_count(self) -> str:
+        """العدد كما يُعرض في قائمة الإدارة."""
+        if self.capped:
+            return f"{COUNT_CAP:,}+"
+        return str(self.count)
+
+    def validate_number(self, number):
+        if not (self.count and self.approximate):
+            return super().validate_number(number)
+        # لا حد أعلى معروف؛ وجود الصفوف يُتحقق منه في page()
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        if not (self.count and self.approximate):
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # صف زائد لمعرفة وجود صفحة تالية دون عدّ
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        seen = bottom + len(rows)
+        if seen > self.count:
+            # نمدّ العدد المعروف ليشمل هذه الصفحة (والتالية إن كانت ممتلئة)
+            self.count = seen
+            self.__dict__.pop("num_pages", None)
+            self.__dict__.pop("page_range", None)
+        return self._get_page(rows[: self.per_page], number, self)
+
+
+class RollupDateFilter(admin.SimpleListFilter):
+    """
+    فلتر يومي: الأيام المتاحة تُقرأ من جدول التجميع (صف لكل يوم تقريبًا)،
+    والتصفية نطاق على عمود timestamp المفهرس.
+    على الصنف الفرعي تحديد rollup_model.
+    """
+    title = _("اليوم")
+    parameter_name = "day"
+    rollup_model = None
+    field_name = "timestamp"
+    max_days = 60
+
+    def lookups(self, request, model_admin):
+        days = (
+            self.rollup_model.objects.order_by("-day")
+            .values_list("day", flat=True)
+            .distinct()[: self.max_days]
+        )
+        return [(d.isoformat(), d.strftime("%Y-%m-%d")) for d in days]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            return queryset
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return queryset.filter(**{
+            f"{self.field_name}__gte": start,
+            f"{self.field_name}__lt": start + timedelta(days=1),
+        })
+
+
+class LargeTableAdminMixin:
+    """
+    خلطة لـ ModelAdmin على الجداول الضخمة.
+    search_fields بنفس صيغة Django لكن التنفيذ يعتمد على الفهارس فقط:
+    "=field" تطابق تام، و"^field" بادئة كنطاق (بدون icontains/LIKE '%..%').
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def normalize_search_term(self, field: str, term: str) -> str:
+        """تطبيع نص البحث لحقل معيّن (افتراضيًا بدون تغيير)."""
+        return term
+
+    def get_search_results(self, request, queryset, search_term):
+        term = (search_term or "").strip()
+        fields = self.get_search_fields(request)
+        if not term or not fields:
+            return queryset, False
+
+        q = Q()
+        for spec in fields:
+            field = spec.lstrip("=^")
+            value = self.normalize_search_term(field, term)
+            if not value:
+                continue
+            if spec.startswith("^"):
+                # بادئة كنطاق [value, value + أعلى محرف) → يستخدم فهرس B-tree في أي قاعدة
+                q |= Q(**{f"{field}__gte": value, f"{field}__lt": value + "\U0010ffff"})
+            else:
+                q |= Q(**{field: value})
+        return queryset.filter(q), False
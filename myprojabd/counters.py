@@ -0,0 +1,21 @@
+# myprojabd/counters.py
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def increment_counter(model, *, by: int = 1, field: str = "count", **dims) -> None:
+    """
+    زيادة عدّاد مُجمّع (صف واحد لكل تركيبة أبعاد) بشكل ذري.
+    - نحاول UPDATE أولًا (الحالة الشائعة).
+    - إن لم يوجد الصف ننشئه، وإن سبقنا عامل آخر (قيد فريد) نعيد التحديث.
+    """
+    if not by:
+        return
+    qs = model.objects.filter(**dims)
+    if qs.update(**{field: F(field) + by}):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**{field: by}, **dims)
+    except IntegrityError:
+        qs.update(**{field: F(field) + by})
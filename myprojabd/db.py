@@ -0,0 +1,114 @@
+# myprojabd/db.py
+"""
+إعداد قاعدة البيانات من متغيرات البيئة.
+
+DB_ENGINE=sqlite (افتراضي):
+    DB_NAME                مسار الملف (الافتراضي db.sqlite3 في جذر المشروع)
+    SQLITE_BUSY_TIMEOUT    ثوانٍ انتظار القفل قبل "database is locked" (افتراضي 20)
+    SQLITE_MMAP_SIZE       بايت (افتراضي 256MB)
+    SQLITE_CACHE_SIZE      صفحات؛ القيمة السالبة بالكيلوبايت (افتراضي -65536 = 64MB)
+  تُطبَّق PRAGMAs على كل اتصال جديد (init_command):
+    journal_mode=WAL (القرّاء لا يحجبون الكاتب)، synchronous=NORMAL (آمن مع WAL وأسرع)،
+    busy_timeout، mmap_size، cache_size، temp_store=MEMORY.
+  مع transaction_mode=IMMEDIATE: المعاملة تحجز قفل الكتابة من بدايتها فتنتظر دورها
+  ضمن busy_timeout بدل الفشل الفوري عند ترقية قفل القراءة.
+
+DB_REPLICAS (اختياري) نسخ القراءة، مفصولة بفواصل → أسماء replica1, replica2, ...
+  SQLite: مسارات ملفات (تُفتح للقراءة فقط)، أو "ro" لفتح ملف القاعدة الأساسية نفسه للقراءة فقط.
+  PostgreSQL: أسماء مضيفين (host أو host:port) بنفس بيانات الدخول.
+
+DB_ENGINE=postgresql:
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+    DB_CONN_MAX_AGE        ثوانٍ لإبقاء الاتصال مفتوحًا بين الطلبات (افتراضي 60)
+  مع CONN_HEALTH_CHECKS لفحص الاتصال المُعاد استخدامه قبل الطلب.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+def sqlite_config(name, *, prefix: str = "") -> dict:
+    busy = float(_env("SQLITE_BUSY_TIMEOUT", "20"))
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(busy * 1000)}",
+        f"PRAGMA mmap_size={int(_env('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        f"PRAGMA cache_size={int(_env('SQLITE_CACHE_SIZE', '-65536'))}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    name = Path(name)
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "OPTIONS": {
+            "timeout": busy,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": ";".join(pragmas),
+        },
+        # قاعدة اختبار على ملف (لا في الذاكرة) ليعمل WAL واختبارات التزامن كما في الإنتاج
+        "TEST": {"NAME": name.with_name(f"test_{name.name}")},
+    }
+
+
+def sqlite_replica_config(name) -> dict:
+    """اتصال SQLite للقراءة فقط (mode=ro): بدون IMMEDIATE وبدون تغيير journal_mode."""
+    busy = float(_env("SQLITE_BUSY_TIMEOUT", "20"))
+    pragmas = [
+        f"PRAGMA busy_timeout={int(busy * 1000)}",
+        f"PRAGMA mmap_size={int(_env('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        f"PRAGMA cache_size={int(_env('SQLITE_CACHE_SIZE', '-65536'))}",
+    ]
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{Path(name).resolve()}?mode=ro",
+        "OPTIONS": {"timeout": busy, "init_command": ";".join(pragmas)},
+        "TEST": {"MIRROR": "default"},
+    }
+
+
+def postgresql_config() -> dict:
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": _env("DB_NAME", "myprojabd"),
+        "USER": _env("DB_USER", "postgres"),
+        "PASSWORD": _env("DB_PASSWORD", ""),
+        "HOST": _env("DB_HOST", "127.0.0.1"),
+        "PORT": _env("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(_env("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "connect_timeout": int(_env("DB_CONNECT_TIMEOUT", "5")),
+        },
+    }
+
+
+def replicas_from_env(base_dir: Path) -> dict:
+    """نسخ القراءة من DB_REPLICAS → {"replica1": {...}, ...}."""
+    entries = [e.strip() for e in _env("DB_REPLICAS", "").split(",") if e.strip()]
+    engine = _env("DB_ENGINE", "sqlite").lower()
+    replicas = {}
+    for i, entry in enumerate(entries, start=1):
+        if engine in ("postgres", "postgresql"):
+            config = postgresql_config()
+            host, _, port = entry.partition(":")
+            config.update({"HOST": host, "PORT": port or config["PORT"], "TEST": {"MIRROR": "default"}})
+        else:
+            primary = _env("DB_NAME", str(base_dir / "db.sqlite3"))
+            config = sqlite_replica_config(primary if entry == "ro" else entry)
+        replicas[f"replica{i}"] = config
+    return replicas
+
+
+def database_from_env(base_dir: Path) -> dict:
+    engine = _env("DB_ENGINE", "sqlite").lower()
+    if engine in ("postgres", "postgresql"):
+        return postgresql_config()
+    if engine != "sqlite":
+        raise ValueError(f"DB_ENGINE غير مدعوم: {engine!r} (sqlite | postgresql)")
+    return sqlite_config(_env("DB_NAME", str(base_dir / "db.sqlite3")))
@@ -0,0 +1,6 @@
+# myprojabd/decorators.py
+from django.contrib.auth.decorators import user_passes_test
+from django.urls import reverse_lazy
+
+# صفحات الإدارة/الإحصاء/الطابور: للموظفين فقط (غيرهم يُحوَّل لتسجيل الدخول)
+staff_required = user_passes_test(lambda u: u.is_active and u.is_staff, login_url=reverse_lazy("access:login"))
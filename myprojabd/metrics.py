@@ -0,0 +1,336 @@
+# myprojabd/metrics.py
+"""
+قياس أداء الطلبات: زمن المعالجة، عدد/زمن استعلامات SQL، زمن عرض القوالب،
+وإصابات الذاكرة المؤقتة — لكل طلب في ترويسة Server-Timing (للموظفين أو مع DEBUG أو
+METRICS_SERVER_TIMING)، ومجمّعة لكل اسم مسار (مثل "lookup:home") في مدرّجات تُعرض بصيغة
+Prometheus على /metrics.
+
+- MetricsMiddleware: أول وسيط في MIDDLEWARE ليشمل زمن كل ما بعده.
+- InstrumentedDjangoTemplates: محرك القوالب مع قياس زمن render.
+- LocMemCache / FileBasedCache / RedisCache: نفس محركات Django مع عدّ الإصابات.
+- metrics_view: النص بصيغة Prometheus، محمي بـ METRICS_TOKEN (Bearer) أو لحساب موظف.
+
+كلفة القياس: عدّادات داخل العملية تحت قفل واحد؛ لا قاعدة بيانات ولا ذاكرة مشتركة.
+مع عدة عمليات (gunicorn workers) لكل عملية عدّاداتها.
+"""
+from __future__ import annotations
+
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache.backends import filebased, locmem, redis
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+# حدود المدرّج بالثواني
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED = "<unmatched>"
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_time", "template_time", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class _ViewStats:
+    __slots__ = ("buckets", "count", "total", "sql_count", "sql_time", "template_time", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)   # الأخير = +Inf
+        self.count = 0
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.statuses: dict[str, int] = {}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: dict[str, _ViewStats] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # إرسال البريد (notifications/mail.py)
+        self.emails_sent = 0
+        self.emails_failed = 0
+        self.email_batches = 0
+        self.email_seconds = 0.0
+
+    def observe_email(self, sent: int, failed: int, duration: float) -> None:
+        """دفعة بريد واحدة (اتصال SMTP واحد)."""
+        with self._lock:
+            self.emails_sent += sent
+            self.emails_failed += failed
+            self.email_batches += 1
+            self.email_seconds += duration
+
+    def observe(self, view: str, status: int, duration: float, stats: RequestStats) -> None:
+        index = bisect.bisect_left(BUCKETS, duration)
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            v = self._views.get(view)
+            if v is None:
+                v = self._views[view] = _ViewStats()
+            v.buckets[index] += 1
+            v.count += 1
+            v.total += duration
+            v.sql_count += stats.sql_count
+            v.sql_time += stats.sql_time
+            v.template_time += stats.template_time
+            v.statuses[status_class] = v.statuses.get(status_class, 0) + 1
+            self.cache_hits += stats.cache_hits
+            self.cache_misses += stats.cache_misses
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+            self.cache_hits = self.cache_misses = 0
+            self.emails_sent = self.emails_failed = self.email_batches = 0
+            self.email_seconds = 0.0
+
+    def render(self) -> str:
+        """نص بصيغة Prometheus (text exposition 0.0.4)."""
+        with self._lock:
+            views = {name: _copy(v) for name, v in self._views.items()}
+            hits, misses = self.cache_hits, self.cache_misses
+            emails = (self.emails_sent, self.emails_failed, self.email_batches, self.email_seconds)
+
+        lines = [
+            "# HELP django_request_duration_seconds زمن معالجة الطلب حسب اسم المسار",
+            "# TYPE django_request_duration_seconds histogram",
+        ]
+        for name, v in sorted(views.items()):
+            label = _label(name)
+            cumulative = 0
+            for bound, n in zip(BUCKETS, v.buckets):
+                cumulative += n
+                lines.append(f'django_request_duration_seconds_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'django_request_duration_seconds_bucket{{view="{label}",le="+Inf"}} {v.count}')
+            lines.append(f'django_request_duration_seconds_sum{{view="{label}"}} {v.total:.6f}')
+            lines.append(f'django_request_duration_seconds_count{{view="{label}"}} {v.count}')
+
+        for metric, kind, help_text, attr, fmt in (
+            ("django_request_sql_queries_total", "counter", "عدد استعلامات SQL", "sql_count", "{}"),
+            ("django_request_sql_seconds_total", "counter", "زمن استعلامات SQL", "sql_time", "{:.6f}"),
+            ("django_request_template_seconds_total", "counter", "زمن عرض القوالب", "template_time", "{:.6f}"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for name, v in sorted(views.items()):
+                lines.append(f'{metric}{{view="{_label(name)}"}} ' + fmt.format(getattr(v, attr)))
+
+        lines += ["# HELP django_responses_total عدد الردود حسب فئة الحالة", "# TYPE django_responses_total counter"]
+        for name, v in sorted(views.items()):
+            for status_class, n in sorted(v.statuses.items()):
+                lines.append(f'django_responses_total{{view="{_label(name)}",status="{status_class}"}} {n}')
+
+        lines += [
+            "# HELP django_cache_gets_total قراءات الذاكرة المؤقتة",
+            "# TYPE django_cache_gets_total counter",
+            f'django_cache_gets_total{{result="hit"}} {hits}',
+            f'django_cache_gets_total{{result="miss"}} {misses}',
+            # معدل الإرسال = rate(emails_total[5m])؛ متوسط زمن الرسالة = seconds / emails
+            "# HELP emails_total رسائل البريد حسب النتيجة",
+            "# TYPE emails_total counter",
+            f'emails_total{{result="sent"}} {emails[0]}',
+            f'emails_total{{result="failed"}} {emails[1]}',
+            "# HELP email_batches_total دفعات البريد (اتصال SMTP لكل دفعة)",
+            "# TYPE email_batches_total counter",
+            f"email_batches_total {emails[2]}",
+            "# HELP email_send_seconds_total زمن إرسال دفعات البريد",
+            "# TYPE email_send_seconds_total counter",
+            f"email_send_seconds_total {emails[3]:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _copy(v: _ViewStats) -> _ViewStats:
+    c = _ViewStats()
+    c.buckets = list(v.buckets)
+    c.count, c.total = v.count, v.total
+    c.sql_count, c.sql_time, c.template_time = v.sql_count, v.sql_time, v.template_time
+    c.statuses = dict(v.statuses)
+    return c
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+# ---------------------------------------------------------------- SQL
+def _install_sql_wrapper(sender, connection, **kwargs):
+    """مرة لكل اتصال عند فتحه بدل تغليف كل الاتصالات في كل طلب؛ خارج الطلبات لا يفعل شيئًا."""
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - start
+        stats.sql_count += 1
+
+
+connection_created.connect(_install_sql_wrapper)
+
+
+# ---------------------------------------------------------------- القوالب
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates مع قياس زمن render للقالب الرئيسي (القوالب المضمّنة داخله ضمنه)."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+# ---------------------------------------------------------------- الذاكرة المؤقتة
+_MISSING = object()
+
+
+class _CacheMetricsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        stats = _current.get()
+        if stats is not None:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        stats = _current.get()
+        # BaseCache.get_many يستدعي get() لكل مفتاح؛ نوقف العدّ أثناءه كي لا يُحسب مرتين
+        token = _current.set(None)
+        try:
+            found = super().get_many(keys, version=version)
+        finally:
+            _current.reset(token)
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+
+
+class LocMemCache(_CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(_CacheMetricsMixin, filebased.FileBasedCache):
+    pass
+
+
+class RedisCache(_CacheMetricsMixin, redis.RedisCache):
+    pass
+
+
+# ---------------------------------------------------------------- الوسيط
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # للجميع عند التفعيل الصريح أو في التطوير؛ غير ذلك للموظفين فقط
+        self.server_timing = getattr(settings, "METRICS_SERVER_TIMING", False) or settings.DEBUG
+        # اتصالات فُتحت قبل استيراد هذه الوحدة (فحوص البدء مثلًا) لم يصلها connection_created
+        for conn in connections.all(initialized_only=True):
+            _install_sql_wrapper(None, conn)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else "") or UNMATCHED
+        registry.observe(view, response.status_code, duration, stats)
+
+        if self.server_timing or _is_staff(request, resolve=False):
+            response["Server-Timing"] = server_timing(duration, stats)
+        return response
+
+
+def _is_staff(request, *, resolve: bool = True) -> bool:
+    # request.user كسول (AuthenticationMiddleware): resolve=False لا يحمّل الجلسة والمستخدم
+    # إن لم يطلبهما العرض أصلًا — الترويسة وحدها لا تستحق استعلامين خارج العدّاد
+    if not resolve and not hasattr(request, "_cached_user"):
+        return False
+    user = getattr(request, "user", None)
+    return bool(user and user.is_active and user.is_staff)
+
+
+def server_timing(duration: float, stats: RequestStats) -> str:
+    return ", ".join((
+        f"app;dur={duration * 1000:.1f}",
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"',
+        f"tpl;dur={stats.template_time * 1000:.1f}",
+        f'cache;desc="{stats.cache_hits} hit / {stats.cache_misses} miss"',
+    ))
+
+
+# ---------------------------------------------------------------- /metrics
+def _authorized(request) -> bool:
+    expected = getattr(settings, "METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    if expected and header.startswith("Bearer "):
+        if hmac.compare_digest(header[7:].encode(), expected.encode()):
+            return True
+    return _is_staff(request)
+
+
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponseForbidden("forbidden")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
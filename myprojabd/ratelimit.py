@@ -0,0 +1,167 @@
+# myprojabd/ratelimit.py
+"""
+تحديد معدل الطلبات (Rate limiting) بنافذة منزلقة تقريبية.
+
+العدّ في الذاكرة المؤقتة المشتركة (incr ذري): عدّاد للنافذة الحالية + عدّاد للسابقة،
+والتقدير = السابقة × الجزء المتبقي منها + الحالية. لا يلمس قاعدة البيانات إطلاقًا
+(ما لم يُستخدم المفتاح "user" الذي يقرأ الجلسة).
+
+الاستخدام:
+- كمزخرف:  @ratelimit("ticket_status", key="ip", rate="30/m")
+- كوسيط:   RateLimitMiddleware + الإعداد RATELIMITS حسب اسم المسار (مثل "access:login").
+
+صيغ المفتاح: ip | user | session | post:<field> | get:<field>
+صيغة المعدل: "<عدد>/<مدة>" والمدة مثل s, m, h, d أو 15m, 10s ...
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+DEFAULT_METHODS = ("POST",)
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """"5/m" → (5, 60) ، "10/15m" → (10, 900)."""
+    m = _RATE_RE.match(rate or "")
+    if not m:
+        raise ValueError(f"صيغة معدل غير صحيحة: {rate!r}")
+    count, mult, unit = m.groups()
+    return int(count), int(mult or 1) * _UNITS[unit]
+
+
+def client_ip(request) -> str:
+    """عنوان العميل؛ X-Forwarded-For فقط إذا كان الخادم خلف وكيل موثوق (RATELIMIT_TRUST_XFF)."""
+    if getattr(settings, "RATELIMIT_TRUST_XFF", False):
+        xff = request.META.get("HTTP_X_FORWARDED_FOR")
+        if xff:
+            return xff.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR") or ""
+
+
+def _digits(value: str | None) -> str:
+    return "".join(ch for ch in (value or "") if ch.isdigit()) or (value or "").strip()
+
+
+def resolve_key(request, key: str) -> str | None:
+    """قيمة المفتاح للطلب (None = لا ينطبق التحديد على هذا الطلب)."""
+    if key == "ip":
+        return client_ip(request)
+    if key == "session":
+        return request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if key == "user":
+        user = getattr(request, "user", None)
+        return str(user.pk) if user is not None and user.is_authenticated else None
+    if key.startswith("post:"):
+        return _digits(request.POST.get(key[5:])) or None
+    if key.startswith("get:"):
+        return (request.GET.get(key[4:]) or "").strip() or None
+    raise ValueError(f"مفتاح تحديد معدل غير معروف: {key!r}")
+
+
+def hit(scope: str, ident: str, limit: int, period: int) -> tuple[bool, int]:
+    """
+    تسجيل طلب وإرجاع (مسموح؟، ثوانٍ حتى إعادة المحاولة).
+    عمليتان على الذاكرة المؤقتة: incr للنافذة الحالية + get للسابقة.
+    """
+    cache = caches[getattr(settings, "RATELIMIT_CACHE_ALIAS", "default")]
+    now = time.time()
+    window = int(now // period)
+    elapsed = now - window * period
+    digest = hashlib.md5(ident.encode()).hexdigest()
+    cur_key = f"rl:{scope}:{digest}:{window}"
+    prev_key = f"rl:{scope}:{digest}:{window - 1}"
+
+    cache.add(cur_key, 0, timeout=period * 2)
+    try:
+        current = cache.incr(cur_key)
+    except ValueError:  # انتهى المفتاح بين add وincr
+        cache.set(cur_key, 1, timeout=period * 2)
+        current = 1
+    previous = cache.get(prev_key) or 0
+
+    estimate = previous * (period - elapsed) / period + current
+    if estimate <= limit:
+        return True, 0
+    return False, max(1, math.ceil(period - elapsed))
+
+
+def check(request, scope: str, key: str, rate: str) -> tuple[bool, int]:
+    if not getattr(settings, "RATELIMIT_ENABLED", True):
+        return True, 0
+    ident = resolve_key(request, key)
+    if not ident:
+        return True, 0
+    limit, period = parse_rate(rate)
+    return hit(f"{scope}:{key}", ident, limit, period)
+
+
+def too_many_requests(retry_after: int) -> HttpResponse:
+    response = HttpResponse(
+        "طلبات كثيرة خلال وقت قصير. حاول مرة أخرى بعد قليل.",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def ratelimit(scope: str, *, key: str = "ip", rate: str, methods=DEFAULT_METHODS):
+    """مزخرف لتحديد معدل منظر واحد. يُوضع قبل login_required ليُرفض الطلب بلا استعلامات."""
+    parse_rate(rate)  # التحقق من الصيغة عند التحميل
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                allowed, retry_after = check(request, scope, key, rate)
+                if not allowed:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware:
+    """
+    تحديد المعدل حسب اسم المسار من الإعداد RATELIMITS:
+        RATELIMITS = {"access:login": [("ip", "20/m"), ("post:phone", "10/15m")], ...}
+    عنصر القائمة (key, rate) أو (key, rate, methods)؛ الافتراضي POST فقط.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = {}
+        for name, rules in getattr(settings, "RATELIMITS", {}).items():
+            parsed = []
+            for rule in rules:
+                key, rate, *rest = rule
+                parse_rate(rate)
+                parsed.append((key, rate, tuple(rest[0]) if rest and rest[0] else DEFAULT_METHODS))
+            self.rules[name] = parsed
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        rules = self.rules.get(match.view_name) if match else None
+        if not rules:
+            return None
+        for key, rate, methods in rules:
+            if request.method not in methods:
+                continue
+            allowed, retry_after = check(request, match.view_name, key, rate)
+            if not allowed:
+                return too_many_requests(retry_after)
+        return None
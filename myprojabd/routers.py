@@ -0,0 +1,111 @@
+# myprojabd/routers.py
+"""
+توجيه القراءات لنسخ القراءة (read replicas) والكتابات للقاعدة الأساسية.
+
+- القراءة من نسخة عشوائية فقط للنماذج المذكورة في REPLICA_READ_MODELS
+  (الجلسات والمستخدمون وغيرها تبقى على الأساسية).
+- "اقرأ ما كتبت": أول كتابة فعلية في الطلب (db_for_write) تثبّت بقية قراءاته على
+  الأساسية، ويضع الوسيط كوكي تُبقي طلبات العميل التالية عليها لمدة REPLICA_PIN_SECONDS.
+  الطلب الذي لا يكتب (ولو كان POST) لا يُثبَّت، ولا كوكي إطلاقًا بدون نسخ قراءة.
+- خارج ReplicaPinMiddleware (أوامر الإدارة، الخيوط، المُرسِل) لا تُنشئ الكتابة حالة:
+  وإلا ثبّتت كل قراءات ذلك السياق على الأساسية إلى الأبد. من يحتاج ذلك يستدعي pin_to_primary().
+"""
+from __future__ import annotations
+
+import contextvars
+import random
+import time
+
+from django.conf import settings
+
+PRIMARY = "default"
+PIN_COOKIE = "db_pin"
+
+
+class _RouteState:
+    """حالة التوجيه لطلب/مهمة: كائن واحد قابل للتعديل كي تراه السياقات المنسوخة (sync_to_async)."""
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state: contextvars.ContextVar[_RouteState | None] = contextvars.ContextVar("db_route_state", default=None)
+
+
+def _current_state() -> _RouteState:
+    state = _state.get()
+    if state is None:
+        state = _RouteState()
+        _state.set(state)
+    return state
+
+
+def pin_to_primary() -> None:
+    """تثبيت القراءات على القاعدة الأساسية لبقية السياق الحالي (الطلب/المهمة)."""
+    _current_state().pinned = True
+
+
+def is_pinned() -> bool:
+    state = _state.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = list(getattr(settings, "DATABASE_REPLICAS", []))
+        self.read_models = set(getattr(settings, "REPLICA_READ_MODELS", []))
+
+    def _replicated(self, model) -> bool:
+        meta = model._meta
+        return meta.app_label in self.read_models or meta.label_lower in self.read_models
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or is_pinned() or not self._replicated(model):
+            return PRIMARY
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if self.replicas and state is not None:
+            # كتابة فعلية داخل طلب: بقية القراءات (وطلبات العميل القريبة) من الأساسية
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # كل الأسماء تشير لنفس البيانات
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinMiddleware:
+    """يحدد لكل طلب: هل تُقرأ البيانات من النسخ أم من الأساسية؟"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "DATABASE_REPLICAS", None):
+            return self.get_response(request)
+        state = _RouteState(pinned=self._cookie_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            seconds = int(getattr(settings, "REPLICA_PIN_SECONDS", 5))
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
+
+    @staticmethod
+    def _cookie_pinned(request) -> bool:
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
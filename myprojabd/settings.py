@@ -1,6 +1,9 @@
+import os
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _
 
+from .db import database_from_env, replicas_from_env
+
 # مسار المشروع الأساسي
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -25,11 +28,17 @@ INSTALLED_APPS = [
     'access',
     'lookup',
     'tickets',
+    'notifications',
 ]
 
 # الوسائط (Middleware)
 MIDDLEWARE = [
+    # القياس أولًا ليشمل زمن كل الوسائط بعده (myprojabd/metrics.py)
+    'myprojabd.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+
+    # تثبيت القراءات على القاعدة الأساسية بعد الكتابة (قبل أي وصول لقاعدة البيانات)
+    'myprojabd.routers.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
     # مهم للترجمة وتحديد اللغة من الكوكيز/الهيدر
@@ -37,7 +46,12 @@ MIDDLEWARE = [
 
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # تحديد معدل الطلبات حسب اسم المسار (RATELIMITS أدناه). يعمل في process_view، أي بعد
+    # تمرير الطلب على كل الوسائط وقبل المنظر: request.user متاح للمفتاح "user" أيًا كان
+    # موضعه هنا، والرفض يسبق أي استعلام من المنظر نفسه
+    'myprojabd.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -47,11 +61,18 @@ ROOT_URLCONF = 'myprojabd.urls'
 # القوالب
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates مع قياس زمن العرض (myprojabd/metrics.py)
+        'BACKEND': 'myprojabd.metrics.InstrumentedDjangoTemplates',
         # مجلد القوالب العام
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # القوالب تُحلَّل مرة لكل عملية (في التطوير يُفرَّغ المحمّل عند تعديل أي قالب)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.template.context_processors.i18n',   # مهم للترجمة في القوالب
@@ -64,14 +85,148 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'myprojabd.wsgi.application'
 
-# قاعدة البيانات (SQLite للتطوير)
+# قاعدة البيانات — من متغيرات البيئة (انظر myprojabd/db.py)
+# SQLite للتطوير (WAL + busy timeout)، أو DB_ENGINE=postgresql للإنتاج
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': database_from_env(BASE_DIR),
+    **replicas_from_env(BASE_DIR),   # DB_REPLICAS → replica1, replica2, ...
+}
+
+# توجيه قراءات الاستعلام/السجل لنسخ القراءة (myprojabd/routers.py)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['myprojabd.routers.PrimaryReplicaRouter']
+# النماذج التي تُقرأ من النسخ (تطبيق كامل أو app_label.model)
+REPLICA_READ_MODELS = [
+    'lookup',
+    'access.accesslog',
+    'access.accessdailystat',
+    'access.useragent',
+]
+# بعد أي كتابة: القراءات من الأساسية لهذه المدة (قراءة ما كتبته للتو رغم تأخر النسخ)
+REPLICA_PIN_SECONDS = 5
+
+# الذاكرة المؤقتة (Cache) — محركات Django نفسها مع عدّ الإصابات (myprojabd/metrics.py)
+# CACHE_BACKEND: locmem (افتراضي للتطوير) | file | redis (مشتركة بين العمليات في الإنتاج، تتطلب REDIS_URL)
+_cache_backend = os.environ.get("CACHE_BACKEND", "locmem")
+if _cache_backend == "redis":
+    CACHES = {
+        'default': {
+            'BACKEND': 'myprojabd.metrics.RedisCache',
+            'LOCATION': os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif _cache_backend == "file":
+    CACHES = {
+        'default': {
+            'BACKEND': 'myprojabd.metrics.FileBasedCache',
+            'LOCATION': BASE_DIR / '.cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'myprojabd.metrics.LocMemCache',
+            'LOCATION': 'myprojabd',
+        }
     }
+
+# الطلبات: رقم العامل في الأرقام المرجعية (tickets/refs.py) — فريد لكل عملية/خادم (0..1023)
+# اضبطه في الإنتاج (check --deploy ينبّه)؛ فارغ → حجز احتياطي من جدول ReferenceWorker (كتابة في القاعدة)
+TICKET_WORKER_ID = os.environ.get("TICKET_WORKER_ID")
+TICKET_WORKER_LEASE_SECONDS = 600   # مهلة الحجز التلقائي قبل أن يصبح الرقم متاحًا لعملية أخرى
+TICKET_STATUS_CACHE_SECONDS = 60   # صفحة حالة الطلب للعموم (تُمسح عند أي تغيير)
+TICKET_LEASE_SECONDS = 900       # مهلة حجز الموظف للطلب قبل أن يعود للطابور (tickets/queue.py)
+
+# كتالوج الخدمات (lookup/catalog.py): يُعاد تحميله عند تغيّر إصداره، أو بعد هذه المدة على أي حال
+SERVICE_CATALOG_MAX_AGE = 300
+
+# القياس (myprojabd/metrics.py)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")   # /metrics: Authorization: Bearer <token> (أو حساب موظف)
+# Server-Timing يكشف زمن SQL/القوالب وعدد الاستعلامات: مع DEBUG، وللموظفين في صفحات تقرأ request.user
+# أصلًا (لا تحميل للمستخدم لأجل الترويسة)، و1 = لكل الطلبات
+METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING", "0") == "1"
+
+# الجلسات
+# SESSION_BACKEND: cached_db (افتراضي: القراءة من الذاكرة المؤقتة والكتابة لقاعدة البيانات)
+#                  | cache (بدون قاعدة بيانات؛ يتطلب ذاكرة مشتركة مثل redis في الإنتاج)
+#                  | db (الافتراضي القديم لـ Django)
+# signed_cookies غير مدعوم: التسجيل يحفظ تجزئة كلمة المرور في الجلسة (الفحص access.E001)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get("SESSION_BACKEND", "cached_db")
+SESSION_CACHE_ALIAS = "default"
+SESSION_SAVE_EVERY_REQUEST = False   # لا نكتب الجلسة إلا عند تغيّرها
+
+# رموز التحقق (OTP)
+# CacheOTPStore يحتاج ذاكرة مؤقتة مشتركة بين العمليات (redis)؛ مع locmem لكل عملية رموزها
+# فيفشل التحقق إن وصل الطلب لعملية أخرى → الجدول هو الافتراضي (تحذير access.W001 عند التعارض)
+OTP_STORE = os.environ.get(
+    "OTP_STORE",
+    "access.otp.CacheOTPStore" if _cache_backend == "redis" else "access.otp.DatabaseOTPStore",
+)
+OTP_CACHE_ALIAS = "default"
+OTP_TTL_SECONDS = 300            # صلاحية الرمز (5 دقائق)
+OTP_MAX_ATTEMPTS = 5             # أقصى محاولات تحقق للرمز الواحد
+OTP_AUDIT = os.environ.get("OTP_AUDIT") == "1"   # تسجيل كل إرسال في OTPRequest للتدقيق
+
+# الرسائل النصية (Unifonic) — الإرسال في الخلفية عبر access.sms
+UNIFONIC_API_KEY = os.environ.get("UNIFONIC_API_KEY", "")
+UNIFONIC_SENDER = os.environ.get("UNIFONIC_SENDER", "OTP")
+SMS_PROVIDER_URL = os.environ.get("SMS_PROVIDER_URL", "https://el.cloud.unifonic.com/rest/SMS/messages")
+SMS_WORKERS = int(os.environ.get("SMS_WORKERS", "4"))        # عدد خيوط الإرسال
+SMS_QUEUE_SIZE = 1000            # أقصى رسائل معلّقة في الطابور
+SMS_TIMEOUT_SECONDS = 10
+SMS_MAX_RETRIES = 3              # محاولات إضافية مع تراجع أُسّي
+
+# البريد الإلكتروني — للتطوير: manage.py fake_smtp_server ثم EMAIL_PORT=8026
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS") == "1"
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "no-reply@localhost")
+EMAIL_BATCH_SIZE = 200            # رسائل لكل اتصال SMTP (notifications/mail.py)
+
+# صندوق الصادر للإشعارات (notifications/) — يرسله: manage.py dispatch_outbox
+NOTIFY_SENDERS = {
+    # بدون مفتاح Unifonic تُطبع الرسائل النصية في الكونسول (مثل OTP في التطوير)
+    "sms": "notifications.senders.send_sms" if UNIFONIC_API_KEY else "notifications.senders.console",
+    "email": "notifications.senders.send_email",
+}
+NOTIFY_CONCURRENCY = {"sms": 8, "email": 2}   # خيوط الإرسال المتوازي لكل قناة
+NOTIFY_MAX_ATTEMPTS = 6          # بعدها تصبح الرسالة dead (إعادة الجدولة من لوحة الإدارة)
+NOTIFY_RETRY_BACKOFF_SECONDS = 30   # تراجع أُسّي: 30ث، 1د، 2د...
+NOTIFY_RETRY_MAX_SECONDS = 3600
+NOTIFY_LEASE_SECONDS = 120       # رسالة "قيد الإرسال" أطول من هذا تُعتبر متروكة وتُعاد
+
+# تحديد معدل الطلبات (myprojabd.ratelimit) — العدّادات في الذاكرة المؤقتة الافتراضية
+# ملاحظة: locmem لكل عملية؛ في الإنتاج مع عدة عمليات استخدم CACHE_BACKEND=redis
+RATELIMIT_CACHE_ALIAS = "default"
+RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "1") == "1"   # 0 لاختبارات الحمل المحلية فقط
+RATELIMIT_TRUST_XFF = os.environ.get("RATELIMIT_TRUST_XFF") == "1"   # خلف وكيل عكسي موثوق
+RATELIMITS = {
+    "access:login":      [("ip", "20/m"), ("post:phone", "10/15m")],
+    "access:signup":     [("ip", "10/m"), ("post:phone", "5/h")],
+    "access:verify_otp": [("ip", "30/m"), ("session", "10/m")],
+    "lookup:home":       [("ip", "60/m"), ("session", "30/m")],
 }
 
+# تجزئة كلمات المرور — التكلفة قابلة للضبط لكل بيئة؛ التجزئات القديمة تُحدَّث عند الدخول الناجح
+# PASSWORD_HASHER: pbkdf2 (افتراضي) | scrypt
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_PBKDF2_ITERATIONS", "0")) or None   # None = افتراضي Django
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_SCRYPT_WORK_FACTOR", "0")) or None
+_PASSWORD_HASHERS = {
+    "pbkdf2": "access.hashers.TunablePBKDF2PasswordHasher",
+    "scrypt": "access.hashers.TunableScryptPasswordHasher",
+}
+_preferred_hasher = _PASSWORD_HASHERS[os.environ.get("PASSWORD_HASHER", "pbkdf2")]
+PASSWORD_HASHERS = [_preferred_hasher] + [h for h in _PASSWORD_HASHERS.values() if h != _preferred_hasher] + [
+    # للتحقق من تجزئات قديمة فقط (تُرقّى عند الدخول)
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 # تحقق كلمات المرور
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -102,6 +257,21 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']   # مجلد الملفات الثابتة أثناء التطوير
 STATIC_ROOT = BASE_DIR / 'staticfiles'     # للإنتاج وعند استخدام collectstatic
 
+# أسماء ملفات مجزّأة بالمحتوى (services.3f2a9c1b7d4e.css) بعد collectstatic: تُخزَّن في المتصفح
+# لسنة كاملة، وأي تعديل يغيّر الاسم. اختياري (STATIC_HASHED=1) لأنه يتطلب collectstatic قبل
+# التشغيل، وإلا فشل كل {% static %} لغياب staticfiles.json.
+STATIC_HASHED = os.environ.get("STATIC_HASHED") == "1"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage" if STATIC_HASHED
+        else "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+# خدمة STATIC_ROOT من Django نفسه (بدون خادم ويب أمامي) مع ترويسات التخزين (myprojabd/static.py).
+# مع nginx: location /static/ { alias .../staticfiles/; expires max; add_header Cache-Control immutable; }
+STATIC_SERVE = os.environ.get("STATIC_SERVE") == "1"
+
 # ملفات الوسائط (الملفات المرفوعة من المستخدمين)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
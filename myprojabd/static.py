@@ -0,0 +1,21 @@
+# myprojabd/static.py
+"""
+خدمة الملفات الثابتة المجمّعة (STATIC_ROOT) من Django عند STATIC_SERVE=1 — لبيئات بلا خادم ويب أمامي.
+
+الملف ذو الاسم المجزّأ (ManifestStaticFilesStorage: name.<12 hex>.ext) لا يتغير محتواه أبدًا،
+فيُخزَّن لسنة كاملة مع immutable؛ غيره (بلا تجزئة) لمدة قصيرة فقط.
+"""
+import re
+
+from django.conf import settings
+from django.views import static
+
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT = "public, max-age=300"
+
+
+def serve(request, path):
+    response = static.serve(request, path, document_root=settings.STATIC_ROOT)
+    response["Cache-Control"] = IMMUTABLE if HASHED_NAME.search(path) else SHORT
+    return response
@@ -0,0 +1,371 @@
+import contextvars
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from lookup.models import Customer
+from . import metrics, ratelimit, routers
+from .db import sqlite_replica_config
+
+
+class RateLimitHitTests(SimpleTestCase):
+    base = 6000.0  # بداية نافذة (مضاعف 60)
+
+    def setUp(self):
+        cache.clear()
+
+    def hit_at(self, offset, ident="1.2.3.4", scope="s", limit=3):
+        with mock.patch("myprojabd.ratelimit.time.time", return_value=self.base + offset):
+            return ratelimit.hit(scope, ident, limit, 60)
+
+    def test_limit_and_retry_after_within_window(self):
+        for _ in range(3):
+            self.assertEqual(self.hit_at(10), (True, 0))
+        self.assertEqual(self.hit_at(10), (False, 50))
+
+    def test_sliding_window_boundary(self):
+        for _ in range(4):
+            self.hit_at(10)
+        # منتصف النافذة التالية: السابقة (4) بوزن النصف + الحالية
+        self.assertEqual(self.hit_at(90), (True, 0))      # 2 + 1
+        self.assertEqual(self.hit_at(90), (False, 30))    # 2 + 2 > 3
+        # بعد نافذتين: ما قبل السابقة لا يُحسب
+        self.assertEqual(self.hit_at(180), (True, 0))
+
+    def test_keys_and_scopes_are_isolated(self):
+        for _ in range(4):
+            self.hit_at(10)
+        self.assertEqual(self.hit_at(10, ident="5.6.7.8"), (True, 0))
+        self.assertEqual(self.hit_at(10, scope="other"), (True, 0))
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate("5/m"), (5, 60))
+        self.assertEqual(ratelimit.parse_rate("10/15m"), (10, 900))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate("5 per minute")
+
+
+class RateLimitDecoratorTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.view = ratelimit.ratelimit("t", key="ip", rate="2/m")(lambda request: HttpResponse("ok"))
+
+    def test_429_with_retry_after(self):
+        codes = [self.view(self.factory.post("/")).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        response = self.view(self.factory.post("/"))
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_only_listed_methods_are_counted(self):
+        for _ in range(5):
+            self.assertEqual(self.view(self.factory.get("/")).status_code, 200)
+        self.assertEqual(self.view(self.factory.post("/")).status_code, 200)
+
+    def test_per_client_ip(self):
+        for _ in range(2):
+            self.view(self.factory.post("/"))
+        other = self.factory.post("/", REMOTE_ADDR="10.0.0.9")
+        self.assertEqual(self.view(other).status_code, 200)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.view(self.factory.post("/")).status_code, 200)
+
+
+class RateLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def middleware(self, rules):
+        with override_settings(RATELIMITS=rules):
+            return ratelimit.RateLimitMiddleware(lambda request: HttpResponse("ok"))
+
+    def request(self, mw, user=None, **extra):
+        request = self.factory.post(reverse("access:login"), extra.pop("data", {}), **extra)
+        request.resolver_match = resolve(request.path)
+        request.user = user or AnonymousUser()
+        return mw.process_view(request, None, (), {})
+
+    def test_login_by_ip_returns_429(self):
+        mw = self.middleware({"access:login": [("ip", "2/m")]})
+        self.assertIsNone(self.request(mw))
+        self.assertIsNone(self.request(mw))
+        response = self.request(mw)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_post_field_key_isolated_per_value(self):
+        mw = self.middleware({"access:login": [("post:phone", "1/m")]})
+        self.assertIsNone(self.request(mw, data={"phone": "055 123 4567"}))
+        self.assertEqual(self.request(mw, data={"phone": "0551234567"}).status_code, 429)
+        self.assertIsNone(self.request(mw, data={"phone": "0559999999"}))
+
+    def test_user_key_reads_authenticated_user(self):
+        # process_view يعمل بعد كل الوسائط، فـ request.user متاح أيًا كان موضع الوسيط
+        mw = self.middleware({"access:login": [("user", "1/m")]})
+        alice = User.objects.create_user("alice")
+        bob = User.objects.create_user("bob")
+        self.assertIsNone(self.request(mw, user=alice))
+        self.assertEqual(self.request(mw, user=alice).status_code, 429)
+        self.assertIsNone(self.request(mw, user=bob))
+        # مجهول: لا ينطبق المفتاح
+        self.assertIsNone(self.request(mw))
+        self.assertIsNone(self.request(mw))
+
+    def test_other_methods_and_routes_untouched(self):
+        mw = self.middleware({"access:login": [("ip", "1/m")]})
+        request = self.factory.get(reverse("access:login"))
+        request.resolver_match = resolve(request.path)
+        for _ in range(3):
+            self.assertIsNone(mw.process_view(request, None, (), {}))
+
+    @override_settings(RATELIMITS={"access:login": [("ip", "1/m")]})
+    def test_through_the_stack(self):
+        url = reverse("access:login")
+        self.assertEqual(self.client.post(url, {"phone": "0551234567", "password": "x"}).status_code, 200)
+        response = self.client.post(url, {"phone": "0551234567", "password": "x"})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response["Retry-After"].isdigit())
+
+
+def _add_alias(alias, config):
+    connections.settings[alias] = connections.configure_settings({"default": connections.settings["default"], alias: config})[alias]
+
+
+def _drop_alias(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica1"],
+    DATABASE_ROUTERS=["myprojabd.routers.PrimaryReplicaRouter"],
+)
+class ReplicaRoutingTests(TestCase):
+    """نسخة قراءة حقيقية: ملف SQLite منفصل مفتوح بـ mode=ro وفيه صف يميّزه عن الأساسية."""
+
+    @classmethod
+    def setUpClass(cls):
+        # الأسماء تُضاف بعد تهيئة الصنف: لا قاعدة اختبار تُنشأ لها (النسخة ملف مستقل)
+        super().setUpClass()
+        cls._tmp = tempfile.TemporaryDirectory()
+        path = Path(cls._tmp.name) / "replica.sqlite3"
+        _add_alias("replica_rw", {"ENGINE": "django.db.backends.sqlite3", "NAME": str(path)})
+        cls.databases = cls.databases | {"replica_rw"}
+        with connections["replica_rw"].schema_editor() as editor:
+            editor.create_model(Customer)
+        Customer.objects.using("replica_rw").create(full_name="من النسخة", account_no="REPLICA")
+        _drop_alias("replica_rw")
+        _add_alias("replica1", sqlite_replica_config(path))
+        cls.databases = (cls.databases - {"replica_rw"}) | {"replica1"}
+
+    @classmethod
+    def tearDownClass(cls):
+        _drop_alias("replica1")
+        cls.databases = cls.databases - {"replica1"}
+        cls._tmp.cleanup()
+        super().tearDownClass()
+
+    def run_isolated(self, fn, *args):
+        # حالة التوجيه في متغير سياق؛ كل حالة اختبار في سياق مستقل كما في الطلبات
+        return contextvars.copy_context().run(fn, *args)
+
+    def on_replica(self):
+        return Customer.objects.filter(account_no="REPLICA").exists()
+
+    def test_replica_is_read_only(self):
+        with self.assertRaises(OperationalError):
+            Customer.objects.using("replica1").create(full_name="x")
+
+    def test_reads_go_to_replica_only_for_listed_models(self):
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Customer), "replica1")
+        self.assertEqual(router.db_for_read(User), "default")
+        self.assertTrue(self.run_isolated(self.on_replica))
+
+    def test_write_pins_later_reads_in_same_context(self):
+        def flow():
+            routers._state.set(routers._RouteState())  # كما يفعل الوسيط
+            before = self.on_replica()
+            Customer.objects.create(full_name="جديد", account_no="PRIMARY")
+            return before, self.on_replica(), Customer.objects.filter(account_no="PRIMARY").exists()
+
+        self.assertEqual(self.run_isolated(flow), (True, False, True))
+        # سياق جديد (طلب آخر) غير مثبّت
+        self.assertTrue(self.run_isolated(self.on_replica))
+
+    def test_write_outside_request_does_not_pin(self):
+        def flow():
+            Customer.objects.create(full_name="جديد", account_no="PRIMARY")
+            return routers._state.get(), self.on_replica()
+
+        self.assertEqual(self.run_isolated(flow), (None, True))
+
+    def test_pin_to_primary(self):
+        def flow():
+            routers.pin_to_primary()
+            return self.on_replica()
+
+        self.assertFalse(self.run_isolated(flow))
+
+    # ---------- الوسيط ----------
+    def call(self, view, method="get", cookies=None):
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        seen = {}
+
+        def get_response(req):
+            seen["replica"] = view()
+            return HttpResponse("ok")
+
+        response = self.run_isolated(routers.ReplicaPinMiddleware(get_response), request)
+        return response, seen["replica"]
+
+    def test_post_without_write_is_not_pinned(self):
+        response, replica = self.call(self.on_replica, "post")
+        self.assertTrue(replica)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_write_sets_pin_cookie(self):
+        def view():
+            Customer.objects.create(full_name="جديد")
+            return self.on_replica()
+
+        response, replica = self.call(view, "post")
+        self.assertFalse(replica)
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        self.assertGreater(int(cookie.value), time.time())
+
+    def test_pin_cookie_keeps_next_request_on_primary(self):
+        pinned, replica = self.call(self.on_replica, cookies={routers.PIN_COOKIE: str(int(time.time()) + 5)})
+        self.assertFalse(replica)
+        self.assertNotIn(routers.PIN_COOKIE, pinned.cookies)
+        _expired, replica = self.call(self.on_replica, cookies={routers.PIN_COOKIE: str(int(time.time()) - 1)})
+        self.assertTrue(replica)
+
+    def test_no_cookie_without_replicas(self):
+        def view():
+            Customer.objects.create(full_name="جديد")
+            return self.on_replica()
+
+        with override_settings(DATABASE_REPLICAS=[], DATABASE_ROUTERS=["myprojabd.routers.PrimaryReplicaRouter"]):
+            response, replica = self.call(view, "post")
+        self.assertFalse(replica)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.url = reverse("access:login")
+
+    def test_observes_view_status_and_sql(self):
+        User.objects.create_user("0551234567", password="x")
+        self.client.post(self.url, {"phone": "0551234567", "password": "wrong"})
+        self.client.get(self.url)
+        text = metrics.registry.render()
+        self.assertIn('django_request_duration_seconds_count{view="access:login"} 2', text)
+        self.assertIn('django_responses_total{view="access:login",status="2xx"} 2', text)
+        sql = next(line for line in text.splitlines() if line.startswith('django_request_sql_queries_total{view="access:login"}'))
+        self.assertGreater(int(sql.rsplit(" ", 1)[1]), 0)
+
+    def test_unmatched_paths_grouped(self):
+        self.client.get("/no-such-page/")
+        self.assertIn('view="<unmatched>",status="4xx"', metrics.registry.render())
+
+    def test_no_server_timing_for_anonymous_by_default(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+    def test_server_timing_for_staff_when_the_view_loaded_the_user(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        header = self.client.get(reverse("lookup:home"))["Server-Timing"]
+        self.assertIn("app;dur=", header)
+        self.assertIn('db;dur=', header)
+        # صفحة لا تقرأ request.user: لا تحميل للجلسة والمستخدم من أجل الترويسة
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+    def test_sql_counted_only_inside_requests(self):
+        stats = metrics.RequestStats()
+        token = metrics._current.set(stats)
+        try:
+            list(User.objects.all())
+        finally:
+            metrics._current.reset(token)
+        list(User.objects.all())
+        self.assertEqual(stats.sql_count, 1)
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_server_timing_when_enabled(self):
+        self.assertIn("Server-Timing", self.client.get(self.url))
+
+
+@override_settings(METRICS_TOKEN="s3cret")
+class MetricsEndpointTests(TestCase):
+    url = "/metrics"
+
+    def test_anonymous_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_wrong_token_forbidden(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(response.status_code, 403)
+
+    def test_bearer_token(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE django_request_duration_seconds histogram", response.content.decode())
+
+    def test_staff_session(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(User.objects.create_user("someone"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_never_matches(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+
+class CountingCacheTests(SimpleTestCase):
+    def caches(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return [
+            metrics.LocMemCache("metrics-test", {}),
+            metrics.FileBasedCache(tmp.name, {}),
+        ]
+
+    def test_hits_and_misses_counted_inside_a_request(self):
+        for backend in self.caches():
+            with self.subTest(backend=type(backend).__name__):
+                backend.set("a", 1)
+                backend.set("none", None)
+                stats = metrics.RequestStats()
+                token = metrics._current.set(stats)
+                try:
+                    self.assertEqual(backend.get("a"), 1)
+                    self.assertIsNone(backend.get("none"))          # قيمة None مخزنة = إصابة
+                    self.assertEqual(backend.get("missing", "d"), "d")
+                    self.assertEqual(backend.get_many(["a", "missing", "other"]), {"a": 1})
+                finally:
+                    metrics._current.reset(token)
+                self.assertEqual((stats.cache_hits, stats.cache_misses), (3, 3))
+
+    def test_no_counting_outside_a_request(self):
+        backend = self.caches()[0]
+        self.assertIsNone(backend.get("x"))
+        self.assertIsNone(metrics.current_stats())
@@ -1,12 +1,18 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from myprojabd import static as static_files
+from myprojabd.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # مقاييس الأداء بصيغة Prometheus (محمية)
+    path('metrics', metrics_view, name='metrics'),
+
     # روابط التطبيقات المخصصة
     path('access/', include('access.urls')),
     path('lookup/', include('lookup.urls')),
@@ -19,3 +25,7 @@ urlpatterns = [
 # خدمة ملفات الوسائط أثناء التطوير
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# الملفات الثابتة المجمّعة بترويسات تخزين طويلة (عند عدم وجود خادم ويب أمامي)
+if settings.STATIC_SERVE:
+    urlpatterns += [re_path(rf"^{settings.STATIC_URL.strip('/')}/(?P<path>.*)$", static_files.serve)]
@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from myprojabd.admin_utils import LargeTableAdminMixin
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "channel", "recipient", "status", "attempts", "next_attempt_at", "sent_at", "last_error")
+    list_filter = ("status", "channel")
+    search_fields = ("=recipient", "=dedupe_key")
+    ordering = ("-id",)
+    readonly_fields = (
+        "channel", "recipient", "subject", "body", "dedupe_key", "status", "attempts",
+        "next_attempt_at", "last_error", "lease_expires_at", "created_at", "sent_at",
+    )
+    actions = ("requeue",)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="إعادة الجدولة للإرسال الآن")
+    def requeue(self, request, queryset):
+        n = queryset.filter(status=OutboxMessage.Status.DEAD).update(
+            status=OutboxMessage.Status.PENDING, attempts=0, next_attempt_at=timezone.now(), last_error="",
+        )
+        self.message_user(request, f"أُعيدت جدولة {n} رسالة.")
@@ -0,0 +1,219 @@
+# notifications/dispatcher.py
+"""
+موزّع صندوق الصادر (يشغّله manage.py dispatch_outbox):
+
+1. يحجز دفعة مستحقة بمهلة (نفس نمط tickets/queue.py): SKIP LOCKED حيث يتوفر، وتحديث مشروط
+   برمز حجز في كل الأحوال — فلا تُرسل رسالة من موزّعَين في آن واحد.
+2. يرسل بالتوازي عبر مجمّع خيوط لكل قناة بحدّ NOTIFY_CONCURRENCY (الرسائل النصية لا تنتظر البريد).
+   مُرسِلات الدفعات (البريد) تأخذ قطعة من الدفعة لكل خيط على اتصال واحد بالخادم.
+3. يعلّم كل رسالة فور انتهائها: sent، أو pending بتراجع أُسّي، أو dead بعد NOTIFY_MAX_ATTEMPTS.
+   ما دام الإرسال جاريًا يُمدَّد حجز الباقي كل ثلث NOTIFY_LEASE_SECONDS فلا يستردّه موزّع آخر؛
+   وإن فُقد الحجز رغم ذلك (توقّف طويل) يُسجَّل خطأ بدل أن يضيع التعليم بصمت.
+
+الخيوط ترسل فقط؛ كل وصول لقاعدة البيانات من الخيط الرئيسي.
+رسالة بقيت sending بعد توقّف مفاجئ تعود مستحقة عند انتهاء مهلتها.
+"""
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxMessage
+from .senders import SendError
+
+logger = logging.getLogger(__name__)
+
+Status = OutboxMessage.Status
+
+DEFAULT_SENDERS = {
+    "sms": "notifications.senders.send_sms",
+    "email": "notifications.senders.send_email",
+}
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def get_senders() -> dict:
+    configured = {**DEFAULT_SENDERS, **_setting("NOTIFY_SENDERS", {})}
+    return {channel: import_string(path) for channel, path in configured.items()}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """تراجع أُسّي بسقف: 30ث، 1د، 2د، 4د... حتى NOTIFY_RETRY_MAX_SECONDS."""
+    base = _setting("NOTIFY_RETRY_BACKOFF_SECONDS", 30)
+    cap = _setting("NOTIFY_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def due(now=None) -> Q:
+    now = now or timezone.now()
+    return Q(status=Status.PENDING, next_attempt_at__lte=now) | Q(status=Status.SENDING, lease_expires_at__lt=now)
+
+
+def _lease_seconds() -> float:
+    return _setting("NOTIFY_LEASE_SECONDS", 120)
+
+
+def claim_batch(limit: int) -> list[OutboxMessage]:
+    """حجز حتى limit رسائل مستحقة (الأقدم أولًا) وزيادة عدد محاولاتها."""
+    now = timezone.now()
+    token = uuid.uuid4()
+    db = router.db_for_write(OutboxMessage)
+    skip_locked = connections[db].features.has_select_for_update_skip_locked
+
+    with transaction.atomic(using=db):
+        candidates = OutboxMessage.objects.using(db).filter(due(now)).order_by("next_attempt_at", "pk")
+        if skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list("pk", flat=True)[:limit])
+        if not ids:
+            return []
+        OutboxMessage.objects.using(db).filter(due(now), pk__in=ids).update(
+            status=Status.SENDING,
+            claim_token=token,
+            lease_expires_at=now + timedelta(seconds=_lease_seconds()),
+            attempts=F("attempts") + 1,
+        )
+        return list(OutboxMessage.objects.using(db).filter(claim_token=token).order_by("pk"))
+
+
+def _renew_leases(messages: list[OutboxMessage]) -> None:
+    """تمديد حجز ما لم يُعلَّم بعد من الدفعة، حتى لا يحجزه موزّع آخر ويرسله ثانيةً أثناء الإرسال."""
+    tokens = {m.claim_token for m in messages}
+    OutboxMessage.objects.filter(claim_token__in=tokens, status=Status.SENDING).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=_lease_seconds()),
+    )
+
+
+def _lease_lost(count: int, messages: list[OutboxMessage]) -> None:
+    # انتهت المهلة قبل التعليم وحجزها موزّع آخر (رمز حجز مختلف): التحديث لم يصب شيئًا
+    logger.error(
+        "outbox lease lost for %d of %d messages (%s); another dispatcher may resend them",
+        count, len(messages), ", ".join(str(m.pk) for m in messages[:10]),
+    )
+
+
+def _mark_sent(messages: list[OutboxMessage]) -> None:
+    # رسائل الدفعة الواحدة تحمل نفس رمز الحجز → تحديث واحد
+    updated = OutboxMessage.objects.filter(
+        pk__in=[m.pk for m in messages], claim_token=messages[0].claim_token
+    ).update(status=Status.SENT, sent_at=timezone.now(), claim_token=None, lease_expires_at=None, last_error="")
+    if updated < len(messages):
+        _lease_lost(len(messages) - updated, messages)
+
+
+def _mark_failed(message: OutboxMessage, error: BaseException) -> str:
+    dead = message.attempts >= _setting("NOTIFY_MAX_ATTEMPTS", 6)
+    status = Status.DEAD if dead else Status.PENDING
+    updated = OutboxMessage.objects.filter(pk=message.pk, claim_token=message.claim_token).update(
+        status=status,
+        next_attempt_at=timezone.now() + retry_delay(message.attempts),
+        claim_token=None,
+        lease_expires_at=None,
+        last_error=(str(error) or error.__class__.__name__)[:255],
+    )
+    if not updated:
+        _lease_lost(1, [message])
+    log = logger.error if dead else logger.warning
+    log("outbox %s %s to %s failed (attempt %s): %s", message.pk, message.channel, message.recipient, message.attempts, error)
+    return status
+
+
+def deliver(messages: list[OutboxMessage], *, senders: dict | None = None, concurrency: dict | None = None) -> Counter:
+    """إرسال رسائل محجوزة وتعليم نتيجة كل منها. يرجع عدّادًا: sent/pending(retry)/dead."""
+    senders = senders or get_senders()
+    limits = {**{"sms": 8, "email": 2}, **_setting("NOTIFY_CONCURRENCY", {}), **(concurrency or {})}
+    results = Counter()
+
+    by_channel = defaultdict(list)
+    for message in messages:
+        if message.channel in senders:
+            by_channel[message.channel].append(message)
+        else:
+            results[_mark_failed(message, SendError(f"لا يوجد مُرسِل للقناة {message.channel}"))] += 1
+
+    workers = {channel: max(1, int(limits.get(channel, 1))) for channel in by_channel}
+    pools = {
+        channel: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"outbox-{channel}")
+        for channel, n in workers.items()
+    }
+    try:
+        futures = {}
+        for channel, batch in by_channel.items():
+            sender, pool = senders[channel], pools[channel]
+            if getattr(sender, "batch", False):
+                # قطعة لكل خيط: كل قطعة على اتصال واحد بالمزوّد
+                for chunk in _split(batch, workers[channel]):
+                    futures[pool.submit(sender, chunk)] = chunk
+            else:
+                for message in batch:
+                    futures[pool.submit(_send_one, sender, message)] = [message]
+
+        # كل ثلث مهلة ما دام شيء قيد الإرسال يُمدَّد حجز الباقي (من الخيط الرئيسي، تحديث واحد)
+        every = _lease_seconds() / 3
+        renew_at = time.monotonic() + every
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(renew_at - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if pending and time.monotonic() >= renew_at:
+                _renew_leases(messages)
+                renew_at = time.monotonic() + every
+            for future in done:
+                results.update(_record(future, futures[future]))
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+    return results
+
+
+def _record(future, chunk: list[OutboxMessage]) -> Counter:
+    """تعليم نتيجة قطعة واحدة انتهى إرسالها."""
+    results = Counter()
+    try:
+        errors = list(future.result())
+    except Exception as e:
+        errors = [e] * len(chunk)
+    if len(errors) != len(chunk):
+        # مُرسِل دفعات أرجع عددًا مختلفًا من النتائج: الرسالة بلا نتيجة تُعدّ فاشلة (تُعاد لاحقًا)
+        logger.error("Batch sender returned %d results for %d messages", len(errors), len(chunk))
+        missing = SendError(f"لا نتيجة من المُرسِل ({len(errors)} من {len(chunk)})")
+        errors = errors[:len(chunk)] + [missing] * (len(chunk) - len(errors))
+    sent = [m for m, error in zip(chunk, errors) if error is None]
+    if sent:
+        _mark_sent(sent)
+        results[Status.SENT] += len(sent)
+    for message, error in zip(chunk, errors):
+        if error is not None:
+            results[_mark_failed(message, error)] += 1
+    return results
+
+
+def _send_one(sender, message) -> list:
+    sender(message)
+    return [None]
+
+
+def _split(items: list, parts: int) -> list[list]:
+    size = -(-len(items) // max(parts, 1))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def dispatch_once(batch_size: int = 100, **kwargs) -> Counter:
+    """دفعة واحدة: حجز ثم إرسال. عدّاد فارغ يعني لا شيء مستحق."""
+    messages = claim_batch(batch_size)
+    if not messages:
+        return Counter()
+    return deliver(messages, **kwargs)
+
@@ -0,0 +1,91 @@
+# notifications/mail.py
+"""
+طبقة إرسال البريد: دفعات على اتصال SMTP واحد بدل اتصال (TCP + EHLO + TLS + AUTH) لكل رسالة.
+
+- send_batch(messages): يقسّم الرسائل إلى دفعات EMAIL_BATCH_SIZE، ويفتح لكل دفعة اتصالًا واحدًا
+  عبر get_connection() ويرسل رسائلها عليه؛ يرجع نتيجة كل رسالة (None أو الاستثناء) بنفس الترتيب
+  فلا تُفشل رسالة مرفوضة بقية الدفعة.
+- render(name, context, language): يفضّل نسخة اللغة من القالب إن وُجدت ("x.ar.txt" قبل "x.txt")؛
+  القوالب المحلَّلة يحفظها المحمّل المخزّن (cached.Loader في TEMPLATES) فلا ذاكرة هنا.
+- كل دفعة تُسجَّل في myprojabd.metrics (emails_total، email_batches_total، email_send_seconds_total).
+
+يستخدمها صندوق الصادر (notifications.senders.send_email) ونموذج إعادة تعيين كلمة المرور
+(access.forms.PasswordResetForm).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.template.loader import select_template
+from django.utils import translation
+
+from myprojabd.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+def _candidates(name: str, language: str) -> list[str]:
+    base, ext = os.path.splitext(name)
+    return [f"{base}.{language}{ext}", name] if language else [name]
+
+
+def get_template(name: str, language: str | None = None):
+    language = language or translation.get_language() or ""
+    return select_template(_candidates(name, language))
+
+
+def render(name: str, context: dict, language: str | None = None) -> str:
+    language = language or translation.get_language()
+    with translation.override(language):
+        return get_template(name, language).render(context)
+
+
+def batch_size() -> int:
+    return max(1, int(getattr(settings, "EMAIL_BATCH_SIZE", 200)))
+
+
+def send_batch(messages: list, *, connection=None) -> list[Exception | None]:
+    """إرسال رسائل EmailMessage على اتصال واحد لكل دفعة. النتيجة لكل رسالة: None = أُرسلت."""
+    results: list[Exception | None] = []
+    size = batch_size()
+    for start in range(0, len(messages), size):
+        results += _send_chunk(messages[start:start + size], connection or get_connection())
+    return results
+
+
+def _send_chunk(chunk: list, connection) -> list[Exception | None]:
+    started = time.perf_counter()
+    errors: list[Exception | None] = []
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("SMTP connect failed: %s", e)
+        errors = [e] * len(chunk)
+    else:
+        try:
+            for index, message in enumerate(chunk):
+                try:
+                    # الاتصال مفتوح مسبقًا → send_messages لا يفتح ولا يغلق اتصالًا جديدًا
+                    connection.send_messages([message])
+                    errors.append(None)
+                except smtplib.SMTPServerDisconnected as e:
+                    # انقطع الاتصال: نعيد فتحه مرة واحدة ونكمل، وإلا تفشل بقية الدفعة
+                    errors.append(e)
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception as reconnect_error:
+                        errors += [reconnect_error] * (len(chunk) - index - 1)
+                        break
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            connection.close()
+
+    failed = sum(e is not None for e in errors)
+    registry.observe_email(len(chunk) - failed, failed, time.perf_counter() - started)
+    return errors
@@ -0,0 +1,83 @@
+# notifications/management/commands/bench_email.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from notifications import mail
+from notifications.smtp_sink import SMTPSink
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس سرعة إرسال البريد: دفعات على اتصال واحد (notifications.mail) مقابل اتصال لكل رسالة. "
+        "بدون --port يُشغَّل خادم SMTP تجريبي داخل العملية."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10000)
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, help="خادم SMTP قائم (مثل manage.py fake_smtp_server).")
+        parser.add_argument("--connect-latency-ms", type=int, default=0,
+                            help="تأخير مصطنع لكل اتصال جديد (يحاكي TLS/AUTH لخادم بعيد).")
+        parser.add_argument("--latency-ms", type=int, default=0, help="تأخير الخادم التجريبي لكل رسالة.")
+        parser.add_argument("--concurrency", type=int, default=settings.NOTIFY_CONCURRENCY.get("email", 2),
+                            help="اتصالات متوازية.")
+        parser.add_argument("--compare", type=int, default=200,
+                            help="عدد رسائل المقارنة باتصال لكل رسالة (0 = بدون مقارنة).")
+
+    def handle(self, *args, **opts):
+        sink = None
+        host, port = opts["host"], opts["port"]
+        if port is None:
+            sink = SMTPSink(
+                host, 0, latency=opts["latency_ms"] / 1000, connect_latency=opts["connect_latency_ms"] / 1000,
+                keep=False,
+            ).start()
+            port = sink.port
+        self.connect = lambda: get_connection(SMTP_BACKEND, host=host, port=port, use_tls=False, use_ssl=False,
+                                              username="", password="")
+        try:
+            self.stdout.write(f"SMTP {host}:{port} | رسائل: {opts['count']} | اتصالات متوازية: {opts['concurrency']}")
+            if opts["compare"]:
+                n = opts["compare"]
+                elapsed = self.unbatched(n)
+                self.report("اتصال لكل رسالة", n, elapsed)
+                self.stdout.write(f"  تقدير {opts['count']} رسالة: {elapsed / n * opts['count']:.1f}s")
+            elapsed, failed = self.batched(opts["count"], opts["concurrency"])
+            self.report(f"دفعات ({mail.batch_size()} لكل اتصال)", opts["count"], elapsed, failed)
+        finally:
+            if sink:
+                sink.stop()
+
+    def messages(self, n: int, offset: int = 0) -> list:
+        return [
+            EmailMessage(f"إشعار {i}", f"تم إنشاء طلبك رقم {i}.", settings.DEFAULT_FROM_EMAIL, [f"user{i}@example.com"])
+            for i in range(offset, offset + n)
+        ]
+
+    def unbatched(self, n: int) -> float:
+        started = time.perf_counter()
+        for message in self.messages(n):
+            message.connection = self.connect()
+            message.send()
+        return time.perf_counter() - started
+
+    def batched(self, n: int, concurrency: int) -> tuple[float, int]:
+        concurrency = max(1, concurrency)
+        size = -(-n // concurrency)
+        parts = [self.messages(min(size, n - start), start) for start in range(0, n, size)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda part: mail.send_batch(part, connection=self.connect()), parts))
+        elapsed = time.perf_counter() - started
+        return elapsed, sum(e is not None for errors in results for e in errors)
+
+    def report(self, label: str, n: int, elapsed: float, failed: int = 0) -> None:
+        self.stdout.write(
+            f"{label}: {n} في {elapsed:.2f}s → {n / elapsed:,.0f} رسالة/ث" + (f" | فشل: {failed}" if failed else "")
+        )
@@ -0,0 +1,38 @@
+# notifications/management/commands/dispatch_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.dispatcher import dispatch_once
+
+
+class Command(BaseCommand):
+    help = "إرسال رسائل صندوق الصادر المستحقة (عملية دائمة، أو دفعة واحدة مع --once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="دفعة واحدة ثم الخروج (للـ cron).")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=2.0, help="ثوانٍ بين الدفعات عند عدم وجود رسائل.")
+        parser.add_argument("--sms-concurrency", type=int, help="يتجاوز NOTIFY_CONCURRENCY['sms'].")
+        parser.add_argument("--email-concurrency", type=int, help="يتجاوز NOTIFY_CONCURRENCY['email'].")
+
+    def handle(self, *args, **opts):
+        concurrency = {
+            channel: opts[f"{channel}_concurrency"]
+            for channel in ("sms", "email")
+            if opts[f"{channel}_concurrency"]
+        }
+        try:
+            while True:
+                close_old_connections()
+                results = dispatch_once(opts["batch_size"], concurrency=concurrency)
+                if results:
+                    self.stdout.write(" | ".join(f"{status}: {n}" for status, n in sorted(results.items())))
+                if opts["once"]:
+                    break
+                # دفعة ممتلئة → غالبًا بقي المزيد؛ لا ننتظر
+                if sum(results.values()) < opts["batch_size"]:
+                    time.sleep(opts["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,40 @@
+# notifications/management/commands/fake_smtp_server.py
+from django.core.management.base import BaseCommand
+
+from notifications.smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = (
+        "خادم SMTP تجريبي محلي يستقبل البريد ولا يرسله (للتطوير واختبارات الحمل). "
+        "شغّله ثم اضبط EMAIL_HOST=127.0.0.1 EMAIL_PORT=<port>"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8026)
+        parser.add_argument("--connect-latency-ms", type=int, default=0,
+                            help="تأخير مصطنع لكل اتصال جديد (يحاكي TLS/AUTH لخادم بعيد).")
+        parser.add_argument("--latency-ms", type=int, default=0, help="تأخير مصطنع لكل رسالة.")
+        parser.add_argument("--quiet", action="store_true", help="عدم طباعة كل رسالة.")
+
+    def handle(self, *args, **opts):
+        quiet = opts["quiet"]
+        stdout = self.stdout
+
+        def on_message(sender, recipients, message):
+            stdout.write(f"EMAIL → {', '.join(recipients)}: {message['Subject']}")
+
+        sink = SMTPSink(
+            opts["host"], opts["port"],
+            latency=opts["latency_ms"] / 1000, connect_latency=opts["connect_latency_ms"] / 1000, keep=False,
+            on_message=None if quiet else on_message,
+        )
+        self.stdout.write(self.style.SUCCESS(f"خادم SMTP التجريبي يعمل على {sink.host}:{sink.port}"))
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.close()
+            self.stdout.write(f"تم الاستلام: {sink.count}")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('sms', 'رسالة نصية'), ('email', 'بريد إلكتروني')], max_length=10, verbose_name='القناة')),
+                ('recipient', models.CharField(max_length=254, verbose_name='المستلم')),
+                ('subject', models.CharField(blank=True, max_length=255, verbose_name='الموضوع')),
+                ('body', models.TextField(verbose_name='النص')),
+                ('dedupe_key', models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='مفتاح عدم التكرار')),
+                ('status', models.CharField(choices=[('pending', 'بانتظار الإرسال'), ('sending', 'قيد الإرسال'), ('sent', 'أُرسل'), ('dead', 'فشل نهائي')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='المحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='المحاولة التالية')),
+                ('last_error', models.CharField(blank=True, max_length=255, verbose_name='آخر خطأ')),
+                ('claim_token', models.UUIDField(blank=True, editable=False, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='انتهاء الحجز')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت الإدراج')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الإرسال')),
+            ],
+            options={
+                'verbose_name': 'رسالة صادرة',
+                'verbose_name_plural': 'صندوق الصادر',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='notify_due_idx'), models.Index(fields=['status', 'lease_expires_at'], name='notify_lease_idx'), models.Index(fields=['claim_token'], name='notify_claim_token_idx')],
+            },
+        ),
+    ]
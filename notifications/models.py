@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxMessage(models.Model):
+    """
+    صندوق الصادر: الإشعار يُكتب في نفس معاملة الحدث الذي سبّبه (لا يضيع إن تراجعت المعاملة
+    ولا يُرسل لحدث لم يُثبَّت)، ويرسله dispatch_outbox لاحقًا خارج مسار الطلب.
+    """
+
+    class Channel(models.TextChoices):
+        SMS = "sms", _("رسالة نصية")
+        EMAIL = "email", _("بريد إلكتروني")
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("بانتظار الإرسال")
+        SENDING = "sending", _("قيد الإرسال")
+        SENT = "sent", _("أُرسل")
+        DEAD = "dead", _("فشل نهائي")
+
+    channel = models.CharField(_("القناة"), max_length=10, choices=Channel.choices)
+    recipient = models.CharField(_("المستلم"), max_length=254)
+    subject = models.CharField(_("الموضوع"), max_length=255, blank=True)
+    body = models.TextField(_("النص"))
+    # يمنع إدراج نفس الإشعار مرتين (مثل "<المرجع>:sms")، ويُمرَّر للمزوّد كمعرّف ثابت
+    dedupe_key = models.CharField(_("مفتاح عدم التكرار"), max_length=100, unique=True, null=True, blank=True)
+
+    status = models.CharField(_("الحالة"), max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(_("المحاولات"), default=0)
+    next_attempt_at = models.DateTimeField(_("المحاولة التالية"), default=timezone.now)
+    last_error = models.CharField(_("آخر خطأ"), max_length=255, blank=True)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    lease_expires_at = models.DateTimeField(_("انتهاء الحجز"), null=True, blank=True)
+
+    created_at = models.DateTimeField(_("وقت الإدراج"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("وقت الإرسال"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("رسالة صادرة")
+        verbose_name_plural = _("صندوق الصادر")
+        ordering = ["-id"]
+        indexes = [
+            # ما يحتاجه الموزّع: المستحق الآن بالأقدم أولًا
+            models.Index(fields=["status", "next_attempt_at"], name="notify_due_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="notify_lease_idx"),
+            models.Index(fields=["claim_token"], name="notify_claim_token_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} → {self.recipient} ({self.status})"
@@ -0,0 +1,28 @@
+# notifications/outbox.py
+"""
+الإدراج في صندوق الصادر. يُستدعى داخل معاملة الحدث نفسه:
+
+    with transaction.atomic():
+        ticket = open_ticket(...)
+        outbox.enqueue("sms", phone, text, dedupe_key=f"{ticket.reference_number}:sms")
+"""
+from __future__ import annotations
+
+from django.db import IntegrityError, transaction
+
+from .models import OutboxMessage
+
+
+def enqueue(channel: str, recipient: str, body: str, *, subject: str = "", dedupe_key: str | None = None):
+    """إدراج رسالة (أو لا شيء إن سبق إدراج نفس dedupe_key). يرجع الرسالة أو None."""
+    if not recipient:
+        return None
+    try:
+        with transaction.atomic():
+            return OutboxMessage.objects.create(
+                channel=channel, recipient=recipient, subject=subject[:255], body=body, dedupe_key=dedupe_key,
+            )
+    except IntegrityError:
+        if dedupe_key and OutboxMessage.objects.filter(dedupe_key=dedupe_key).exists():
+            return None
+        raise
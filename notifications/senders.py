@@ -0,0 +1,70 @@
+# notifications/senders.py
+"""
+مُرسِلات القنوات: دالة تأخذ OutboxMessage وترفع SendError (أو أي استثناء) عند الفشل.
+تُختار من الإعداد NOTIFY_SENDERS = {"sms": "<مسار الدالة>", "email": ...}.
+المُرسِل الذي يحمل الخاصية batch = True يأخذ قائمة رسائل ويرجع نتيجة كل منها (None أو الاستثناء).
+
+الإرسال للمزوّد "مرة واحدة على الأقل": إن توقّف الموزّع بعد الإرسال وقبل تعليم الرسالة
+فستُرسل ثانيةً بعد انتهاء الحجز؛ لذلك نمرّر معرّفًا ثابتًا لكل رسالة (Message-ID للبريد).
+"""
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.utils import DNS_NAME
+
+from access.sms import dispatcher_from_settings
+from . import mail
+
+
+class SendError(Exception):
+    """فشل الإرسال (يُعاد لاحقًا حسب NOTIFY_MAX_ATTEMPTS)."""
+
+
+_sms = None
+_sms_lock = threading.Lock()
+
+
+def _sms_dispatcher():
+    global _sms
+    if _sms is None:
+        with _sms_lock:
+            if _sms is None:
+                # إعادة المحاولة يديرها صندوق الصادر (بتراجع محفوظ في القاعدة) لا الموزّع
+                _sms = dispatcher_from_settings(max_retries=0)
+    return _sms
+
+
+def send_sms(message) -> None:
+    if not _sms_dispatcher().send(message.recipient, message.body):
+        raise SendError("رفض مزوّد الرسائل أو تعذّر الاتصال")
+
+
+def message_id(message) -> str:
+    """Message-ID ثابت للرسالة عبر كل المحاولات (يسمح للمستلم/المزوّد بتجاهل المكرر)."""
+    return f"<outbox-{message.pk}@{DNS_NAME}>"
+
+
+def email_message(message) -> EmailMessage:
+    return EmailMessage(
+        subject=message.subject,
+        body=message.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[message.recipient],
+        headers={"Message-ID": message_id(message)},
+    )
+
+
+def send_email(messages) -> list:
+    """مُرسِل دفعات: اتصال SMTP واحد لكل دفعة (notifications/mail.py)."""
+    return mail.send_batch([email_message(m) for m in messages])
+
+
+send_email.batch = True
+
+
+def console(message) -> None:
+    """للتطوير بدون مزوّد (مثل رموز OTP في وضع التطوير)."""
+    print(f"[DEV] {message.channel.upper()} to {message.recipient}: {message.body}")
@@ -0,0 +1,126 @@
+# notifications/smtp_sink.py
+"""
+خادم SMTP محلي بسيط يستقبل الرسائل ويحتفظ بها في الذاكرة (لا يرسل شيئًا).
+للتطوير والاختبارات وقياس الإرسال: manage.py fake_smtp_server
+يكفي لعميل smtplib/Django: EHLO/HELO، MAIL، RCPT، DATA، RSET، NOOP، QUIT.
+"""
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # الرد كاملًا في كتابة واحدة وبدون Nagle (وإلا يتأخر كل رد متعدد الأسطر ~40ms بسبب delayed ACK)
+    disable_nagle_algorithm = True
+
+    def reply(self, *lines: str) -> None:
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode("ascii"))
+
+    def handle(self):
+        sink = self.server.sink
+        sink.opened()
+        if sink.connect_latency:
+            # محاكاة كلفة الاتصال بخادم حقيقي (TCP بعيد + TLS + AUTH)
+            time.sleep(sink.connect_latency)
+        self.reply("220 localhost fake SMTP")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost", "250-8BITMIME", "250 SMTPUTF8")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(" <>").split(">")[0], []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip(" <>").split(">")[0])
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    lines.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink.store(sender, recipients, b"".join(lines))
+                sender, recipients = None, []
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                if verb == "RSET":
+                    sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    sink = SMTPSink(port=0).start()   # منفذ عشوائي → sink.port
+    ...
+    sink.stop(); sink.messages → [email.message.EmailMessage]
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8026, *, latency: float = 0.0,
+                 connect_latency: float = 0.0, keep: bool = True, on_message=None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.keep = keep
+        self.on_message = on_message
+        self.messages = []
+        self.count = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def store(self, sender, recipients, data: bytes) -> None:
+        # التحليل فقط عند الحاجة (قياس الإرسال يعدّ الرسائل فقط)
+        message = message_from_bytes(data, policy=policy.default) if self.keep or self.on_message else None
+        with self._lock:
+            self.count += 1
+            if self.keep:
+                self.messages.append(message)
+        if self.on_message:
+            self.on_message(sender, recipients, message)
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, name="smtp-sink", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self.close()
@@ -0,0 +1,206 @@
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail as django_mail
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lookup.models import Customer
+from myprojabd.metrics import registry
+from tickets.models import Ticket
+from . import dispatcher, mail, outbox
+from .dispatcher import claim_batch, dispatch_once
+from .models import OutboxMessage
+from .senders import SendError, message_id
+from .smtp_sink import SMTPSink
+
+User = get_user_model()
+Status = OutboxMessage.Status
+
+
+def _ok(message):
+    pass
+
+
+def _fail(message):
+    raise SendError("provider down")
+
+
+class OutboxTests(TestCase):
+    def test_rolled_back_transaction_leaves_no_message(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                outbox.enqueue("sms", "0500000001", "نص")
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_dedupe_key_enqueues_once(self):
+        self.assertIsNotNone(outbox.enqueue("sms", "0500000001", "نص", dedupe_key="UW-1:sms"))
+        self.assertIsNone(outbox.enqueue("sms", "0500000001", "نص", dedupe_key="UW-1:sms"))
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_service_request_queues_notifications_with_ticket(self):
+        user = User.objects.create_user(username="0500000001", password="x")
+        Customer.objects.create(
+            full_name="أحمد علي", national_id="1000000001", mobile="0500000009", email="a@example.com"
+        )
+        self.client.force_login(user)
+        self.client.post(reverse("lookup:home"), {"national_id": "1000000001"})
+        self.client.post(reverse("lookup:choose_role"), {"role": "owner"})
+        self.client.post(reverse("lookup:service_request", args=["pay_debt"]))
+
+        ref = Ticket.objects.get().reference_number
+        queued = dict(OutboxMessage.objects.values_list("channel", "recipient"))
+        self.assertEqual(queued, {"sms": "0500000009", "email": "a@example.com"})
+        self.assertTrue(all(ref in m.body for m in OutboxMessage.objects.all()))
+
+    @override_settings(NOTIFY_MAX_ATTEMPTS=2, NOTIFY_RETRY_BACKOFF_SECONDS=0)
+    def test_dispatch_sends_retries_and_dead_letters(self):
+        sms = outbox.enqueue("sms", "0500000001", "نص")
+        email = outbox.enqueue("email", "a@example.com", "نص", subject="موضوع")
+        senders = {"sms": _ok, "email": _fail}
+
+        with self.assertLogs("notifications.dispatcher", "WARNING"):
+            self.assertEqual(dispatch_once(senders=senders), {Status.SENT: 1, Status.PENDING: 1})
+        sms.refresh_from_db()
+        email.refresh_from_db()
+        self.assertEqual((sms.status, sms.attempts), (Status.SENT, 1))
+        self.assertEqual((email.status, email.attempts, email.last_error), (Status.PENDING, 1, "provider down"))
+
+        with self.assertLogs("notifications.dispatcher", "ERROR"):
+            self.assertEqual(dispatch_once(senders=senders), {Status.DEAD: 1})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (Status.DEAD, 2))
+        # لا شيء مستحق بعد ذلك
+        self.assertEqual(dispatch_once(senders=senders), {})
+
+    @override_settings(NOTIFY_CONCURRENCY={"email": 1})
+    def test_batch_sender_missing_results_marks_rest_failed(self):
+        first, second = (outbox.enqueue("email", f"u{i}@example.com", "نص", subject="موضوع") for i in range(2))
+
+        def short(messages):
+            return [None]          # نتيجة واحدة لرسالتين
+
+        short.batch = True
+        with self.assertLogs("notifications.dispatcher", "WARNING") as logs:
+            self.assertEqual(dispatch_once(senders={"email": short}), {Status.SENT: 1, Status.PENDING: 1})
+        self.assertIn("returned 1 results for 2 messages", logs.output[0])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Status.SENT)
+        self.assertEqual((second.status, second.attempts), (Status.PENDING, 1))
+
+    @override_settings(NOTIFY_LEASE_SECONDS=0.3, NOTIFY_CONCURRENCY={"sms": 1})
+    def test_lease_renewed_while_a_slow_batch_is_sending(self):
+        messages = [outbox.enqueue("sms", f"050000000{i}", "نص") for i in range(2)]
+
+        def slow(message):
+            time.sleep(0.25)
+
+        with mock.patch("notifications.dispatcher._renew_leases", wraps=dispatcher._renew_leases) as renew:
+            self.assertEqual(dispatch_once(senders={"sms": slow}), {Status.SENT: 2})
+        renew.assert_called()
+        self.assertEqual({m.status for m in OutboxMessage.objects.filter(pk__in=[m.pk for m in messages])}, {Status.SENT})
+
+    def test_lost_lease_is_logged_not_silently_ignored(self):
+        message = outbox.enqueue("sms", "0500000001", "نص")
+        [claimed] = claim_batch(10)
+        # موزّع آخر استرد الحجز بعد انتهاء مهلته
+        OutboxMessage.objects.filter(pk=message.pk).update(claim_token=uuid.uuid4())
+        with self.assertLogs("notifications.dispatcher", "ERROR") as logs:
+            dispatcher.deliver([claimed], senders={"sms": _ok})
+        self.assertIn("lease lost for 1 of 1", logs.output[0])
+        message.refresh_from_db()
+        self.assertEqual(message.status, Status.SENDING)
+
+    def test_backoff_and_abandoned_lease(self):
+        message = outbox.enqueue("sms", "0500000001", "نص")
+        with self.assertLogs("notifications.dispatcher", "WARNING"):
+            dispatch_once(senders={"sms": _fail})
+        # ليست مستحقة قبل انقضاء التراجع
+        self.assertEqual(claim_batch(10), [])
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual([m.pk for m in claim_batch(10)], [message.pk])
+        # حجز متروك (توقّف الموزّع) لا يُحجز ثانيةً إلا بعد انتهاء مهلته
+        self.assertEqual(claim_batch(10), [])
+        OutboxMessage.objects.filter(pk=message.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([m.attempts for m in claim_batch(10)], [3])
+
+
+class EmailDeliveryTests(TestCase):
+    def setUp(self):
+        self.sink = SMTPSink(port=0).start()
+        self.addCleanup(self.sink.stop)
+
+    def smtp(self, **extra):
+        return override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST=self.sink.host, EMAIL_PORT=self.sink.port, **extra,
+        )
+
+    def test_one_connection_per_batch(self):
+        messages = [EmailMessage(f"s{i}", "b", "from@example.com", [f"u{i}@example.com"]) for i in range(5)]
+        registry.reset()
+        with self.smtp(EMAIL_BATCH_SIZE=2):
+            self.assertEqual(mail.send_batch(messages), [None] * 5)
+        self.assertEqual((self.sink.count, self.sink.connections), (5, 3))
+        self.assertIn('emails_total{result="sent"} 5', registry.render())
+        self.assertIn("email_batches_total 3", registry.render())
+
+    def test_rejected_message_does_not_fail_the_batch(self):
+        class Connection:
+            def open(self): pass
+            def close(self): pass
+            def send_messages(self, messages):
+                if messages[0].to == ["bad@example.com"]:
+                    raise ValueError("rejected")
+                return 1
+
+        to = ["a@example.com", "bad@example.com", "c@example.com"]
+        results = mail.send_batch([EmailMessage("s", "b", "f@example.com", [t]) for t in to], connection=Connection())
+        self.assertEqual([type(r) for r in results], [type(None), ValueError, type(None)])
+
+    def test_outbox_email_is_sent_in_batches(self):
+        for i in range(6):
+            outbox.enqueue("email", f"u{i}@example.com", "نص", subject="موضوع")
+        with self.smtp(NOTIFY_CONCURRENCY={"email": 2}):
+            self.assertEqual(dispatch_once(), {Status.SENT: 6})
+        self.assertEqual((self.sink.count, self.sink.connections), (6, 2))
+
+    def test_email_reaches_smtp_server_with_stable_message_id(self):
+        with self.smtp():
+            message = outbox.enqueue("email", "a@example.com", "تم إنشاء طلبك", subject="طلب UW-1")
+            self.assertEqual(dispatch_once(), {Status.SENT: 1})
+
+        [received] = self.sink.messages
+        self.assertEqual(received["To"], "a@example.com")
+        self.assertEqual(received["Subject"], "طلب UW-1")
+        self.assertEqual(received["Message-ID"], message_id(message))
+        self.assertIn("تم إنشاء طلبك", received.get_content())
+
+
+class PasswordResetTests(TestCase):
+    def test_reset_emails_share_one_connection_and_prefer_language_templates(self):
+        for i in range(3):
+            User.objects.create_user(username=f"050000000{i}", email="shared@example.com", password="x")
+
+        with mock.patch("notifications.mail.get_connection", wraps=mail.get_connection) as connect, \
+                mock.patch("notifications.mail.select_template", wraps=mail.select_template) as load:
+            response = self.client.post(reverse("access:password_reset"), {"email": "shared@example.com"})
+
+        self.assertRedirects(response, "/access/password-reset/done/", fetch_redirect_response=False)
+        self.assertEqual(len(django_mail.outbox), 3)
+        self.assertIn("/access/reset/", django_mail.outbox[0].body)
+        connect.assert_called_once()
+        # قالب الموضوع + قالب النص لكل رسالة، ونسخة اللغة أولًا
+        self.assertEqual(load.call_count, 6)
+        self.assertEqual(load.call_args_list[0].args[0], [
+            "access/password_reset_subject.ar.txt", "access/password_reset_subject.txt",
+        ])
@@ -1,10 +1,90 @@
 from django.contrib import admin
-from .models import Ticket
+
+from myprojabd.admin_utils import LargeTableAdminMixin
+from . import workflow
+from .models import Ticket, TicketCounter, TicketEvent
+
+
+class TicketTypeFilter(admin.SimpleListFilter):
+    """الأنواع من جدول العدّادات (صفوف قليلة) بدل SELECT DISTINCT على جدول الطلبات."""
+    title = "نوع الطلب"
+    parameter_name = "ticket_type"
+
+    def lookups(self, request, model_admin):
+        types = TicketCounter.objects.order_by("ticket_type").values_list("ticket_type", flat=True).distinct()
+        return [(t, t) for t in types]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(ticket_type=self.value())
+        return queryset
+
+
+class TicketEventInline(admin.TabularInline):
+    """الخط الزمني للطلب (قراءة فقط؛ السجل للإلحاق فقط)."""
+    model = TicketEvent
+    fields = ("created_at", "kind", "from_status", "to_status", "actor", "note")
+    readonly_fields = fields
+    ordering = ("id",)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("actor")
+
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
-    list_display = ("reference_number", "ticket_type", "status", "created_at")
-    list_filter = ("ticket_type", "status", "created_at")
-    search_fields = ("reference_number", "ticket_type")
+class TicketAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("reference_number", "ticket_type", "status", "created_at", "updated_at")
+    list_filter = ("status", TicketTypeFilter)
+    # الرقم المرجعي بالتطابق التام أو البادئة (عبر الفهرس الفريد)
+    search_fields = ("=reference_number", "^reference_number")
     ordering = ("-created_at",)
-    readonly_fields = ("created_at",)
+    readonly_fields = ("reference_number", "created_at", "updated_at", "lease_expires_at")
+    autocomplete_fields = ("customer",)
+    raw_id_fields = ("user", "claimed_by")
+    inlines = (TicketEventInline,)
+
+    # حقول اللقطة التي لا تتغير إلا عبر workflow (حدث في الخط الزمني + العدّادات)
+    tracked_fields = ("status", "claimed_by")
+
+    def save_model(self, request, obj, form, change):
+        # تغيير الحالة/المسؤول من اللوحة يمر عبر workflow ليُسجَّل في الخط الزمني
+        changes = {}
+        if change:
+            for name in self.tracked_fields:
+                if name in form.changed_data:
+                    changes[name] = getattr(obj, name)
+                    setattr(obj, obj._meta.get_field(name).attname, form.initial[name])
+        super().save_model(request, obj, form, change)
+        if not change:
+            workflow.record_created(obj, actor=request.user)
+        elif changes:
+            if "status" in changes:
+                kind = workflow.Kind.STATUS
+            else:
+                kind = workflow.Kind.ASSIGNED if changes["claimed_by"] else workflow.Kind.RELEASED
+            note = "لوحة الإدارة"
+            if changes.get("claimed_by"):
+                note += f" — المسؤول: {changes['claimed_by']}"
+            workflow.apply(obj, kind, actor=request.user, note=note, **changes)
+
+
+@admin.register(TicketCounter)
+class TicketCounterAdmin(admin.ModelAdmin):
+    list_display = ("ticket_type", "status", "count")
+    list_filter = ("status",)
+    ordering = ("ticket_type", "status")
+
+    # تُدار آليًا (workflow / reconcile_ticket_counters)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
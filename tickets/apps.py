@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 from django.utils.translation import gettext_lazy as _
 
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tickets'
     verbose_name = _('الطلبات')
+
+    def ready(self):
+        from .checks import worker_id_check, worker_id_deploy_check
+        checks.register(worker_id_check)
+        # الحجز من القاعدة احتياطي؛ في الإنتاج يُضبط الرقم صراحةً
+        checks.register(worker_id_deploy_check, deploy=True)
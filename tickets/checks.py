@@ -0,0 +1,37 @@
+# tickets/checks.py
+from django.conf import settings
+from django.core import checks
+
+from .refs import MAX_WORKER
+
+
+def worker_id_check(app_configs, **kwargs):
+    """TICKET_WORKER_ID إن ضُبط يجب أن يكون رقمًا في 0..MAX_WORKER (وإلا فشل أول طلب)."""
+    configured = getattr(settings, "TICKET_WORKER_ID", None)
+    if configured in (None, ""):
+        return []
+    try:
+        valid = 0 <= int(configured) <= MAX_WORKER
+    except (TypeError, ValueError):
+        valid = False
+    if valid:
+        return []
+    return [
+        checks.Error(
+            f"TICKET_WORKER_ID={configured!r} ليس رقمًا في 0..{MAX_WORKER}.",
+            id="tickets.E001",
+        )
+    ]
+
+
+def worker_id_deploy_check(app_configs, **kwargs):
+    """بدون TICKET_WORKER_ID يُحجز رقم العامل من القاعدة (كتابة في أول طلب لكل عملية + تجديد دوري)."""
+    if getattr(settings, "TICKET_WORKER_ID", None) not in (None, ""):
+        return []
+    return [
+        checks.Warning(
+            "TICKET_WORKER_ID غير مضبوط: الأرقام المرجعية تحجز رقم العامل من جدول ReferenceWorker.",
+            hint="اضبط TICKET_WORKER_ID فريدًا لكل عملية (0..1023) ليتولّد الرقم المرجعي بلا رجوع للقاعدة.",
+            id="tickets.W001",
+        )
+    ]
@@ -0,0 +1,50 @@
+# tickets/management/commands/reconcile_ticket_counters.py
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from tickets.models import Ticket, TicketCounter
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء عدّادات الطلبات (النوع × الحالة) من جدول الطلبات وإظهار الفروقات"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="إظهار الفروقات فقط دون تعديل.")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            if connection.vendor == "postgresql" and not opts["dry_run"]:
+                # يوقف تحديثات العدّادات المتزامنة حتى نهاية إعادة البناء؛ الانتقالات الجارية
+                # (غير المثبّتة بعد) لا يراها التجميع وتطبّق زيادتها بعدنا فلا يضيع شيء
+                with connection.cursor() as cur:
+                    cur.execute(f"LOCK TABLE {TicketCounter._meta.db_table} IN EXCLUSIVE MODE")
+
+            actual = {
+                (r["ticket_type"], r["status"]): r["n"]
+                for r in Ticket.objects.values("ticket_type", "status").annotate(n=Count("id")).order_by()
+            }
+            stored = {
+                (t, s): n for t, s, n in TicketCounter.objects.values_list("ticket_type", "status", "count")
+            }
+
+            diffs = [
+                (key, stored.get(key, 0), actual.get(key, 0))
+                for key in sorted(set(actual) | set(stored))
+                if stored.get(key, 0) != actual.get(key, 0)
+            ]
+            for (ticket_type, status), old, new in diffs:
+                self.stdout.write(f"{ticket_type}/{status}: {old} → {new}")
+
+            if opts["dry_run"]:
+                self.stdout.write(f"فروقات: {len(diffs)} (تشغيل تجريبي، لم يُعدَّل شيء)")
+                return
+
+            TicketCounter.objects.all().delete()
+            TicketCounter.objects.bulk_create(
+                TicketCounter(ticket_type=t, status=s, count=n) for (t, s), n in actual.items()
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"تمت إعادة بناء العدّادات: {len(actual)} صف، فروقات مصححة: {len(diffs)}"
+        ))
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:42
+
+import django.db.models.deletion
+import tickets.refs
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0009_customer_code_upper_history_type_indexes'),
+        ('tickets', '0002_alter_ticket_options_alter_ticket_created_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='contact_email',
+            field=models.EmailField(blank=True, max_length=254, verbose_name='البريد الإلكتروني'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='contact_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='الاسم'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='contact_phone',
+            field=models.CharField(blank=True, max_length=15, verbose_name='رقم الجوال'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tickets', to='lookup.customer', verbose_name='العميل'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='role',
+            field=models.CharField(blank=True, max_length=20, verbose_name='الدور'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tickets', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='reference_number',
+            field=models.CharField(default=tickets.refs.next_reference, editable=False, max_length=20, unique=True, verbose_name='الرقم المرجعي'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', '-created_at'], name='tickets_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at'], name='tickets_created_idx'),
+        ),
+    ]
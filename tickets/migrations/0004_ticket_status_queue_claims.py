@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0009_customer_code_upper_history_type_indexes'),
+        ('tickets', '0003_ticket_requester_and_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='claim_token',
+            field=models.UUIDField(blank=True, editable=False, null=True, verbose_name='رمز الحجز'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_tickets', to=settings.AUTH_USER_MODEL, verbose_name='الموظف المسؤول'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='انتهاء الحجز'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'قيد الانتظار'), ('InProgress', 'قيد المعالجة'), ('Done', 'مكتمل'), ('Cancelled', 'ملغى')], default='Pending', max_length=20, verbose_name='الحالة الحالية'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='tickets_status_lease_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['claim_token'], name='tickets_claim_token_idx'),
+        ),
+    ]
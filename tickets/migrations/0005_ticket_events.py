@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_created_events(apps, schema_editor):
+    """حدث إنشاء للطلبات الموجودة حتى يبدأ خطها الزمني من حالتها الحالية ووقت إنشائها."""
+    Ticket = apps.get_model("tickets", "Ticket")
+    TicketEvent = apps.get_model("tickets", "TicketEvent")
+    db = schema_editor.connection.alias
+    batch = []
+    for pk, status in Ticket.objects.using(db).values_list("pk", "status").iterator(chunk_size=2000):
+        batch.append(TicketEvent(ticket_id=pk, kind="created", to_status=status, note="backfill"))
+        if len(batch) >= 2000:
+            TicketEvent.objects.using(db).bulk_create(batch)
+            batch = []
+    TicketEvent.objects.using(db).bulk_create(batch)
+    # created_at بـ auto_now_add يأخذ وقت الترحيل؛ نعيده لوقت إنشاء الطلب بتحديث واحد
+    created = Ticket.objects.filter(pk=OuterRef("ticket_id")).values("created_at")[:1]
+    TicketEvent.objects.using(db).filter(kind="created", note="backfill").update(created_at=Subquery(created))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_ticket_status_queue_claims'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='آخر تحديث'),
+        ),
+        migrations.CreateModel(
+            name='TicketEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'إنشاء'), ('status', 'تغيير حالة'), ('assigned', 'إسناد'), ('released', 'إرجاع للطابور'), ('note', 'ملاحظة')], max_length=20, verbose_name='النوع')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='من حالة')),
+                ('to_status', models.CharField(blank=True, max_length=20, verbose_name='إلى حالة')),
+                ('note', models.TextField(blank=True, verbose_name='ملاحظة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='الوقت')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='المنفّذ')),
+                ('ticket', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='tickets.ticket', verbose_name='الطلب')),
+            ],
+            options={
+                'verbose_name': 'حدث طلب',
+                'verbose_name_plural': 'أحداث الطلبات',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['ticket', 'id'], name='tickets_event_timeline_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_created_events, migrations.RunPython.noop),
+    ]
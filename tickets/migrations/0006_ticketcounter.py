@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    Ticket = apps.get_model("tickets", "Ticket")
+    TicketCounter = apps.get_model("tickets", "TicketCounter")
+    rows = Ticket.objects.values("ticket_type", "status").annotate(n=models.Count("id")).order_by()
+    TicketCounter.objects.bulk_create(
+        TicketCounter(ticket_type=r["ticket_type"], status=r["status"], count=r["n"]) for r in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_type', models.CharField(max_length=50, verbose_name='نوع الطلب')),
+                ('status', models.CharField(choices=[('Pending', 'قيد الانتظار'), ('InProgress', 'قيد المعالجة'), ('Done', 'مكتمل'), ('Cancelled', 'ملغى')], max_length=20, verbose_name='الحالة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'عدّاد طلبات',
+                'verbose_name_plural': 'عدّادات الطلبات',
+                'constraints': [models.UniqueConstraint(fields=('ticket_type', 'status'), name='tickets_counter_type_status_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_ticketcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceWorker',
+            fields=[
+                ('worker_id', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='رقم العامل')),
+                ('holder', models.CharField(max_length=100, verbose_name='العملية الحاجزة')),
+                ('heartbeat', models.DateTimeField(verbose_name='آخر تجديد')),
+            ],
+            options={
+                'verbose_name': 'رقم عامل',
+                'verbose_name_plural': 'أرقام العمال',
+            },
+        ),
+    ]
@@ -1,16 +1,180 @@
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .refs import next_reference
+
+
 class Ticket(models.Model):
-    reference_number = models.CharField(_("الرقم المرجعي"), max_length=20, unique=True)  # رقم مرجعي فريد
+    class Status(models.TextChoices):
+        PENDING = "Pending", _("قيد الانتظار")
+        IN_PROGRESS = "InProgress", _("قيد المعالجة")
+        DONE = "Done", _("مكتمل")
+        CANCELLED = "Cancelled", _("ملغى")
+
+    # رقم مرجعي فريد ومرتب زمنيًا (tickets/refs.py) — يُولَّد بدون الرجوع لقاعدة البيانات
+    reference_number = models.CharField(
+        _("الرقم المرجعي"), max_length=20, unique=True, default=next_reference, editable=False
+    )
     ticket_type = models.CharField(_("نوع الطلب"), max_length=50)
     created_at = models.DateTimeField(_("تاريخ الإنشاء"), auto_now_add=True)
-    status = models.CharField(_("الحالة الحالية"), max_length=20, default="Pending")
+    # آخر تغيير على اللقطة (الحالة/الحجز) — التاريخ الكامل في TicketEvent
+    updated_at = models.DateTimeField(_("آخر تحديث"), auto_now=True)
+    status = models.CharField(_("الحالة الحالية"), max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    # مقدّم الطلب
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="tickets",
+        verbose_name=_("المستخدم"),
+    )
+    # العميل من قاعدة البيانات (فارغ عند الإدخال اليدوي)
+    customer = models.ForeignKey(
+        "lookup.Customer",
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="tickets",
+        verbose_name=_("العميل"),
+    )
+    role = models.CharField(_("الدور"), max_length=20, blank=True)
+    # لقطة من بيانات التواصل وقت الطلب
+    contact_name = models.CharField(_("الاسم"), max_length=255, blank=True)
+    contact_phone = models.CharField(_("رقم الجوال"), max_length=15, blank=True)
+    contact_email = models.EmailField(_("البريد الإلكتروني"), blank=True)
+
+    # طابور الموظفين (tickets/queue.py): مَن حجز الطلب وحتى متى
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="claimed_tickets",
+        verbose_name=_("الموظف المسؤول"),
+    )
+    claim_token = models.UUIDField(_("رمز الحجز"), null=True, blank=True, editable=False)
+    lease_expires_at = models.DateTimeField(_("انتهاء الحجز"), null=True, blank=True)
 
     class Meta:
         verbose_name = _("طلب")
         verbose_name_plural = _("الطلبات")
         ordering = ["-created_at"]
+        indexes = [
+            # قوائم الطلبات حسب الحالة + الطابور (الأقدم أولًا بالقراءة العكسية)
+            models.Index(fields=["status", "-created_at"], name="tickets_status_created_idx"),
+            models.Index(fields=["-created_at"], name="tickets_created_idx"),
+            # استرجاع الحجوزات المنتهية
+            models.Index(fields=["status", "lease_expires_at"], name="tickets_status_lease_idx"),
+            models.Index(fields=["claim_token"], name="tickets_claim_token_idx"),
+        ]
 
     def __str__(self):
         return f"{self.reference_number} - {self.ticket_type} - {self.status}"
+
+
+class TicketEventQuerySet(models.QuerySet):
+    """update()/delete() الجماعيان يتجاوزان save()/delete() للصف، فيُمنعان هنا أيضًا."""
+
+    def update(self, **kwargs):
+        raise ValueError("TicketEvent للإلحاق فقط ولا يُعدَّل.")
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        raise ValueError("TicketEvent للإلحاق فقط ولا يُعدَّل.")
+
+    def delete(self):
+        raise ValueError("TicketEvent للإلحاق فقط ولا يُحذف.")
+
+    delete.queryset_only = True
+
+
+class TicketEvent(models.Model):
+    """
+    سجل أحداث الطلب (إلحاق فقط): كل انتقال حالة/حجز/ملاحظة صف جديد لا يُعدَّل ولا يُحذف.
+    صف Ticket هو اللقطة الحالية ويُحدَّث في نفس المعاملة (tickets/workflow.py).
+    """
+
+    class Kind(models.TextChoices):
+        CREATED = "created", _("إنشاء")
+        STATUS = "status", _("تغيير حالة")
+        ASSIGNED = "assigned", _("إسناد")
+        RELEASED = "released", _("إرجاع للطابور")
+        NOTE = "note", _("ملاحظة")
+
+    # PROTECT: لا يُحذف طلب له تاريخ؛ الفهرس المركّب أدناه يغني عن فهرس المفتاح الأجنبي
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.PROTECT, related_name="events", db_index=False, verbose_name=_("الطلب")
+    )
+    kind = models.CharField(_("النوع"), max_length=20, choices=Kind.choices)
+    from_status = models.CharField(_("من حالة"), max_length=20, blank=True)
+    to_status = models.CharField(_("إلى حالة"), max_length=20, blank=True)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="+",
+        verbose_name=_("المنفّذ"),
+    )
+    note = models.TextField(_("ملاحظة"), blank=True)
+    created_at = models.DateTimeField(_("الوقت"), auto_now_add=True)
+
+    # المدير الأساسي (_base_manager) يبقى العادي: حذف مستخدم يُفرغ actor (SET_NULL) بتحديث جماعي
+    objects = TicketEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("حدث طلب")
+        verbose_name_plural = _("أحداث الطلبات")
+        ordering = ["id"]
+        indexes = [
+            # الخط الزمني لطلب واحد: بحث بالفهرس ومرتب مسبقًا
+            models.Index(fields=["ticket", "id"], name="tickets_event_timeline_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_id} {self.kind} {self.from_status}→{self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("TicketEvent للإلحاق فقط ولا يُعدَّل.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("TicketEvent للإلحاق فقط ولا يُحذف.")
+
+
+class TicketCounter(models.Model):
+    """
+    عدد الطلبات لكل (نوع، حالة) — يُحدَّث في نفس معاملة كل انتقال (tickets/workflow.py)
+    فتقرأ لوحة المتابعة صفوفًا قليلة ثابتة مهما كبر جدول الطلبات.
+    إعادة البناء من الصفر: manage.py reconcile_ticket_counters
+    """
+    ticket_type = models.CharField(_("نوع الطلب"), max_length=50)
+    status = models.CharField(_("الحالة"), max_length=20, choices=Ticket.Status.choices)
+    count = models.IntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("عدّاد طلبات")
+        verbose_name_plural = _("عدّادات الطلبات")
+        constraints = [
+            models.UniqueConstraint(fields=["ticket_type", "status"], name="tickets_counter_type_status_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_type}/{self.status}: {self.count}"
+
+
+class ReferenceWorker(models.Model):
+    """
+    حجز رقم عامل للأرقام المرجعية (tickets/refs.py) لعملية واحدة حيّة.
+    تجدّد العملية heartbeat أثناء عملها؛ الحجز الذي انقضت مهلته (TICKET_WORKER_LEASE_SECONDS)
+    يُعاد استخدامه بتحديث مشروط واحد، فلا تحمل عمليتان الرقم نفسه في وقت واحد.
+    """
+    worker_id = models.PositiveSmallIntegerField(_("رقم العامل"), primary_key=True)
+    holder = models.CharField(_("العملية الحاجزة"), max_length=100)
+    heartbeat = models.DateTimeField(_("آخر تجديد"))
+
+    class Meta:
+        verbose_name = _("رقم عامل")
+        verbose_name_plural = _("أرقام العمال")
+
+    def __str__(self):
+        return f"{self.worker_id} ← {self.holder}"
@@ -0,0 +1,122 @@
+# tickets/queue.py
+"""
+طابور الطلبات للموظفين: كل موظف يحجز أقدم N طلبات متاحة دون أن ينتظر غيره أو يحجز طلبًا محجوزًا.
+
+- PostgreSQL/MySQL 8+/Oracle: SELECT ... FOR UPDATE SKIP LOCKED — الصفوف التي يقفلها موظف آخر
+  تُتخطّى بدل انتظارها.
+- SQLite (لا يدعم أقفال الصفوف): حجز مشروط بمهلة (lease). التحديث لا يصيب إلا الصفوف التي ما زالت
+  متاحة، ثم نقرأ ما حجزناه فعلًا برمز الحجز؛ والمعاملة IMMEDIATE تجعل الحاجزين بالتتابع.
+
+الطلب المتاح: Pending، أو InProgress انتهت مهلة حجزه (موظف توقّف دون إنهاء/تمديد).
+كل حجز/إرجاع/إنهاء يُلحق TicketEvent في نفس المعاملة (tickets/workflow.py).
+"""
+from __future__ import annotations
+
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import status as public_status, workflow
+from .models import Ticket, TicketEvent
+
+Status = Ticket.Status
+
+
+class ClaimError(Exception):
+    """الطلب غير محجوز لهذا الموظف (انتهت المهلة وحجزه غيره، أو لم يُحجز أصلًا)."""
+
+
+def lease_duration() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "TICKET_LEASE_SECONDS", 900)))
+
+
+def claimable(now=None) -> Q:
+    now = now or timezone.now()
+    return Q(status=Status.PENDING) | Q(status=Status.IN_PROGRESS, lease_expires_at__lt=now)
+
+
+def claim(agent, n: int = 1, *, ticket_type: str | None = None) -> list[Ticket]:
+    """حجز أقدم n طلبات متاحة للموظف agent وإرجاعها (قد تكون أقل من n أو فارغة)."""
+    n = max(int(n), 0)
+    if not n:
+        return []
+    now = timezone.now()
+    token = uuid.uuid4()
+    db = router.db_for_write(Ticket)
+    skip_locked = connections[db].features.has_select_for_update_skip_locked
+
+    with transaction.atomic(using=db):
+        candidates = Ticket.objects.using(db).filter(claimable(now))
+        if ticket_type:
+            candidates = candidates.filter(ticket_type=ticket_type)
+        candidates = candidates.order_by("created_at", "pk")
+        if skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        rows = list(candidates.values_list("pk", "status", "ticket_type")[:n])
+        if not rows:
+            return []
+        previous = {pk: (status, ticket_type) for pk, status, ticket_type in rows}
+        # الشرط مكرر عمدًا: على SQLite هو ما يمنع الحجز المزدوج
+        Ticket.objects.using(db).filter(claimable(now), pk__in=list(previous)).update(
+            status=Status.IN_PROGRESS,
+            claimed_by=agent,
+            claim_token=token,
+            lease_expires_at=now + lease_duration(),
+            updated_at=now,
+        )
+        tickets = list(Ticket.objects.using(db).filter(claim_token=token).order_by("created_at", "pk"))
+        TicketEvent.objects.using(db).bulk_create(
+            TicketEvent(
+                ticket=t, kind=TicketEvent.Kind.ASSIGNED,
+                from_status=previous[t.pk][0], to_status=Status.IN_PROGRESS, actor=agent,
+            )
+            for t in tickets
+        )
+        moved = Counter(previous[t.pk] for t in tickets)
+        for (from_status, ticket_type), count in moved.items():
+            workflow.count_transition(ticket_type, from_status, Status.IN_PROGRESS, count)
+        references = [t.reference_number for t in tickets]
+        transaction.on_commit(lambda: public_status.invalidate(*references), using=db)
+    return tickets
+
+
+def _held(agent) -> Q:
+    """الطلب محجوز لهذا الموظف بمهلة سارية (شرط كل عملية بعد الحجز)."""
+    return Q(status=Status.IN_PROGRESS, claimed_by=agent, lease_expires_at__gte=timezone.now())
+
+
+def renew(ticket: Ticket, agent) -> Ticket:
+    """تمديد مهلة الحجز (بدون حدث: لا يغيّر الحالة ولا المسؤول)."""
+    now = timezone.now()
+    expires = now + lease_duration()
+    if not Ticket.objects.filter(_held(agent), pk=ticket.pk).update(lease_expires_at=expires, updated_at=now):
+        raise ClaimError(ticket.reference_number)
+    ticket.lease_expires_at = expires
+    return ticket
+
+
+def release(ticket: Ticket, agent, note: str = "") -> Ticket:
+    """إرجاع الطلب للطابور دون معالجة."""
+    if not workflow.apply(
+        ticket, TicketEvent.Kind.RELEASED, actor=agent, note=note, guard=_held(agent),
+        status=Status.PENDING, claimed_by=None, claim_token=None, lease_expires_at=None,
+    ):
+        raise ClaimError(ticket.reference_number)
+    return ticket
+
+
+def complete(ticket: Ticket, agent, status: str = Status.DONE, note: str = "") -> Ticket:
+    """إنهاء الطلب (مكتمل أو ملغى). يبقى claimed_by لمعرفة من أنهاه."""
+    if status not in (Status.DONE, Status.CANCELLED):
+        raise ValueError(status)
+    if not workflow.apply(
+        ticket, TicketEvent.Kind.STATUS, actor=agent, note=note, guard=_held(agent),
+        status=status, claim_token=None, lease_expires_at=None,
+    ):
+        raise ClaimError(ticket.reference_number)
+    return ticket
@@ -0,0 +1,178 @@
+# tickets/refs.py
+"""
+أرقام مرجعية مرتبة زمنيًا وفريدة بدون الرجوع لقاعدة البيانات (على نمط Snowflake):
+
+    63 بت = 41 بت ملّي ثانية منذ EPOCH | 10 بت رقم العامل | 12 بت تسلسل داخل الملّي ثانية
+
+تُكتب بترميز Crockford Base32 بطول ثابت (13 حرفًا) بعد البادئة: "UW-01J9ZK3M4X0AB".
+الطول الثابت يجعل الترتيب النصي = الترتيب الزمني (ومناسبًا للفهرس).
+
+التفرّد مضمون ما دام لكل عملية رقم عامل مختلف:
+
+- الإنتاج: TICKET_WORKER_ID (0..1023) مضبوط صراحةً وفريد لكل عملية — توليد بلا أي رجوع للقاعدة
+  (فحص النشر tickets.W001 ينبّه عند غيابه: manage.py check --deploy).
+- احتياطي (غير مضبوط): حجز رقم من جدول ReferenceWorker. الثمن: أول رقم في كل عملية يكتب صف
+  الحجز داخل معاملة الطلب الذي يولّده، ثم تحديث heartbeat كل TICKET_WORKER_LEASE_SECONDS/3
+  (وفي كل استدعاء ما دامت معاملة الحجز لم تُثبَّت). يُسترد الرقم بعد انقضاء مهلته.
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+
+PREFIX = "UW-"
+EPOCH_MS = 1735689600000          # 2025-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+WIDTH = 13                         # ceil(63 / 5)
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"   # Crockford (بدون I L O U)
+
+
+def encode(n: int) -> str:
+    chars = []
+    for _ in range(WIDTH):
+        n, r = divmod(n, 32)
+        chars.append(_ALPHABET[r])
+    return "".join(reversed(chars))
+
+
+def decode(s: str) -> int:
+    n = 0
+    for ch in s.upper():
+        n = n * 32 + _ALPHABET.index(ch)
+    return n
+
+
+class ReferenceGenerator:
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"worker_id خارج النطاق 0..{MAX_WORKER}: {worker_id}")
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now > self._last_ms:
+                self._last_ms, self._sequence = now, 0
+            else:
+                # نفس الملّي ثانية، أو رجوع الساعة: نكمل من آخر قيمة ولا نعود للخلف أبدًا
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_reference(self) -> str:
+        return PREFIX + encode(self.next_id())
+
+
+def reference_timestamp_ms(reference: str) -> int:
+    """وقت الإنشاء (ملّي ثانية Unix) المضمّن في الرقم المرجعي."""
+    return (decode(reference.removeprefix(PREFIX)) >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+
+
+_generator: ReferenceGenerator | None = None
+_generator_pid: int | None = None
+_lease_holder: str | None = None       # None → رقم مضبوط صراحةً (بلا حجز)
+_lease_renewed = float("-inf")         # time.monotonic() لآخر تجديد مُثبَّت
+_generator_lock = threading.Lock()
+
+
+def _configured_worker_id() -> int | None:
+    configured = getattr(settings, "TICKET_WORKER_ID", None)
+    return None if configured in (None, "") else int(configured)
+
+
+def _lease_seconds() -> int:
+    return getattr(settings, "TICKET_WORKER_LEASE_SECONDS", 600)
+
+
+def _workers():
+    from .models import ReferenceWorker
+
+    db = router.db_for_write(ReferenceWorker)
+    return db, ReferenceWorker.objects.using(db)
+
+
+def _acquire_lease(holder: str) -> int:
+    """أول رقم عامل متاح، بدءًا من رقم مشتق من pid حتى لا تتزاحم العمليات على الرقم نفسه."""
+    db, workers = _workers()
+    now = timezone.now()
+    stale = now - timedelta(seconds=_lease_seconds())
+    start = os.getpid() & MAX_WORKER
+    for offset in range(MAX_WORKER + 1):
+        worker_id = (start + offset) & MAX_WORKER
+        try:
+            with transaction.atomic(using=db):
+                workers.create(worker_id=worker_id, holder=holder, heartbeat=now)
+            return worker_id
+        except IntegrityError:
+            pass
+        # حجز منتهٍ: تحديث مشروط واحد — من عمليتين تتسابقان عليه تنجح واحدة فقط
+        if workers.filter(worker_id=worker_id, heartbeat__lt=stale).update(holder=holder, heartbeat=now):
+            return worker_id
+    raise ImproperlyConfigured(f"كل أرقام العمال (0..{MAX_WORKER}) محجوزة؛ اضبط TICKET_WORKER_ID لكل عملية.")
+
+
+def _renew_lease(worker_id: int, holder: str) -> bool:
+    """False إن فُقد الحجز (انقضت مهلته وأخذته عملية أخرى، أو تراجعت المعاملة التي حجزته)."""
+    _, workers = _workers()
+    return bool(workers.filter(worker_id=worker_id, holder=holder).update(heartbeat=timezone.now()))
+
+
+def _mark_renewed(holder: str) -> None:
+    global _lease_renewed
+    db, _ = _workers()
+    if transaction.get_connection(db).in_atomic_block:
+        # الكتابة داخل معاملة لم تُثبَّت بعد: قد تتراجع فيضيع الحجز، فنعيد التحقق في كل استدعاء حتى تُثبَّت
+        _lease_renewed = float("-inf")
+        transaction.on_commit(lambda: _confirm_renewed(holder), using=db)
+    else:
+        _lease_renewed = time.monotonic()
+
+
+def _confirm_renewed(holder: str) -> None:
+    global _lease_renewed
+    if _lease_holder == holder:
+        _lease_renewed = time.monotonic()
+
+
+def _current_generator() -> ReferenceGenerator:
+    global _generator, _generator_pid, _lease_holder
+    pid = os.getpid()
+    with _generator_lock:
+        # بعد fork تأخذ العملية الابنة مولّدها (وحجزها) الخاص
+        if _generator is not None and _generator_pid == pid:
+            if _lease_holder is None or time.monotonic() - _lease_renewed < _lease_seconds() / 3:
+                return _generator
+            if _renew_lease(_generator.worker_id, _lease_holder):
+                _mark_renewed(_lease_holder)
+                return _generator
+        worker_id = _configured_worker_id()
+        if worker_id is None:
+            _lease_holder = f"{socket.gethostname()[:60]}:{pid}:{uuid.uuid4().hex[:8]}"
+            worker_id = _acquire_lease(_lease_holder)
+            _mark_renewed(_lease_holder)
+        else:
+            _lease_holder = None
+        _generator, _generator_pid = ReferenceGenerator(worker_id), pid
+        return _generator
+
+
+def next_reference() -> str:
+    return _current_generator().next_reference()
@@ -0,0 +1,53 @@
+# tickets/status.py
+"""
+حالة الطلب للعموم حسب الرقم المرجعي: بيانات غير حساسة فقط، من ذاكرة مؤقتة قصيرة العمر
+تُمسح عند كل تغيير على الطلب (tickets/workflow.py بعد تثبيت المعاملة).
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Ticket
+
+CACHE_PREFIX = "ticket-status:"
+# نرفض الصيغ غير الممكنة قبل لمس الذاكرة المؤقتة أو قاعدة البيانات
+REFERENCE_RE = re.compile(r"^[A-Z0-9-]{4,20}$")
+
+_NOT_FOUND = {}   # يُخزَّن أيضًا: تكرار رقم غير موجود لا يصل لقاعدة البيانات
+
+
+def normalize_reference(raw: str | None) -> str | None:
+    ref = (raw or "").strip().upper()
+    return ref if REFERENCE_RE.match(ref) else None
+
+
+def cache_key(reference: str) -> str:
+    return CACHE_PREFIX + reference
+
+
+def public_status(reference: str) -> dict | None:
+    """{reference_number, ticket_type, status, created_at, updated_at} أو None."""
+    key = cache_key(reference)
+    data = cache.get(key)
+    if data is None:
+        data = (
+            Ticket.objects.filter(reference_number=reference)   # الفهرس الفريد
+            .values("reference_number", "ticket_type", "status", "created_at", "updated_at")
+            .first()
+        ) or _NOT_FOUND
+        cache.set(key, data, getattr(settings, "TICKET_STATUS_CACHE_SECONDS", 60))
+    return data or None
+
+
+def etag(data: dict) -> str:
+    raw = f"{data['reference_number']}|{data['status']}|{data['updated_at'].isoformat()}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def invalidate(*references: str) -> None:
+    if references:
+        cache.delete_many([cache_key(r) for r in references])
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.forms.models import model_to_dict
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lookup.models import Customer
+from . import queue, refs, workflow
+from .checks import worker_id_check, worker_id_deploy_check
+from .models import ReferenceWorker, Ticket, TicketCounter, TicketEvent
+from .refs import PREFIX, ReferenceGenerator, reference_timestamp_ms
+
+
+class ReferenceGeneratorTests(SimpleTestCase):
+    def test_unique_and_time_ordered_across_threads(self):
+        gen = ReferenceGenerator(worker_id=7)
+        refs, lock = [], threading.Lock()
+
+        def worker():
+            local = [gen.next_reference() for _ in range(5000)]
+            with lock:
+                refs.extend(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(set(refs)), len(refs))
+        self.assertTrue(all(r.startswith(PREFIX) and len(r) <= 20 for r in refs))
+        # الطول ثابت → الترتيب النصي هو ترتيب الإنشاء
+        single = [gen.next_reference() for _ in range(100)]
+        self.assertEqual(single, sorted(single))
+
+    def test_workers_never_collide(self):
+        a, b = ReferenceGenerator(1), ReferenceGenerator(2)
+        self.assertFalse({a.next_reference() for _ in range(1000)} & {b.next_reference() for _ in range(1000)})
+
+    def test_embedded_timestamp(self):
+        before = int(time.time() * 1000)
+        ref = ReferenceGenerator(3).next_reference()
+        self.assertLessEqual(abs(reference_timestamp_ms(ref) - before), 1000)
+
+
+_REFS_STATE = ("_generator", "_generator_pid", "_lease_holder", "_lease_renewed")
+
+
+@override_settings(TICKET_WORKER_ID=None)
+class ReferenceWorkerLeaseTests(TestCase):
+    """كل "عملية" هنا حالة refs مستقلة مع pid خاص بها؛ الـ pids المختارة تتصادم في pid & 1023."""
+
+    def setUp(self):
+        saved = {name: getattr(refs, name) for name in _REFS_STATE}
+        self.addCleanup(lambda: [setattr(refs, k, v) for k, v in saved.items()])
+
+    def process(self, pid):
+        return dict(dict.fromkeys(_REFS_STATE), pid=pid, _lease_renewed=float("-inf"))
+
+    def worker_id(self, proc):
+        for name in _REFS_STATE:
+            setattr(refs, name, proc[name])
+        with mock.patch.object(refs.os, "getpid", return_value=proc["pid"]):
+            worker_id = refs._current_generator().worker_id
+        proc.update({name: getattr(refs, name) for name in _REFS_STATE})
+        return worker_id
+
+    def test_two_processes_with_colliding_pids_get_distinct_workers(self):
+        a, b = self.process(5), self.process(5 + 1024)
+        self.assertEqual((self.worker_id(a), self.worker_id(b)), (5, 6))
+        self.assertEqual(self.worker_id(a), 5)   # التجديد يُبقي الرقم نفسه
+        self.assertEqual(dict(ReferenceWorker.objects.values_list("worker_id", "holder")),
+                         {5: a["_lease_holder"], 6: b["_lease_holder"]})
+
+    def test_expired_lease_is_reclaimed_and_its_old_holder_moves_on(self):
+        a, b = self.process(5), self.process(5 + 1024)
+        self.assertEqual(self.worker_id(a), 5)
+        ReferenceWorker.objects.update(heartbeat=timezone.now() - timedelta(seconds=refs._lease_seconds() + 1))
+        self.assertEqual(self.worker_id(b), 5)
+        # a فقدت حجزها: لا تستمر بالرقم 5 بل تحجز غيره
+        self.assertEqual(self.worker_id(a), 6)
+
+    def test_rolled_back_lease_is_not_trusted(self):
+        a = self.process(5)
+        self.assertEqual(self.worker_id(a), 5)
+        ReferenceWorker.objects.all().delete()   # كأن معاملة الحجز تراجعت
+        self.assertEqual(self.worker_id(a), 5)
+        self.assertTrue(ReferenceWorker.objects.filter(worker_id=5, holder=a["_lease_holder"]).exists())
+
+    @override_settings(TICKET_WORKER_ID="42")
+    def test_explicit_worker_id_skips_the_lease(self):
+        self.assertEqual(self.worker_id(self.process(5)), 42)
+        self.assertFalse(ReferenceWorker.objects.exists())
+
+
+class WorkerIdCheckTests(SimpleTestCase):
+    def test_invalid_worker_id_is_an_error(self):
+        for value, expected in (("7", []), ("1024", ["tickets.E001"]), ("x", ["tickets.E001"]), (None, [])):
+            with self.subTest(value=value), override_settings(TICKET_WORKER_ID=value):
+                self.assertEqual([e.id for e in worker_id_check(None)], expected)
+
+    def test_deploy_check_asks_for_an_explicit_worker_id(self):
+        with override_settings(TICKET_WORKER_ID=None):
+            self.assertEqual([e.id for e in worker_id_deploy_check(None)], ["tickets.W001"])
+        with override_settings(TICKET_WORKER_ID="3"):
+            self.assertEqual(worker_id_deploy_check(None), [])
+
+
+class ServiceRequestCreatesTicketTests(TestCase):
+    def test_ticket_persisted(self):
+        user = get_user_model().objects.create_user(username="0500000001", password="x")
+        customer = Customer.objects.create(full_name="أحمد", national_id="1000000001", mobile="0500000009")
+        self.client.force_login(user)
+        self.client.post(reverse("lookup:home"), {"national_id": "1000000001"})
+        self.client.post(reverse("lookup:choose_role"), {"role": "owner"})
+
+        self.client.get(reverse("lookup:service_request", args=["transfer_meter"]))
+
+        ticket = Ticket.objects.get()
+        self.assertEqual((ticket.ticket_type, ticket.customer, ticket.user, ticket.role),
+                         ("transfer_meter", customer, user, "owner"))
+        self.assertEqual(ticket.contact_phone, "0500000009")
+        self.assertTrue(ticket.reference_number.startswith(PREFIX))
+        self.assertEqual(list(ticket.events.values_list("kind", "actor")), [(TicketEvent.Kind.CREATED, user.pk)])
+
+
+class TicketQueueTests(TransactionTestCase):
+    AGENTS = 6
+    TICKETS = 120
+
+    def setUp(self):
+        User = get_user_model()
+        self.agents = [User.objects.create(username=f"agent{i}", is_staff=True) for i in range(self.AGENTS)]
+        Ticket.objects.bulk_create(Ticket(ticket_type="manual_ticket") for _ in range(self.TICKETS))
+
+    def test_concurrent_agents_never_double_claim(self):
+        claimed, errors, lock = [], [], threading.Lock()
+
+        def agent_loop(agent):
+            try:
+                while True:
+                    batch = queue.claim(agent, 5)
+                    if not batch:
+                        return
+                    with lock:
+                        claimed.extend((t.pk, agent.pk) for t in batch)
+            except Exception as e:  # pragma: no cover - يظهر في رسالة الفشل
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=agent_loop, args=(a,)) for a in self.agents]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        ids = [pk for pk, _agent in claimed]
+        self.assertEqual(len(ids), len(set(ids)), "طلب حُجز مرتين")
+        self.assertEqual(len(ids), self.TICKETS)
+        owners = dict(Ticket.objects.values_list("pk", "claimed_by"))
+        self.assertTrue(all(owners[pk] == agent for pk, agent in claimed))
+
+    def test_oldest_first_and_expired_lease_is_reclaimed(self):
+        first = queue.claim(self.agents[0], 2)
+        self.assertEqual([t.pk for t in first], list(Ticket.objects.order_by("created_at", "pk").values_list("pk", flat=True)[:2]))
+
+        Ticket.objects.filter(pk=first[0].pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(queue.ClaimError):
+            queue.complete(first[0], self.agents[0])
+        again = queue.claim(self.agents[1], 1)
+        self.assertEqual(again[0].pk, first[0].pk)
+
+        queue.complete(first[1], self.agents[0])
+        self.assertEqual(Ticket.objects.get(pk=first[1].pk).status, Ticket.Status.DONE)
+
+    def test_claim_endpoint(self):
+        self.client.force_login(self.agents[0])
+        response = self.client.post(reverse("tickets:claim"), {"n": 3})
+        self.assertEqual(len(response.json()["claimed"]), 3)
+        ref = response.json()["claimed"][0]["reference_number"]
+        self.client.force_login(self.agents[1])
+        self.assertEqual(self.client.post(reverse("tickets:action", args=[ref, "complete"])).status_code, 409)
+
+
+class TicketTimelineTests(TestCase):
+    def test_transitions_append_events_and_update_snapshot(self):
+        agent = get_user_model().objects.create(username="agent", is_staff=True)
+        ticket = workflow.open_ticket(ticket_type="pay_debt")
+        [claimed] = queue.claim(agent, 1)
+        workflow.add_note(claimed, "اتصلنا بالعميل", actor=agent)
+        queue.complete(claimed, agent)
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, Ticket.Status.DONE)
+        with self.assertNumQueries(1):
+            events = [(e.kind, e.from_status, e.to_status, e.actor and e.actor.username)
+                      for e in workflow.timeline(ticket)]
+        self.assertEqual(events, [
+            ("created", "", "Pending", None),
+            ("assigned", "Pending", "InProgress", "agent"),
+            ("note", "InProgress", "InProgress", "agent"),
+            ("status", "InProgress", "Done", "agent"),
+        ])
+
+        self.client.force_login(agent)
+        data = self.client.get(reverse("tickets:timeline", args=[ticket.reference_number])).json()
+        self.assertEqual([e["kind"] for e in data["events"]], ["created", "assigned", "note", "status"])
+
+        event = ticket.events.first()
+        event.note = "x"
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_bulk_update_and_delete_refused(self):
+        actor = get_user_model().objects.create(username="agent", is_staff=True)
+        ticket = workflow.open_ticket(ticket_type="pay_debt", actor=actor)
+        events = TicketEvent.objects.filter(ticket=ticket)
+        with self.assertRaises(ValueError):
+            events.update(note="x")
+        with self.assertRaises(ValueError):
+            events.bulk_update(list(events), ["note"])
+        with self.assertRaises(ValueError):
+            events.delete()
+        # حذف المستخدم ما زال يُفرغ actor دون حذف الحدث
+        actor.delete()
+        self.assertEqual(list(events.values_list("kind", "actor")), [("created", None)])
+
+    def admin_save(self, ticket, user, **changes):
+        model_admin = admin.site._registry[Ticket]
+        request = RequestFactory().post("/")
+        request.user = user
+        form_class = model_admin.get_form(request, ticket, change=True)
+        data = {k: "" if v is None else v for k, v in model_to_dict(ticket, fields=form_class.base_fields).items()}
+        form = form_class({**data, **changes}, instance=ticket)
+        self.assertTrue(form.is_valid(), form.errors)
+        model_admin.save_model(request, form.save(commit=False), form, True)
+
+    def test_admin_claim_changes_go_through_workflow(self):
+        admin_user = get_user_model().objects.create(username="boss", is_staff=True, is_superuser=True)
+        agent = get_user_model().objects.create(username="agent", is_staff=True)
+        ticket = workflow.open_ticket(ticket_type="pay_debt")
+
+        self.admin_save(ticket, admin_user, claimed_by=agent.pk)
+        self.admin_save(Ticket.objects.get(pk=ticket.pk), admin_user, claimed_by="")
+        self.admin_save(Ticket.objects.get(pk=ticket.pk), admin_user, status=Ticket.Status.CANCELLED)
+
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.status, ticket.claimed_by), (Ticket.Status.CANCELLED, None))
+        self.assertEqual(
+            [(e.kind, e.to_status, e.actor.username if e.actor else None, e.note) for e in workflow.timeline(ticket)],
+            [
+                ("created", "Pending", None, ""),
+                ("assigned", "Pending", "boss", "لوحة الإدارة — المسؤول: agent"),
+                ("released", "Pending", "boss", "لوحة الإدارة"),
+                ("status", "Cancelled", "boss", "لوحة الإدارة"),
+            ],
+        )
+        self.assertEqual(TicketCounter.objects.get(ticket_type="pay_debt", status="Cancelled").count, 1)
+
+
+class TicketCounterTests(TestCase):
+    def counts(self):
+        return {(t, s): n for t, s, n in TicketCounter.objects.values_list("ticket_type", "status", "count") if n}
+
+    def test_counters_follow_transitions_and_reconcile(self):
+        agent = get_user_model().objects.create(username="agent", is_staff=True)
+        for _ in range(3):
+            workflow.open_ticket(ticket_type="pay_debt")
+        workflow.open_ticket(ticket_type="transfer_meter")
+        a, b = queue.claim(agent, 2, ticket_type="pay_debt")
+        queue.complete(a, agent)
+        queue.release(b, agent)
+        expected = {("pay_debt", "Pending"): 2, ("pay_debt", "Done"): 1, ("transfer_meter", "Pending"): 1}
+        self.assertEqual(self.counts(), expected)
+
+        self.client.force_login(agent)
+        with self.assertNumQueries(2):   # المستخدم + العدّادات (لا شيء من جدول الطلبات)
+            data = self.client.get(reverse("tickets:dashboard"), {"format": "json"}).json()
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(data["by_type"]["pay_debt"]["Done"], 1)
+        self.assertEqual(self.client.get(reverse("tickets:dashboard")).status_code, 200)
+
+        # انحراف (تعديل مباشر يتجاوز workflow) ثم إعادة البناء
+        Ticket.objects.filter(ticket_type="transfer_meter").update(status=Ticket.Status.CANCELLED)
+        call_command("reconcile_ticket_counters", stdout=StringIO())
+        self.assertEqual(self.counts(), {**{k: v for k, v in expected.items() if k[0] != "transfer_meter"},
+                                         ("transfer_meter", "Cancelled"): 1})
+
+
+class PublicStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ticket = workflow.open_ticket(ticket_type="pay_debt")
+        self.url = reverse("tickets:status_detail", args=[self.ticket.reference_number])
+
+    def test_cached_lookup_conditional_get_and_invalidation(self):
+        first = self.client.get(self.url, {"format": "json"})
+        self.assertEqual(first.json()["status"], "Pending")
+        self.assertNotIn("contact_phone", first.json())
+
+        # من الذاكرة المؤقتة + 304 للعميل الذي يملك نفس ETag
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {"format": "json"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        agent = get_user_model().objects.create(username="agent", is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.claim(agent, 1)
+        changed = self.client.get(self.url, {"format": "json"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["status"], "InProgress")
+
+    def test_page_and_unknown_reference(self):
+        response = self.client.get(reverse("tickets:status"), {"ref": self.ticket.reference_number.lower()})
+        self.assertContains(response, self.ticket.reference_number)
+        self.assertEqual(self.client.get(reverse("tickets:status"), {"ref": "UW-NOPE"}).status_code, 404)
+        self.assertEqual(self.client.get(reverse("tickets:status")).status_code, 200)
+
+    def test_rate_limited(self):
+        for _ in range(30):
+            self.client.get(reverse("tickets:status"), {"ref": "UW-NOPE"})
+        self.assertEqual(self.client.get(reverse("tickets:status"), {"ref": "UW-NOPE2"}).status_code, 429)
+
+
+class TicketEventBackfillMigrationTests(TransactionTestCase):
+    before = [("tickets", "0004_ticket_status_queue_claims")]
+    after = [("tickets", "0005_ticket_events")]
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_backfilled_event_keeps_ticket_creation_time(self):
+        OldTicket = self.migrate(self.before).get_model("tickets", "Ticket")
+        ticket = OldTicket.objects.create(ticket_type="pay_debt", reference_number="UW-OLD0000000001")
+        created = timezone.now() - timedelta(days=400)
+        OldTicket.objects.filter(pk=ticket.pk).update(created_at=created)
+
+        Event = self.migrate(self.after).get_model("tickets", "TicketEvent")
+        event = Event.objects.get(ticket_id=ticket.pk)
+        self.assertEqual((event.kind, event.note, event.created_at), ("created", "backfill", created))
@@ -1,5 +1,23 @@
 from django.urls import path
 
+from . import views
+
+app_name = "tickets"
+
 urlpatterns = [
-    # مسارات تطبيق tickets ستضاف هنا لاحقًا
+    # حالة الطلب للعموم (بالرقم المرجعي)
+    path("status/", views.public_status_view, name="status"),
+    path("status/<str:reference>/", views.public_status_view, name="status_detail"),
+
+    # لوحة المتابعة (من العدّادات)
+    path("dashboard/", views.dashboard_view, name="dashboard"),
+
+    # طابور الموظفين (JSON)
+    path("queue/claim/", views.claim_view, name="claim"),
+    path("queue/mine/", views.my_tickets_view, name="mine"),
+
+    # الخط الزمني والملاحظات
+    path("<str:reference>/timeline/", views.timeline_view, name="timeline"),
+    path("<str:reference>/note/", views.note_view, name="note"),
+    path("<str:reference>/<slug:action>/", views.ticket_action_view, name="action"),
 ]
@@ -1,3 +1,195 @@
-from django.shortcuts import render
+# tickets/views.py
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.http import condition, require_GET, require_POST
 
-# Create your views here.
+from lookup.catalog import service_title
+from myprojabd.decorators import staff_required
+from myprojabd.ratelimit import ratelimit
+from . import queue, status, workflow
+from .models import Ticket, TicketCounter
+
+# أقصى عدد طلبات في حجز واحد
+MAX_CLAIM = 50
+
+
+def _ticket_json(t: Ticket) -> dict:
+    return {
+        "reference_number": t.reference_number,
+        "ticket_type": t.ticket_type,
+        "status": t.status,
+        "created_at": t.created_at.isoformat(),
+        "updated_at": t.updated_at.isoformat(),
+        "contact_name": t.contact_name,
+        "contact_phone": t.contact_phone,
+        "lease_expires_at": t.lease_expires_at.isoformat() if t.lease_expires_at else None,
+    }
+
+
+# ===================== طابور الموظفين (JSON) =====================
+
+@staff_required
+@require_POST
+def claim_view(request):
+    """حجز أقدم N طلبات متاحة: ?n=5 و ?type=<ticket_type> (اختياري)."""
+    try:
+        n = max(1, min(int(request.POST.get("n") or request.GET.get("n") or 1), MAX_CLAIM))
+    except ValueError:
+        n = 1
+    ticket_type = request.POST.get("type") or request.GET.get("type") or None
+    tickets = queue.claim(request.user, n, ticket_type=ticket_type)
+    return JsonResponse({"claimed": [_ticket_json(t) for t in tickets]})
+
+
+@staff_required
+@require_GET
+def my_tickets_view(request):
+    """الطلبات المحجوزة حاليًا لهذا الموظف."""
+    qs = Ticket.objects.filter(claimed_by=request.user, status=Ticket.Status.IN_PROGRESS).order_by("created_at")
+    return JsonResponse({"tickets": [_ticket_json(t) for t in qs[:MAX_CLAIM]]})
+
+
+@staff_required
+@require_POST
+def ticket_action_view(request, reference: str, action: str):
+    """renew | release | complete | cancel على طلب محجوز لهذا الموظف."""
+    ticket = get_object_or_404(Ticket, reference_number=reference)
+    try:
+        if action == "renew":
+            queue.renew(ticket, request.user)
+        elif action == "release":
+            queue.release(ticket, request.user)
+        elif action == "complete":
+            queue.complete(ticket, request.user, Ticket.Status.DONE)
+        elif action == "cancel":
+            queue.complete(ticket, request.user, Ticket.Status.CANCELLED)
+        else:
+            return JsonResponse({"error": "unknown action"}, status=404)
+    except queue.ClaimError:
+        return JsonResponse({"error": "not claimed by you"}, status=409)
+    return JsonResponse({"ticket": _ticket_json(ticket)})
+
+
+# ===================== الخط الزمني والملاحظات =====================
+
+@staff_required
+@require_GET
+def timeline_view(request, reference: str):
+    """اللقطة الحالية + كل الأحداث بالترتيب."""
+    ticket = get_object_or_404(Ticket, reference_number=reference)
+    events = [
+        {
+            "kind": e.kind,
+            "from_status": e.from_status,
+            "to_status": e.to_status,
+            "actor": e.actor.username if e.actor else None,
+            "note": e.note,
+            "at": e.created_at.isoformat(),
+        }
+        for e in workflow.timeline(ticket)
+    ]
+    return JsonResponse({"ticket": _ticket_json(ticket), "events": events})
+
+
+@staff_required
+@require_POST
+def note_view(request, reference: str):
+    ticket = get_object_or_404(Ticket, reference_number=reference)
+    note = (request.POST.get("note") or "").strip()
+    if not note:
+        return JsonResponse({"error": "empty note"}, status=400)
+    workflow.add_note(ticket, note, actor=request.user)
+    return JsonResponse({"ticket": _ticket_json(ticket)}, status=201)
+
+
+# ===================== لوحة المتابعة =====================
+
+@staff_required
+@require_GET
+def dashboard_view(request):
+    """
+    أعداد الطلبات حسب النوع والحالة من TicketCounter فقط (زمن ثابت مهما كبر جدول الطلبات).
+    ?format=json لإرجاع JSON.
+    """
+    statuses = [value for value, _label in Ticket.Status.choices]
+    matrix: dict = {}
+    for ticket_type, status, count in TicketCounter.objects.values_list("ticket_type", "status", "count"):
+        matrix.setdefault(ticket_type, dict.fromkeys(statuses, 0))[status] = count
+    totals = {s: sum(row[s] for row in matrix.values()) for s in statuses}
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({"by_type": matrix, "totals": totals, "total": sum(totals.values())})
+
+    rows = [
+        {"ticket_type": t, "counts": [counts[s] for s in statuses], "total": sum(counts.values())}
+        for t, counts in sorted(matrix.items())
+    ]
+    return render(
+        request,
+        "tickets/dashboard.html",
+        {
+            "status_labels": [label for _value, label in Ticket.Status.choices],
+            "rows": rows,
+            "totals": [totals[s] for s in statuses],
+            "total": sum(totals.values()),
+        },
+    )
+
+
+# ===================== حالة الطلب للعموم =====================
+
+def _status_for(request, reference=None):
+    """قراءة واحدة (من الذاكرة المؤقتة غالبًا) مشتركة بين ETag/Last-Modified والمنظر."""
+    if not hasattr(request, "_ticket_status"):
+        ref = status.normalize_reference(reference or request.GET.get("ref"))
+        request._ticket_status = status.public_status(ref) if ref else None
+    return request._ticket_status
+
+
+def _status_etag(request, reference=None):
+    data = _status_for(request, reference)
+    return status.etag(data) if data else None
+
+
+def _status_last_modified(request, reference=None):
+    data = _status_for(request, reference)
+    return data["updated_at"] if data else None
+
+
+@ratelimit("ticket_status", key="ip", rate="30/m", methods=("GET", "HEAD"))
+@require_GET
+@condition(etag_func=_status_etag, last_modified_func=_status_last_modified)
+def public_status_view(request, reference=None):
+    """
+    استعلام العميل عن طلبه بالرقم المرجعي (بدون تسجيل دخول):
+    /tickets/status/?ref=UW-... أو /tickets/status/UW-.../ و ?format=json
+    - الحالة من ذاكرة مؤقتة قصيرة تُمسح عند أي تغيير.
+    - ETag/Last-Modified: الاستعلام الدوري يحصل على 304 بلا جسم.
+    - تحديد معدل لكل IP يمنع تجربة الأرقام.
+    """
+    ref = reference or request.GET.get("ref")
+    data = _status_for(request, reference)
+    as_json = request.GET.get("format") == "json"
+
+    payload = None
+    if data:
+        payload = {
+            "reference_number": data["reference_number"],
+            "ticket_type": data["ticket_type"],
+            "title": service_title(data["ticket_type"]),
+            "status": data["status"],
+            "status_label": str(dict(Ticket.Status.choices).get(data["status"], data["status"])),
+            "created_at": data["created_at"].isoformat(),
+            "updated_at": data["updated_at"].isoformat(),
+        }
+
+    if as_json:
+        response = JsonResponse(payload or {"error": "not found"}, status=200 if payload else 404)
+    else:
+        ticket = {**payload, "created": data["created_at"], "updated": data["updated_at"]} if payload else None
+        response = render(
+            request, "tickets/status.html", {"ref": ref or "", "ticket": ticket}, status=200 if payload or not ref else 404
+        )
+    # يُسمح بالتخزين بشرط إعادة التحقق (If-None-Match) في كل مرة
+    response["Cache-Control"] = "private, no-cache"
+    return response
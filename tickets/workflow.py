@@ -0,0 +1,95 @@
+# tickets/workflow.py
+"""
+كل تغيير على الطلب يمر من هنا: تحديث اللقطة (صف Ticket) + إلحاق TicketEvent + عدّادات
+TicketCounter في معاملة واحدة. لا تعدّل Ticket.status مباشرة (وإلا ضاع التاريخ واختلّت العدّادات).
+"""
+from __future__ import annotations
+
+from django.db import transaction
+from django.utils import timezone
+
+from myprojabd.counters import increment_counter
+from . import status as public_status
+from .models import Ticket, TicketCounter, TicketEvent
+
+Kind = TicketEvent.Kind
+
+
+def count_transition(ticket_type: str, from_status: str | None, to_status: str | None, n: int = 1) -> None:
+    """نقل n من عدّاد (النوع، from_status) إلى (النوع، to_status). يُستدعى داخل معاملة الانتقال."""
+    if from_status == to_status:
+        return
+    if from_status:
+        increment_counter(TicketCounter, by=-n, ticket_type=ticket_type, status=from_status)
+    if to_status:
+        increment_counter(TicketCounter, by=n, ticket_type=ticket_type, status=to_status)
+
+
+def record_created(ticket: Ticket, *, actor=None) -> None:
+    """حدث الإنشاء + العدّاد لطلب حُفظ للتو (داخل نفس المعاملة)."""
+    TicketEvent.objects.create(ticket=ticket, kind=Kind.CREATED, to_status=ticket.status, actor=actor)
+    count_transition(ticket.ticket_type, None, ticket.status)
+    # لو سُئل عن الرقم قبل إنشائه (نتيجة "غير موجود" مخزّنة)
+    reference = ticket.reference_number
+    transaction.on_commit(lambda: public_status.invalidate(reference))
+
+
+def open_ticket(*, actor=None, **fields) -> Ticket:
+    """إنشاء طلب مع حدث الإنشاء."""
+    with transaction.atomic():
+        ticket = Ticket.objects.create(**fields)
+        record_created(ticket, actor=actor)
+    return ticket
+
+
+def apply(ticket: Ticket, kind: str, *, actor=None, note: str = "", guard=None, **changes) -> bool:
+    """
+    تطبيق changes على اللقطة وإلحاق الحدث ذريًا.
+    guard: شرط Q إضافي على الصف (مثل "محجوز لهذا الموظف")؛ إن لم يتحقق لا يتغير شيء ويُرجع False.
+    """
+    with transaction.atomic():
+        row = Ticket.objects.filter(pk=ticket.pk)
+        if guard is not None:
+            row = row.filter(guard)
+        found = row.select_for_update().values_list("status", "ticket_type").first()
+        if found is None:
+            return False
+        current, ticket_type = found
+        now = timezone.now()
+        if changes:
+            Ticket.objects.filter(pk=ticket.pk).update(updated_at=now, **changes)
+        TicketEvent.objects.create(
+            ticket_id=ticket.pk,
+            kind=kind,
+            from_status=current,
+            to_status=changes.get("status", current),
+            actor=actor,
+            note=note,
+        )
+        count_transition(ticket_type, current, changes.get("status", current))
+        if changes:
+            reference = ticket.reference_number
+            transaction.on_commit(lambda: public_status.invalidate(reference))
+    for field, value in changes.items():
+        setattr(ticket, field, value)
+    if changes:
+        ticket.updated_at = now
+    return True
+
+
+def set_status(ticket: Ticket, status: str, *, actor=None, note: str = "") -> bool:
+    return apply(ticket, Kind.STATUS, actor=actor, note=note, status=status)
+
+
+def add_note(ticket: Ticket, note: str, *, actor=None) -> bool:
+    return apply(ticket, Kind.NOTE, actor=actor, note=note)
+
+
+def timeline(ticket: Ticket):
+    """أحداث الطلب بالترتيب (بحث بفهرس (ticket, id) بلا فرز)."""
+    return (
+        TicketEvent.objects.filter(ticket=ticket)
+        .select_related("actor")
+        .only("kind", "from_status", "to_status", "note", "created_at", "actor__username")
+        .order_by("id")
+    )